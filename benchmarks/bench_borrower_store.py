@@ -0,0 +1,87 @@
+"""Многоуровневое хранение читателей: память и задержка возврата в память на 10M исторических читателей"""
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from src.book_collection import Book
+from src.borrower_store import ColdBorrowerStore
+from src.library import BorrowerInfo, Library
+
+START = datetime(2015, 1, 1)
+
+
+def history(user_ids: range):
+    """Записи читателей без книг на руках, приходивших в разные дни за последние 10 лет"""
+    for user_id in user_ids:
+        first = START + timedelta(seconds=user_id * 31)
+        yield user_id, 1 + user_id % 40, 1 + user_id % 40, first, first + timedelta(days=user_id % 900)
+
+
+def hot_bytes_per_user(sample: int = 100_000) -> float:
+    """Стоимость BorrowerInfo в памяти (по выборке, чтобы не держать 10M объектов)"""
+    tracemalloc.start()
+    borrowers = {
+        user_id: BorrowerInfo(user_id, {}, total_borrowed, total_returned, first, last)
+        for user_id, total_borrowed, total_returned, first, last in history(range(sample))
+    }
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del borrowers
+    return memory / sample
+
+
+def run_store(users: int = 10_000_000, batch: int = 1_000_000, faults: int = 10_000) -> dict:
+    store = ColdBorrowerStore()
+    start = time.perf_counter()
+    for offset in range(0, users, batch):
+        # как при ежедневных вытеснениях: каждая партия - новый сегмент
+        store.put_many(history(range(offset, min(offset + batch, users))))
+    evict_time = time.perf_counter() - start
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(faults):
+        store.pop(rng.randrange(users))
+    fault_time = time.perf_counter() - start
+
+    hot = hot_bytes_per_user()
+    return {
+        'users': users,
+        'segments': len(store.segments),
+        'cold_mb': store.memory_bytes() / 2 ** 20,
+        'cold_bytes_per_user': store.memory_bytes() / users,
+        'hot_bytes_per_user': hot,
+        'hot_mb_estimated': hot * users / 2 ** 20,
+        'evict_us_per_user': evict_time / users * 1e6,
+        'fault_in_us': fault_time / faults * 1e6,
+    }
+
+
+def run_library(users: int = 200_000) -> dict:
+    """Полный цикл через Library: выдача, возврат, вытеснение и обращение к вытесненным"""
+    lib = Library()
+    book = Book("Title", "Author", 2000, "Роман", "9780306406157")
+    lib.collection.add_book(book, users)
+    lib.enable_borrower_tiering(idle_period=timedelta(days=1))
+    for user_id in range(users):
+        lib.borrow_books(book, user_id)
+        lib.return_books(book, user_id)
+    start = time.perf_counter()
+    evicted = lib.evict_idle_borrowers(datetime.now() + timedelta(days=2))
+    evict_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for user_id in range(0, users, 100):
+        lib.get_borrower_history(user_id)
+    lookup_time = time.perf_counter() - start
+    return {
+        'library_evicted': evicted,
+        'library_evict_s': evict_time,
+        'library_history_fault_us': lookup_time / len(range(0, users, 100)) * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    for key, value in {**run_store(users), **run_library()}.items():
+        print(f"{key}: {value:.6f}" if isinstance(value, float) else f"{key}: {value}")
@@ -0,0 +1,52 @@
+"""Колоночная аналитика против циклов Python: группировки по жанру и десятилетию, доля выдач по авторам"""
+import random
+import sys
+import time
+from src.book_collection import Book
+from src.columnar import python_group_by
+from src.library import Library
+
+GENRES = ["Роман", "Поэзия", "Драма", "Фантастика", "Детектив", "Нон-фикшн"]
+
+
+def run(books: int = 200000, borrowers: int = 50000, repeats: int = 5, seed: int = 0) -> dict:
+    random.seed(seed)
+    lib = Library("Bench")
+    lib.collection.add_prevalidated(
+        (Book(f"Title {i}", f"Author {i % 5000}", random.randint(1900, 2024), random.choice(GENRES), f"isbn-{i}"),
+         random.randint(2, 6))
+        for i in range(books)
+    )
+    for user_id in range(borrowers):
+        lib._register_loan(lib.collection.items[random.randrange(books)][0], user_id, 1)
+
+    start = time.perf_counter()
+    snap = lib.to_columnar()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        python_group_by(lib.collection, lib.borrowed_books, ['genre', 'decade'], 'copies')
+        python_group_by(lib.collection, lib.borrowed_books, ['author'], 'loans')
+        python_group_by(lib.collection, lib.borrowed_books, ['author'], 'copies')
+    python_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        snap.group_by(['genre', 'decade'], 'copies')
+        snap.loan_ratio_by_author()
+    columnar_time = (time.perf_counter() - start) / repeats
+
+    return {
+        'books': len(snap),
+        'build_ms': build_time * 1e3,
+        'python_ms': python_time * 1e3,
+        'columnar_ms': columnar_time * 1e3,
+        'speedup': python_time / columnar_time,
+    }
+
+
+if __name__ == "__main__":
+    books = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for key, value in run(books).items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
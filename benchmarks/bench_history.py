@@ -0,0 +1,49 @@
+"""История остатков: память и задержка as_of в зависимости от интервала контрольных точек"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from src.history import InventoryHistory
+
+
+def run(titles: int = 10000, changes: int = 200000, interval: int = 1000, queries: int = 200,
+        seed: int = 0) -> dict:
+    random.seed(seed)
+    start = datetime(2024, 1, 1)
+    moment = [start]
+    isbns = [f"isbn-{i}" for i in range(titles)]
+    history = InventoryHistory(((isbn, 5) for isbn in isbns), checkpoint_interval=interval,
+                               clock=lambda: moment[0])
+
+    began = time.perf_counter()
+    for i in range(changes):
+        moment[0] = start + timedelta(seconds=i)
+        isbn = random.choice(isbns)
+        user_id = random.randrange(1000)
+        # выдача: минус на полке, плюс у читателя
+        history.record(isbn, -1)
+        history.record(isbn, 1, user_id)
+    record_time = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for _ in range(queries):
+        history.as_of(start + timedelta(seconds=random.randrange(changes)))
+    query_time = time.perf_counter() - began
+
+    return {
+        'interval': interval,
+        'changes': len(history),
+        'checkpoints': len(history.checkpoints),
+        'memory_mb': history.memory_bytes() / 2 ** 20,
+        'record_us_per_op': record_time / len(history) * 1e6,
+        'as_of_ms_per_query': query_time / queries * 1e3,
+    }
+
+
+if __name__ == "__main__":
+    intervals = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for interval in intervals:
+        print(", ".join(
+            f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+            for key, value in run(interval=interval).items()
+        ))
@@ -0,0 +1,54 @@
+"""Нагрузка на очереди заявок: много читателей на несколько популярных книг"""
+import random
+import sys
+import time
+from src.book_collection import Book
+from src.library import Library
+
+
+def run(users: int = 20000, hot_titles: int = 3, returns: int = 50000, seed: int = 0) -> dict:
+    random.seed(seed)
+    lib = Library("Bench")
+    books = [Book(f"Hot {i}", "Author", 2000, "Роман", f"hot-{i}") for i in range(hot_titles)]
+    for book in books:
+        lib.collection.add_book(book, 5)
+
+    start = time.perf_counter()
+    holds = [lib.place_hold(random.choice(books), user_id) for user_id in range(users)]
+    place_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cancelled = 0
+    for hold in random.sample(holds, users // 10):
+        if hold.hold_id in lib.holds.holds:
+            lib.cancel_hold(hold.hold_id)
+            cancelled += 1
+    cancel_time = time.perf_counter() - start
+
+    # каждый возврат сразу уходит следующему в очереди
+    start = time.perf_counter()
+    done = 0
+    for _ in range(returns):
+        book = random.choice(books)
+        holders = lib.borrowed_books.get(book)
+        if not holders:
+            continue
+        lib.return_books(book, next(iter(holders)))
+        done += 1
+    return_time = time.perf_counter() - start
+
+    return {
+        'holds_placed': users,
+        'holds_cancelled': cancelled,
+        'returns': done,
+        'holds_fulfilled': lib.statistics['holds_fulfilled'],
+        'place_us_per_op': place_time / users * 1e6,
+        'cancel_us_per_op': cancel_time / max(cancelled, 1) * 1e6,
+        'return_with_allocation_us_per_op': return_time / max(done, 1) * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for key, value in run(users).items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
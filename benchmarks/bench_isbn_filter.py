@@ -0,0 +1,56 @@
+"""Фильтр ISBN: память, доля ложных срабатываний и стоимость промаха на 10M ключей"""
+import sys
+import time
+from src.book_collection import Book
+from src.isbn_filter import ScalableCuckooFilter
+from src.storage import SQLiteBookCollection
+
+
+def run_filter(keys: int = 10_000_000, misses: int = 1_000_000) -> dict:
+    isbn_filter = ScalableCuckooFilter(capacity=keys)
+    start = time.perf_counter()
+    for i in range(keys):
+        isbn_filter.add(f"978{i:010d}")
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    false_positives = 0
+    for i in range(misses):
+        if isbn_filter.might_contain(f"979{i:010d}"):
+            false_positives += 1
+    miss_time = time.perf_counter() - start
+
+    return {
+        'keys': keys,
+        'layers': len(isbn_filter.layers),
+        'memory_mb': isbn_filter.memory_bytes() / 2 ** 20,
+        'bytes_per_key': isbn_filter.memory_bytes() / keys,
+        'estimated_fpr': isbn_filter.estimated_fpr(),
+        'observed_fpr': false_positives / misses,
+        'add_us_per_key': build_time / keys * 1e6,
+        'miss_us_per_lookup': miss_time / misses * 1e6,
+    }
+
+
+def run_collection(books: int = 100_000, misses: int = 100_000) -> dict:
+    """Промах get_count в SQLite-коллекции с фильтром и без него"""
+    collection = SQLiteBookCollection(cache_size=0)
+    collection.add_prevalidated(
+        (Book(f"Title {i}", f"Author {i % 1000}", 2000, "Роман", f"978{i:010d}"), 1) for i in range(books)
+    )
+    absent = [Book("Missing", "Nobody", 2000, "Роман", f"979{i:010d}") for i in range(misses)]
+    result = {}
+    for label in ('without_filter', 'with_filter'):
+        if label == 'with_filter':
+            collection.enable_isbn_filter()
+        start = time.perf_counter()
+        for book in absent:
+            collection.get_count(book)
+        result[f'{label}_us_per_miss'] = (time.perf_counter() - start) / misses * 1e6
+    return result
+
+
+if __name__ == "__main__":
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    for key, value in {**run_filter(keys), **run_collection()}.items():
+        print(f"{key}: {value:.6f}" if isinstance(value, float) else f"{key}: {value}")
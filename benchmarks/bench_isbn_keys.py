@@ -0,0 +1,44 @@
+"""Память и скорость словаря ISBN: строковые ключи против канонических целых на 10M ISBN"""
+import sys
+import time
+import tracemalloc
+from src.isbn import isbn13_check_digit, isbn_key
+
+
+def iter_isbns(count: int, step: int = 1):
+    """Корректные ISBN-13 без дефисов; каждая строка создается заново"""
+    for i in range(0, count, step):
+        body = f"978{i:09d}"
+        yield body + isbn13_check_digit(body)
+
+
+def measure(label: str, count: int, to_key) -> dict:
+    value = object()  # общее значение, чтобы мерить только ключи и таблицу
+    tracemalloc.start()
+    keys = {to_key(isbn): value for isbn in iter_isbns(count)}
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # поиск по свежим строкам (как из запроса): хеш строки еще не посчитан
+    probes = list(iter_isbns(count, 10))
+    start = time.perf_counter()
+    for isbn in probes:
+        keys[to_key(isbn)]
+    lookup_time = time.perf_counter() - start
+    return {
+        f'{label}_memory_mb': memory / 2 ** 20,
+        f'{label}_bytes_per_key': memory / count,
+        f'{label}_lookup_us': lookup_time / len(probes) * 1e6,
+    }
+
+
+def run(count: int = 10_000_000) -> dict:
+    result = measure('str', count, str)
+    result.update(measure('int', count, isbn_key))
+    return result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    for key, value in run(count).items():
+        print(f"{key}: {value:.6f}" if isinstance(value, float) else f"{key}: {value}")
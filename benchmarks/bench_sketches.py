@@ -0,0 +1,64 @@
+"""Потоковая статистика: точность и память скетчей против точного подсчета на потоке выдач"""
+import random
+import sys
+import time
+from collections import Counter
+from src.book_collection import Book
+from src.sketches import StreamingStats
+
+GENRES = ("Роман", "Поэзия", "Детектив", "Фантастика", "Драма")
+
+
+def zipf_stream(events: int, books: int, users: int, seed: int = 0):
+    """Поток (книга, читатель) с популярностью книг по закону Ципфа"""
+    rng = random.Random(seed)
+    catalog = [Book(f"Title {i}", f"Author {i % 500}", 2000, GENRES[i % len(GENRES)], f"978{i:010d}")
+               for i in range(books)]
+    weights = [1 / (rank + 1) for rank in range(books)]
+    picked = rng.choices(catalog, weights, k=events)
+    return [(book, rng.randrange(users)) for book in picked]
+
+
+def run(events: int = 1_000_000, books: int = 50_000, users: int = 200_000, k: int = 20) -> dict:
+    stream = zipf_stream(events, books, users)
+
+    start = time.perf_counter()
+    exact_users, exact_genres, exact_books = set(), {}, Counter()
+    for book, user_id in stream:
+        exact_users.add(user_id)
+        exact_genres.setdefault(book.genre, set()).add(user_id)
+        exact_books[book.isbn] += 1
+    exact_time = time.perf_counter() - start
+    exact_bytes = (sum(sys.getsizeof(users) for users in exact_genres.values())
+                   + sys.getsizeof(exact_users) + sys.getsizeof(exact_books))
+
+    stats = StreamingStats(k=k)
+    start = time.perf_counter()
+    for book, user_id in stream:
+        stats.record_borrow(book, user_id)
+    sketch_time = time.perf_counter() - start
+
+    true_top = [isbn for isbn, _ in exact_books.most_common(k)]
+    found_top = {isbn for isbn, _ in stats.hot_books()}
+    genre_errors = [abs(stats.unique_borrowers(genre) - len(users)) / len(users)
+                    for genre, users in exact_genres.items()]
+    count_errors = [(stats.borrow_count(isbn) - count) / count for isbn, count in exact_books.most_common(1000)]
+    return {
+        'events': events,
+        'exact_distinct': len(exact_users),
+        'hll_distinct': stats.unique_borrowers(),
+        'hll_error': abs(stats.unique_borrowers() - len(exact_users)) / len(exact_users),
+        'max_genre_error': max(genre_errors),
+        'top1000_mean_overcount': sum(count_errors) / len(count_errors),
+        'heavy_hitters_recall': len(found_top.intersection(true_top)) / k,
+        'exact_mb': exact_bytes / 2 ** 20,
+        'sketch_mb': stats.memory_bytes() / 2 ** 20,
+        'exact_us_per_event': exact_time / events * 1e6,
+        'sketch_us_per_event': sketch_time / events * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for key, value in run(events).items():
+        print(f"{key}: {value:.6f}" if isinstance(value, float) else f"{key}: {value}")
@@ -1,8 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Any
-from src.constants import COLORS
+from typing import Optional, Any, Callable, Iterable, Iterator, TextIO
+from src.results import OperationResult, OperationStatus
+from src.fuzzy import TrigramIndex
+from src.facets import FacetCounts
+from src.query_cache import QueryCache, DEFAULT_CACHE_SIZE, MISSING
+from src.change_feed import replicated
+from src.isbn_filter import ScalableCuckooFilter, DEFAULT_CAPACITY
+from src.isbn import IsbnKey, isbn_key
+from src.pagination import Page, DEFAULT_PAGE_SIZE, sequence_page, positions_page, iter_pages, iter_paged
+from array import array
 from dataclasses import dataclass
+from functools import partial
 from collections import UserDict
+import io
 
 class LibraryException(Exception):
     def __init__(self, message: str):
@@ -36,9 +46,65 @@ class Book():
     def __hash__(self):
         return hash((self.title, self.author, self.year, self.genre, self.isbn))
 
+def same_book(a: Book, b: Book) -> bool:
+    """Та же книга с точностью до записи ISBN (ISBN-10 или ISBN-13, дефисы)"""
+    return (a.title == b.title and a.author == b.author and a.year == b.year and a.genre == b.genre
+            and isbn_key(a.isbn) == isbn_key(b.isbn)) # type: ignore
+
+INDEXED_FIELDS = ('title', 'author', 'genre', 'year')  # встроенные вторичные индексы
+
+def _book_isbn(book: Book) -> Optional[str]:
+    return book.isbn
+
+def _item_isbn(item: tuple) -> Optional[str]:
+    return item[0].isbn
+
 class Index(UserDict, ABC):
     """Базовый класс для всех типов индексов"""
 
+    def __init__(self):
+        # счетчик поколений: увеличивается при каждом изменении индекса
+        self.generation: int = 0
+        self._all_books: list[Book] = []
+        self._all_generation: int = 0
+        # необязательный индекс для поиска ключей с опечатками
+        self.fuzzy: Optional[TrigramIndex] = None
+        super().__init__()
+
+    def enable_fuzzy(self) -> TrigramIndex:
+        """Включить нечеткий поиск по ключам индекса (строится по текущим ключам)"""
+        if self.fuzzy is None:
+            self.fuzzy = TrigramIndex()
+            for key in self.data:
+                self.fuzzy.add(key)
+        return self.fuzzy
+
+    def _key_added(self, key: Any) -> None:
+        if self.fuzzy is not None:
+            self.fuzzy.add(key)
+
+    def _key_removed(self, key: Any) -> None:
+        if self.fuzzy is not None:
+            self.fuzzy.remove(key)
+
+    def search_fuzzy(self, key: str, max_distance: int = 2, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Ключи индекса с опечатками до max_distance, по возрастанию расстояния"""
+        return self.enable_fuzzy().search(key, max_distance, limit)
+
+    field: str = ''
+
+    def add_new(self, book: Book) -> None:
+        """Добавить книгу, которой точно нет в индексе (без поиска дубликата в списке)"""
+        key = getattr(book, self.field)
+        if key is not None:
+            postings = self.data.get(key)
+            if postings is None:
+                self.data[key] = [book]
+                self._key_added(key)
+            else:
+                postings.append(book)
+            self.generation += 1
+
     @abstractmethod
     def add(self, book: Book) -> None:
         """Добавить книгу в индекс"""
@@ -64,15 +130,30 @@ class Index(UserDict, ABC):
         """Количество уникальных ключей в индексе"""
         pass'''
 
-    @abstractmethod
+    def matches(self, book: Book, key: Any) -> bool:
+        """Подходит ли книга под ключ (для проверки остальных условий в find)"""
+        return getattr(book, self.field) == key
+
+    def page(self, key: Any, cursor: Optional[tuple] = None, size: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Страница книг по ключу индекса (курсор устойчив к добавлению книг)"""
+        return sequence_page(self.data.get(key, ()), cursor, size, _book_isbn)
+
     def get_all(self) -> list[Book]:
-        """Получить все книги из индекса"""
-        pass
+        """Получить все книги из индекса (пересобирается только после изменений; возвращается копия)"""
+        if self._all_generation != self.generation:
+            all_books = []
+            for books_list in self.data.values():
+                all_books.extend(books_list)
+            self._all_books = all_books
+            self._all_generation = self.generation
+        return self._all_books.copy()
 
 
 class AuthorIndex(Index):
     """Индекс по авторам"""
 
+    field = 'author'
+
     def __init__(self):
         super().__init__()
 
@@ -80,31 +161,31 @@ class AuthorIndex(Index):
         if book.author is not None:
             if book.author not in self.data :
                 self.data[book.author] = []
+                self._key_added(book.author)
             if book not in self.data[book.author]:
                 self.data[book.author].append(book)
+                self.generation += 1
 
     def remove(self, book: Book) -> None:
         if book.author is not None and book.author in self.data:
             if book in self.data[book.author]:
                 self.data[book.author].remove(book)
+                self.generation += 1
                 if not self.data[book.author]:
                     del self.data[book.author]
+                    self._key_removed(book.author)
 
     def search(self, author: str) -> list[Book]:
         return self.data.get(author, [])
 
-    def get_all(self) -> list[Book]:
-        all_books = []
-        for books_list in self.data.values():
-            all_books.extend(books_list)
-        return all_books
-
     def __repr__(self):
         return f"AuthorIndex({len(self)} authors)"
 
 class YearIndex(Index):
     """Индекс по годам издания"""
 
+    field = 'year'
+
     def __init__(self):
         super().__init__()
 
@@ -112,31 +193,31 @@ class YearIndex(Index):
         if book.year is not None:
             if book.year not in self.data:
                 self.data[book.year] = []
+                self._key_added(book.year)
             if book not in self.data[book.year]:
                 self.data[book.year].append(book)
+                self.generation += 1
 
     def remove(self, book: Book) -> None:
         if book.year is not None and book.year in self.data:
             if book in self.data[book.year]:
                 self.data[book.year].remove(book)
+                self.generation += 1
                 if not self.data[book.year]:
                     del self.data[book.year]
+                    self._key_removed(book.year)
 
     def search(self, year: int) -> list[Book]:
         return self.data.get(year, [])
 
-    def get_all(self) -> list[Book]:
-        all_books = []
-        for books_list in self.data.values():
-            all_books.extend(books_list)
-        return all_books
-
     def __repr__(self):
         return f"YearIndex({len(self)} years)"
 
 class GenreIndex(Index):
     """Индекс по жанрам"""
 
+    field = 'genre'
+
     def __init__(self):
         super().__init__()
 
@@ -144,31 +225,31 @@ class GenreIndex(Index):
         if book.genre is not None:
             if book.genre not in self.data:
                 self.data[book.genre] = []
+                self._key_added(book.genre)
             if book not in self.data[book.genre]:
                 self.data[book.genre].append(book)
+                self.generation += 1
 
     def remove(self, book: Book) -> None:
         if book.genre is not None and book.genre in self.data:
             if book in self.data[book.genre]:
                 self.data[book.genre].remove(book)
+                self.generation += 1
                 if not self.data[book.genre]:
                     del self.data[book.genre]
+                    self._key_removed(book.genre)
 
     def search(self, genre: str) -> list[Book]:
         return self.data.get(genre, [])
 
-    def get_all(self) -> list[Book]:
-        all_books = []
-        for books_list in self.data.values():
-            all_books.extend(books_list)
-        return all_books
-
     def __repr__(self):
         return f"GenreIndex({len(self)} genres)"
 
 class TitleIndex(Index):
     """Индекс по названиям"""
 
+    field = 'title'
+
     def __init__(self):
         super().__init__()
 
@@ -176,64 +257,261 @@ class TitleIndex(Index):
         if book.title is not None:
             if book.title not in self.data:
                 self.data[book.title] = []
+                self._key_added(book.title)
             if book not in self.data[book.title]:
                 self.data[book.title].append(book)
+                self.generation += 1
 
     def remove(self, book: Book) -> None:
         if book.title is not None and book.title in self.data:
             if book in self.data[book.title]:
                 self.data[book.title].remove(book)
+                self.generation += 1
                 if not self.data[book.title]:
                     del self.data[book.title]
+                    self._key_removed(book.title)
 
     def search(self, title: str) -> list[Book]:
         return self.data.get(title, [])
 
+    def __repr__(self):
+        return f"TitleIndex({len(self)} titles)"
+
+class FunctionIndex(Index):
+    """Пользовательский индекс по ключу key_fn(book).
+
+    При multi=True key_fn возвращает несколько ключей, и книга попадает в список каждого.
+    Ленивый индекс строится при первом запросе; до этого изменения коллекции его не трогают
+    """
+
+    def __init__(self, name: str, key_fn: Callable[[Book], Any], multi: bool = False,
+                 source: Optional[Callable[[], Iterable[Book]]] = None):
+        super().__init__()
+        self.name = name
+        self.key_fn = key_fn
+        self.multi = multi
+        self.source = source    # все книги коллекции - для построения
+        self.built = False
+        self.queries = 0
+
+    def keys(self, book: Book) -> Iterable[Any]:
+        if self.multi:
+            return [key for key in dict.fromkeys(self.key_fn(book)) if key is not None]
+        key = self.key_fn(book)
+        return (key,) if key is not None else ()
+
+    def build(self) -> None:
+        """Построение по всем книгам одним проходом"""
+        data: dict = {}
+        for book in self.source() if self.source is not None else ():
+            for key in self.keys(book):
+                postings = data.get(key)
+                if postings is None:
+                    data[key] = [book]
+                else:
+                    postings.append(book)
+        self.data = data
+        self.built = True
+        self.generation += 1
+        if self.fuzzy is not None:
+            self.fuzzy = None
+            self.enable_fuzzy()
+
+    def release(self) -> None:
+        """Освобождение памяти: индекс становится ленивым и перестроится при следующем запросе"""
+        self.data = {}
+        self._all_books = []
+        self.fuzzy = None
+        self.built = False
+        self.generation += 1
+
+    def add_new(self, book: Book) -> None:
+        if not self.built:
+            # кэшированные результаты find по этому индексу устаревают и без построения
+            self.generation += 1
+            return
+        for key in self.keys(book):
+            postings = self.data.get(key)
+            if postings is None:
+                self.data[key] = [book]
+                self._key_added(key)
+            else:
+                postings.append(book)
+        self.generation += 1
+
+    def add(self, book: Book) -> None:
+        if not self.built:
+            self.generation += 1
+            return
+        for key in self.keys(book):
+            if key not in self.data:
+                self.data[key] = []
+                self._key_added(key)
+            if book not in self.data[key]:
+                self.data[key].append(book)
+        self.generation += 1
+
+    def remove(self, book: Book) -> None:
+        if not self.built:
+            self.generation += 1
+            return
+        for key in self.keys(book):
+            if key in self.data and book in self.data[key]:
+                self.data[key].remove(book)
+                if not self.data[key]:
+                    del self.data[key]
+                    self._key_removed(key)
+        self.generation += 1
+
+    def matches(self, book: Book, key: Any) -> bool:
+        return key in self.keys(book)
+
+    def search(self, key: Any) -> list[Book]:
+        self.queries += 1
+        if not self.built:
+            self.build()
+        return self.data.get(key, [])
+
+    def page(self, key: Any, cursor: Optional[tuple] = None, size: int = DEFAULT_PAGE_SIZE) -> Page:
+        if not self.built:
+            self.build()
+        return super().page(key, cursor, size)
+
     def get_all(self) -> list[Book]:
-        all_books = []
-        for books_list in self.data.values():
-            all_books.extend(books_list)
-        return all_books
+        if not self.built:
+            self.build()
+        return super().get_all()
+
+    def enable_fuzzy(self) -> TrigramIndex:
+        if not self.built:
+            self.build()
+        return super().enable_fuzzy()
 
     def __repr__(self):
-        return f"TitleIndex({len(self)} titles)"
+        state = f"{len(self)} keys" if self.built else "not built"
+        return f"FunctionIndex('{self.name}', {state}, {self.queries} queries)"
 
-class IndexDict():
-    def __init__(self):
-        self.group_by_isbn: dict[str, Book] = {}
+class CustomIndexes(ABC):
+    """Пользовательские индексы FunctionIndex: общая часть IndexDict и SQLiteIndexDict.
+
+    Наследник хранит индексы в памяти в indexes и custom_indexes и отдает все книги через _source
+    """
+    indexes: dict
+    custom_indexes: dict[str, FunctionIndex]
+
+    @abstractmethod
+    def _source(self) -> Iterable[Book]:
+        """Все книги хранилища (для построения индексов)"""
+
+    def register_index(self, name: str, key_fn: Callable[[Book], Any], multi: bool = False,
+                       lazy: bool = False) -> FunctionIndex:
+        """Регистрация пользовательского индекса по key_fn(book), например по десятилетию.
+
+        Строится сразу по всем книгам (или при первом запросе, если lazy) и
+        дальше обновляется вместе со встроенными индексами
+        """
+        if name in self.indexes or name in INDEXED_FIELDS:
+            raise LibraryException(f"Index '{name}' already exists")
+        index = FunctionIndex(name, key_fn, multi, self._source)
+        if not lazy:
+            index.build()
+        self.indexes[name] = self.custom_indexes[name] = index
+        return index
+
+    def drop_index(self, name: str) -> None:
+        """Удаление пользовательского индекса (встроенные удалить нельзя)"""
+        if name not in self.custom_indexes:
+            raise LibraryException(f"Unknown custom index '{name}'")
+        del self.custom_indexes[name]
+        del self.indexes[name]
+
+    def release_unused_indexes(self, min_queries: int = 1) -> list[str]:
+        """Освобождение пользовательских индексов, к которым было меньше min_queries запросов
+        с прошлого вызова; они перестроятся при следующем запросе. Счетчики обнуляются
+        """
+        released = []
+        for name, index in self.custom_indexes.items():
+            if index.built and index.queries < min_queries:
+                index.release()
+                released.append(name)
+            index.queries = 0
+        return released
+
+    def index_stats(self) -> dict:
+        """Пользовательские индексы: число ключей, запросов и признак построения"""
+        return {
+            name: {'built': index.built, 'keys': len(index), 'queries': index.queries}
+            for name, index in self.custom_indexes.items()
+        }
+
+
+class IndexDict(CustomIndexes):
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        # ключи - канонические ISBN (целые числа, см. src/isbn.py), нестандартные идентификаторы - строки
+        self.group_by_isbn: dict[IsbnKey, Book] = {}
         self.group_by_title = TitleIndex()
         self.group_by_author = AuthorIndex()
         self.group_by_genre = GenreIndex()
         self.group_by_year = YearIndex()
+        self.indexes: dict[str, Index] = {
+            'title': self.group_by_title,
+            'author': self.group_by_author,
+            'genre': self.group_by_genre,
+            'year': self.group_by_year,
+        }
+        self.custom_indexes: dict[str, FunctionIndex] = {}
+        self.query_cache = QueryCache(cache_size)
 
     def __iter__(self):
         for isbn, book in self.group_by_isbn.items():
             yield book
 
+    def _source(self) -> Iterable[Book]:
+        return self.group_by_isbn.values()
+
     def add_book(self, book: Book) -> None:
         """Добавление книги во все индексы"""
         if (book.isbn is not None and book.author is not None and
             book.year is not None and book.genre is not None and
             book.title is not None):
 
-            self.group_by_isbn[book.isbn] = book
+            key = isbn_key(book.isbn)
+            if key not in self.group_by_isbn:
+                # новый ISBN: книги нет ни в одном индексе, проверка дубликатов не нужна
+                self.group_by_isbn[key] = book
+                for index in self.indexes.values():
+                    index.add_new(book)
+                return
+            self.group_by_isbn[key] = book
             self.group_by_author.add(book)
             self.group_by_year.add(book)
             self.group_by_genre.add(book)
             self.group_by_title.add(book)
+            for index in self.custom_indexes.values():
+                index.add(book)
 
     def delete_book(self, book: Book) -> None:
         """Удаление книги из всех индексов"""
-        if book.isbn in self.group_by_isbn:
-            self.group_by_isbn.pop(book.isbn)
+        if book.isbn is not None:
+            self.group_by_isbn.pop(isbn_key(book.isbn), None)
 
         self.group_by_author.remove(book)
         self.group_by_year.remove(book)
         self.group_by_genre.remove(book)
         self.group_by_title.remove(book)
+        for index in self.custom_indexes.values():
+            index.remove(book)
+
+    def get_by(self, name: str, key: Any) -> list[Book]:
+        """Книги по ключу любого индекса, в том числе пользовательского"""
+        index = self.indexes.get(name)
+        if index is None:
+            raise LibraryException(f"Unknown index '{name}'")
+        return index.search(key)
 
     def get_by_isbn(self, isbn: str) -> Optional[Book]:
-        return self.group_by_isbn.get(isbn)
+        """Книга по ISBN в любой записи (ISBN-10 или ISBN-13, с дефисами или без)"""
+        return self.group_by_isbn.get(isbn_key(isbn))
 
     def get_by_author(self, author: str) -> list[Book]:
         return self.group_by_author.search(author)
@@ -247,6 +525,45 @@ class IndexDict():
     def get_by_year(self, year: int) -> list[Book]:
         return self.group_by_year.search(year)
 
+    def find(self, **filters) -> list[Book]:
+        """Поиск по нескольким индексам сразу (title, author, genre, year и пользовательские) с кэшированием"""
+        if not filters:
+            raise LibraryException("At least one filter is required")
+        for name in filters:
+            if name not in self.indexes:
+                raise LibraryException(f"Unknown index '{name}'")
+        key = tuple(sorted(filters.items()))
+        generations = tuple(self.indexes[name].generation for name, _ in key)
+        cached = self.query_cache.get(key, generations)
+        if cached is not MISSING:
+            for name in filters:
+                if name in self.custom_indexes:
+                    self.custom_indexes[name].queries += 1
+            # копия: изменение результата вызывающим не должно портить кэш
+            return cached.copy()
+        # перебираем самый короткий список и проверяем остальные поля у книги
+        postings = {name: self.indexes[name].search(value) for name, value in key}
+        name = min(postings, key=lambda name: len(postings[name]))
+        result = [
+            book for book in postings[name]
+            if all(self.indexes[other].matches(book, v) for other, v in key)
+        ]
+        # поколения после поиска: ленивый индекс мог только что построиться
+        self.query_cache.put(key, tuple(self.indexes[name].generation for name, _ in key), result)
+        return result.copy()
+
+    def cache_stats(self) -> dict:
+        """Статистика кэша запросов"""
+        return self.query_cache.stats()
+
+    def get_by_author_fuzzy(self, author: str, max_distance: int = 2, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Авторы, похожие на запрос (с опечатками), по возрастанию расстояния"""
+        return self.group_by_author.search_fuzzy(author, max_distance, limit)
+
+    def get_by_title_fuzzy(self, title: str, max_distance: int = 2, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Названия, похожие на запрос (с опечатками), по возрастанию расстояния"""
+        return self.group_by_title.search_fuzzy(title, max_distance, limit)
+
     def book_count(self) -> int:
         return len(self.group_by_isbn)
 
@@ -267,7 +584,44 @@ class BookCollection():
     def __init__(self, collection_name=None):
         self.index_dict = IndexDict()
         self.items: list[tuple] = [] # (book, count)
+        # номера позиций записей items в порядке добавления (возрастают, при удалениях не сдвигаются)
+        self.positions = array('Q')
+        self._next_position = 1
         self.collection_name = collection_name
+        # обработчики, вызываемые после поступления экземпляров: f(book, count)
+        self.add_listeners: list[Callable[[Book, int], None]] = []
+        self.facets = FacetCounts()
+        # журнал отката активной транзакции (см. src/transactions.py)
+        self.journal: Optional[Any] = None
+        # список items виден из снимка и копируется перед следующим изменением
+        self._items_shared = False
+        # журнал изменений для реплик (см. src/change_feed.py)
+        self.feed: Optional[Any] = None
+        # история остатков для запросов на момент времени (см. src/history.py)
+        self.history: Optional[Any] = None
+        # фильтр ISBN для быстрого ответа "такой книги нет"
+        self.isbn_filter: Optional[ScalableCuckooFilter] = None
+        # хеши состояния для сравнения реплик (см. src/replication.py)
+        self.state_hashes: Optional[Any] = None
+
+    def enable_isbn_filter(self, capacity: Optional[int] = None) -> ScalableCuckooFilter:
+        """Включение фильтра кукушки по ISBN книг коллекции (для запросов отсутствующих книг)"""
+        if self.isbn_filter is None:
+            isbn_filter = ScalableCuckooFilter(capacity or max(DEFAULT_CAPACITY, 2 * len(self.items)))
+            for book, _ in self.items:
+                isbn_filter.add(isbn_key(book.isbn))
+            self.isbn_filter = isbn_filter
+        return self.isbn_filter
+
+    def share_items(self) -> list[tuple]:
+        """Текущий список items для снимка без копирования (копия при записи)"""
+        self._items_shared = True
+        return self.items
+
+    def _own_items(self) -> None:
+        if self._items_shared:
+            self.items = self.items.copy()
+            self._items_shared = False
 
     def __add__(self, other):
         new_collection = BookCollection()
@@ -275,16 +629,23 @@ class BookCollection():
             new_collection.add_book(book, count)
         return new_collection
 
+    @replicated('collection')
     def __setitem__(self, index: int, book: Book):
         if not isinstance(book, Book):
             raise LibraryException("Can only assign Book objects")
         old_book, old_count = self.items[index]
+        if self.journal is not None:
+            self.journal.append(partial(self._undo_item, index % len(self.items), (old_book, old_count), (book, old_count)))
         self.index_dict.delete_book(old_book)
+        self._own_items()
         self.items[index] = (book, old_count) # с сохранением количества
         self.index_dict.add_book(book)
+        self._stock_removed(old_book, old_count, True)
+        self._stock_added(book, old_count, True)
 
-    def validate_book(self, book: Book) -> None:
-        """Валидация полученных полей"""
+    @staticmethod
+    def validate_book(book: Book) -> None:
+        """Валидация полученных полей (не зависит от состояния коллекции)"""
         title = book.title
         author = book.author
         year = book.year
@@ -301,69 +662,233 @@ class BookCollection():
         if not isinstance(year, int):
             raise LibraryException(f"Year must be an integer, found {type(year)}: {year}")
 
-    def add_book(self, book: Book, count=1) -> str:
+    @replicated('collection')
+    def add_book(self, book: Book, count=1) -> OperationResult:
         """Добавление книги"""
         if count <= 0:
             raise LibraryException("Count must be positive")
         self.validate_book(book)
-        for i, (existing_book, existing_count) in enumerate(self.items):
-            if existing_book.isbn == book.isbn:
-                if existing_book.is_identical(book):
-                    self.items[i] = (existing_book, existing_count + count)
-                    return f"{COLORS.GREEN}Book '{book.title}' is already in collection '{self.collection_name}', added items: {count}, summary items: {existing_count+count}{COLORS.RESET}"
-                else:
-                    raise LibraryException(
-                        f"ISBN conflict: {book.isbn}\n"
-                        f"Existing: {existing_book}\n"
-                        f"New: {book}"
-                    )
+        result = self._add_validated(book, count)
+        self._notify_added(book, count)
+        return result
+
+    @replicated('collection')
+    def add_prevalidated(self, books: Iterable[tuple[Book, int]]) -> list[tuple[int, str]]:
+        """Пакетное добавление уже проверенных книг (без повторной валидации).
+
+        Возвращает ошибки (позиция в пакете, причина), например конфликты ISBN
+        """
+        errors = []
+        for position, (book, count) in enumerate(books):
+            try:
+                self._add_validated(book, count)
+            except LibraryException as e:
+                errors.append((position, e.message))
+            else:
+                self._notify_added(book, count)
+        return errors
+
+    def _notify_added(self, book: Book, count: int) -> None:
+        for listener in self.add_listeners:
+            listener(book, count)
+
+    def _position(self, book: Book) -> int:
+        """Позиция записи с тем же ISBN в любой записи (ISBN-10/13, дефисы) или -1"""
+        indexed = self.index_dict.get_by_isbn(book.isbn) # type: ignore
+        if len(self.index_dict) == len(self.items):
+            # индекс согласован с items: книгу без ISBN в индексе искать не нужно
+            if indexed is not None:
+                for i, (existing_book, _) in enumerate(self.items):
+                    if existing_book is indexed:
+                        return i
+            return -1
+        # индекс рассинхронизирован через __setitem__ (книги без части полей) - сравнение ключей
+        key = isbn_key(book.isbn) # type: ignore
+        for i, (existing_book, _) in enumerate(self.items):
+            if existing_book is indexed or isbn_key(existing_book.isbn) == key: # type: ignore
+                return i
+        return -1
+
+    def _add_validated(self, book: Book, count: int) -> OperationResult:
+        i = self._position(book)
+        if i >= 0:
+            existing_book, existing_count = self.items[i]
+            # тот же ISBN в другой записи - та же книга, если остальные поля совпадают
+            if not same_book(existing_book, book):
+                raise LibraryException(
+                    f"ISBN conflict: {book.isbn}\n"
+                    f"Existing: {existing_book}\n"
+                    f"New: {book}"
+                )
+            if self.journal is not None:
+                self.journal.append(partial(self._undo_item, i, (existing_book, existing_count),
+                                            (existing_book, existing_count + count)))
+            self._own_items()
+            self.items[i] = (existing_book, existing_count + count)
+            self._stock_added(existing_book, count, False)
+            return OperationResult(OperationStatus.INCREMENTED, book, count, existing_count + count,
+                                   collection_name=self.collection_name)
+        if self.journal is not None:
+            self.journal.append(partial(self._undo_item, len(self.items), None, (book, count)))
+        self._own_items()
         self.items.append((book, count))
+        self.positions.append(self._next_position)
+        self._next_position += 1
         self.index_dict.add_book(book)
-        return f"{COLORS.GREEN}Book '{book.title}' added to collection '{self.collection_name}', number of items: {count}{COLORS.RESET}"
+        self._stock_added(book, count, True)
+        return OperationResult(OperationStatus.ADDED, book, count, count, collection_name=self.collection_name)
 
-    def delete_book(self, book: Book, count=1)-> str:
+    @replicated('collection')
+    def delete_book(self, book: Book, count=1)-> OperationResult:
         """Удаление книги"""
         if count <= 0:
             raise LibraryException("Count must be positive")
-        for i, (existing_book, existing_count) in enumerate(self.items):
-            if existing_book.isbn == book.isbn:
-                if count < existing_count:
-                    self.items[i] = (existing_book, existing_count - count)
-                    return f"{COLORS.GREEN}Book '{book.title}' deleted from collection '{self.collection_name}', number of items deleted: {count}, number of items left: {existing_count-count}{COLORS.RESET}"
-                elif count == existing_count:
-                    self.items.pop(i)
-                    self.index_dict.delete_book(book)
-                    return f"{COLORS.GREEN}Book '{book.title}' deleted from collection '{self.collection_name}', deleted all available items: {count}{COLORS.RESET}"
-                else:
-                    self.items.pop(i)
-                    self.index_dict.delete_book(book)
-                    return f"{COLORS.YELLOW}Warning: Trying to delete book '{book.title}' from collection '{self.collection_name}' in count {count}\n\t Available items count: {existing_count}\n\t Deleting all...{COLORS.RESET}"
-
-        return f"{COLORS.RED}Cannot delete book '{book.title}': not found in collection '{self.collection_name}'{COLORS.RESET}"
+        i = self._position(book)
+        if i >= 0:
+            existing_book, existing_count = self.items[i]
+            if self.journal is not None:
+                remaining = (existing_book, existing_count - count) if count < existing_count else None
+                self.journal.append(partial(self._undo_item, i, (existing_book, existing_count), remaining,
+                                            self.positions[i]))
+            if count < existing_count:
+                self._own_items()
+                self.items[i] = (existing_book, existing_count - count)
+                self._stock_removed(existing_book, count, False)
+                return OperationResult(OperationStatus.DELETED, book, count, existing_count - count,
+                                       collection_name=self.collection_name)
+            elif count == existing_count:
+                self._own_items()
+                self.items.pop(i)
+                self.positions.pop(i)
+                self.index_dict.delete_book(existing_book)
+                self._stock_removed(existing_book, count, True)
+                return OperationResult(OperationStatus.DELETED_ALL, book, count, 0,
+                                       collection_name=self.collection_name)
+            else:
+                self._own_items()
+                self.items.pop(i)
+                self.positions.pop(i)
+                self.index_dict.delete_book(existing_book)
+                self._stock_removed(existing_book, existing_count, True)
+                return OperationResult(OperationStatus.DELETED_CAPPED, book, count, existing_count,
+                                       collection_name=self.collection_name)
+
+        return OperationResult(OperationStatus.NOT_FOUND, book, count, 0, collection_name=self.collection_name)
         #raise LibraryException(f"Cannot delete book '{book.title}': not found in collection '{self.collection_name}')")
 
-    def update_book(self, old_book: Book, new_book: Book) -> str:
+    @replicated('collection')
+    def update_book(self, old_book: Book, new_book: Book) -> OperationResult:
         """Обновление данных книги с синхронизацией индексов"""
-        if old_book.isbn != new_book.isbn:
+        if isbn_key(old_book.isbn) != isbn_key(new_book.isbn): # type: ignore
             raise LibraryException("Cannot change ISBN. Use delete/add instead")
         self.validate_book(new_book)
-        for i, (existing_book, count) in enumerate(self.items):
-            if existing_book.isbn == old_book.isbn:
-                self.items[i] = (new_book, count)
-                self.index_dict.delete_book(old_book)
-                self.index_dict.add_book(new_book)
-                return f"{COLORS.GREEN}Updated book with ISBN '{old_book.isbn}' in collection '{self.collection_name}'{COLORS.RESET}"
+        i = self._position(old_book)
+        if i >= 0:
+            existing_book, count = self.items[i]
+            if self.journal is not None:
+                self.journal.append(partial(self._undo_item, i, (existing_book, count), (new_book, count)))
+            self._own_items()
+            self.items[i] = (new_book, count)
+            self.index_dict.delete_book(existing_book)
+            self.index_dict.add_book(new_book)
+            self._stock_removed(existing_book, count, True)
+            self._stock_added(new_book, count, True)
+            return OperationResult(OperationStatus.UPDATED, new_book, 0, count,
+                                   collection_name=self.collection_name)
         raise LibraryException(f"Can't update book '{old_book.title}': not found in collection")
 
+    def _stock_added(self, book: Book, count: int, new_title: bool) -> None:
+        """Учет поступления экземпляров в фасетах, истории и хешах состояния"""
+        self.facets.add(book, count, new_title)
+        if self.history is not None:
+            self.history.record(book.isbn, count)
+        if self.state_hashes is not None:
+            self.state_hashes.stock(book, count)
+        if new_title and self.isbn_filter is not None:
+            self.isbn_filter.add(isbn_key(book.isbn)) # type: ignore
+
+    def _stock_removed(self, book: Book, count: int, removed_title: bool) -> None:
+        """Учет списания экземпляров в фасетах, истории и хешах состояния"""
+        self.facets.remove(book, count, removed_title)
+        if self.history is not None:
+            self.history.record(book.isbn, -count)
+        if self.state_hashes is not None:
+            self.state_hashes.stock(book, -count)
+        if removed_title and self.isbn_filter is not None:
+            self.isbn_filter.remove(isbn_key(book.isbn)) # type: ignore
+
+    def _undo_item(self, i: int, old: Optional[tuple], new: Optional[tuple], position: int = 0) -> None:
+        """Откат изменения позиции i: old - запись до изменения, new - после (None - записи не было).
+
+        position - номер позиции удаленной записи, под которым она возвращается
+        """
+        if old is None:
+            self._own_items()
+            book, count = self.items.pop(i)
+            self.positions.pop(i)
+            self.index_dict.delete_book(book)
+            self._stock_removed(book, count, True)
+        elif new is None:
+            self._own_items()
+            self.items.insert(i, old)
+            self.positions.insert(i, position)
+            self.index_dict.add_book(old[0])
+            self._stock_added(old[0], old[1], True)
+        elif old[0] is new[0]:
+            self._own_items()
+            self.items[i] = old
+            if old[1] > new[1]:
+                self._stock_added(old[0], old[1] - new[1], False)
+            elif old[1] < new[1]:
+                self._stock_removed(old[0], new[1] - old[1], False)
+        else:
+            self._own_items()
+            self.items[i] = old
+            self.index_dict.delete_book(new[0])
+            self.index_dict.add_book(old[0])
+            self._stock_removed(new[0], new[1], True)
+            self._stock_added(old[0], old[1], True)
+
+    def get_facet(self, name: str, limit: Optional[int] = None) -> list[tuple]:
+        """Фасет коллекции (genre, author, decade): [(значение, книг, доступных экземпляров)]"""
+        if name not in self.facets.counts:
+            raise LibraryException(f"Unknown facet '{name}'")
+        return self.facets.facet(name, limit)
+
+    def facets_for(self, books: Iterable[Book], names: Optional[Iterable[str]] = None) -> dict:
+        """Фасеты по выборке книг (например, по результату find)"""
+        return self.facets.compute(books, names)
+
+    def to_columnar(self, borrowed_books: Optional[dict] = None):
+        """Колоночный снимок для аналитики (нужен numpy, см. src/columnar.py)"""
+        from src.columnar import ColumnarSnapshot
+        return ColumnarSnapshot.from_collection(self, borrowed_books)
+
     def get_all_books_with_counts(self)-> list[tuple]:
         """Получить полное содержание коллекции"""
         return self.items.copy()
 
+    def page(self, cursor: Optional[tuple] = None, size: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Страница (book, count) в порядке добавления; курсор - (номер позиции, isbn) последней записи.
+
+        Курсор устойчив к добавлению и удалению книг между страницами, продолжение - бинарный поиск
+        """
+        return positions_page(self.items, self.positions, cursor, size, _item_isbn)
+
+    def iter_pages(self, size: int = DEFAULT_PAGE_SIZE, cursor: Optional[tuple] = None) -> Iterator[Page]:
+        """Все страницы коллекции, начиная с курсора"""
+        return iter_pages(lambda next_cursor: self.page(next_cursor, size), cursor)
+
     def get_count(self, book: Book)-> int:
         """Поулчить количество экземпляров книги"""
-        for existing_book, count in self.items:
-            if existing_book.isbn == book.isbn:
-                return count
+        isbn_filter = self.isbn_filter
+        if isbn_filter is not None and not isbn_filter.might_contain(isbn_key(book.isbn)): # type: ignore
+            return 0
+        i = self._position(book)
+        if i >= 0:
+            return self.items[i][1]
+        if isbn_filter is not None:
+            isbn_filter.false_positives += 1
         return 0
 
     def total_count(self) -> int:
@@ -371,9 +896,10 @@ class BookCollection():
         return sum(count for book, count in self.items)
 
     def __contains__(self, book: Book):
-        if book in [t[0] for t in self.items]:
-            return True
-        return False
+        if self.isbn_filter is not None and not self.isbn_filter.might_contain(isbn_key(book.isbn)): # type: ignore
+            return False
+        i = self._position(book)
+        return i >= 0 and same_book(self.items[i][0], book)
 
     def __getitem__(self, key):
         if isinstance(key, int):
@@ -383,8 +909,12 @@ class BookCollection():
         elif isinstance(key, slice):
             return [i[0] for i in self.items[key]]
         elif isinstance(key, str):
+            book = self.index_dict.get_by_isbn(key)
+            if book is not None:
+                return book
+            wanted = isbn_key(key)
             for book, count in self.items:
-                if book.isbn == key:
+                if isbn_key(book.isbn) == wanted: # type: ignore
                     return book
             raise KeyError(f"Book with ISBN '{key}' not found")
         else:
@@ -397,11 +927,16 @@ class BookCollection():
         for book, count in self.items:
             yield book
 
-    def __repr__(self):
+    def write_repr(self, stream: TextIO, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        """Текстовое представление в поток постранично (память не зависит от размера коллекции)"""
         if self.collection_name is not None:
-            res = f"Collection '{self.collection_name}' Info:\n"
+            stream.write(f"Collection '{self.collection_name}' Info:")
         else:
-            res = "Collection Info:\n"
-        for book, count in self.items:
-            res += f"\tTitle: {book.title}, Author: {book.author}, ISBN: {book.isbn}, Available: {count} items\n"
-        return res.strip()
+            stream.write("Collection Info:")
+        for book, count in iter_paged(lambda cursor: self.page(cursor, page_size)):
+            stream.write(f"\n\tTitle: {book.title}, Author: {book.author}, ISBN: {book.isbn}, Available: {count} items")
+
+    def __repr__(self):
+        out = io.StringIO()
+        self.write_repr(out)
+        return out.getvalue()
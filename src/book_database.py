@@ -1,8 +1,11 @@
 from src.book_collection import Book
+from src.isbn import isbn13_check_digit
 import random
 
 def generate_isbn():
-    return f"{random.randint(0,999)}-{random.randint(0,99)}-{random.randint(0,99999)}-{random.randint(0,99)-random.randint(0,10)}"
+    """Случайный корректный ISBN-13 (группа 5 - русскоязычные издательства)"""
+    publisher, title = f"{random.randint(0, 999):03d}", f"{random.randint(0, 99999):05d}"
+    return f"978-5-{publisher}-{title}-{isbn13_check_digit('9785' + publisher + title)}"
 
 BOOKS = [
     Book("Остров сокровищ", "Роберт Льюис Стивенсон", 1883, "Приключения", generate_isbn()),
@@ -0,0 +1,176 @@
+import heapq
+import math
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_IDLE_PERIOD = timedelta(days=365)
+DEFAULT_BLOCK_SIZE = 1024
+MAX_SEGMENTS = 8
+
+# запись холодного уровня: (user_id, total_borrowed, total_returned, first_borrow_date, last_activity_date)
+ColdRecord = tuple[int, int, int, Optional[datetime], Optional[datetime]]
+
+
+def _to_timestamp(moment: Optional[datetime]) -> float:
+    return moment.timestamp() if moment is not None else math.nan
+
+
+def _from_timestamp(value: float) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if not math.isnan(value) else None
+
+
+class _Segment:
+    """Неизменяемый отсортированный по user_id набор записей, упакованный в сжатые блоки.
+
+    Каждый блок - колонки array ('q' для id и счетчиков, 'd' для дат), сжатые zlib;
+    в памяти несжатыми остаются только первые user_id блоков
+    """
+
+    __slots__ = ('first_ids', 'sizes', 'blocks')
+
+    def __init__(self, records: Iterable[ColdRecord], block_size: int, level: int):
+        self.first_ids = array('q')
+        self.sizes = array('I')
+        self.blocks: list[bytes] = []
+        block: list[ColdRecord] = []
+        for record in records:
+            block.append(record)
+            if len(block) == block_size:
+                self._pack(block, level)
+                block = []
+        if block:
+            self._pack(block, level)
+
+    def _pack(self, block: list[ColdRecord], level: int) -> None:
+        ids, borrowed, returned, first, last = zip(*block)
+        columns = (array('q', ids).tobytes() + array('q', borrowed).tobytes() + array('q', returned).tobytes()
+                   + array('d', map(_to_timestamp, first)).tobytes() + array('d', map(_to_timestamp, last)).tobytes())
+        self.first_ids.append(ids[0])
+        self.sizes.append(len(block))
+        self.blocks.append(zlib.compress(columns, level))
+
+    def _unpack(self, i: int) -> tuple[int, memoryview, memoryview]:
+        """Распакованный блок без копирования колонок: (размер, целые колонки, колонки дат)"""
+        data = memoryview(zlib.decompress(self.blocks[i]))
+        size = self.sizes[i]
+        return size, data[:24 * size].cast('q'), data[24 * size:].cast('d')
+
+    @staticmethod
+    def _record(size: int, ints: memoryview, dates: memoryview, j: int) -> ColdRecord:
+        return (ints[j], ints[size + j], ints[2 * size + j],
+                _from_timestamp(dates[j]), _from_timestamp(dates[size + j]))
+
+    def get(self, user_id: int) -> Optional[ColdRecord]:
+        i = bisect_right(self.first_ids, user_id) - 1
+        if i < 0:
+            return None
+        size, ints, dates = self._unpack(i)
+        # первые size целых - отсортированные user_id блока
+        j = bisect_left(ints, user_id, 0, size)
+        if j < size and ints[j] == user_id:
+            return self._record(size, ints, dates, j)
+        return None
+
+    def __iter__(self) -> Iterator[ColdRecord]:
+        for i in range(len(self.blocks)):
+            size, ints, dates = self._unpack(i)
+            for j in range(size):
+                yield self._record(size, ints, dates, j)
+
+    def __len__(self) -> int:
+        return sum(self.sizes)
+
+    def memory_bytes(self) -> int:
+        return (sum(len(block) for block in self.blocks) + self.first_ids.itemsize * len(self.first_ids)
+                + self.sizes.itemsize * len(self.sizes))
+
+
+def _tagged(segment: _Segment, order: int) -> Iterator[tuple[int, int, ColdRecord]]:
+    for record in segment:
+        yield record[0], order, record
+
+
+class ColdBorrowerStore:
+    """Холодный уровень читателей без книг на руках: упакованные сжатые сегменты вместо BorrowerInfo.
+
+    Каждое вытеснение добавляет сегмент; когда сегментов больше MAX_SEGMENTS,
+    они сливаются в один (с удалением возвращенных в память записей)
+    """
+
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE, level: int = 1):
+        if block_size <= 0:
+            raise ValueError("Block size must be positive")
+        self.block_size = block_size
+        self.level = level
+        self.segments: list[_Segment] = []   # от старых к новым
+        self.removed: set[int] = set()        # user_id, возвращенные в память после попадания в сегмент
+        self.count = 0
+        self.faults = 0
+
+    def put_many(self, records: Iterable[ColdRecord]) -> int:
+        """Добавление записей одним сегментом; возвращает число записей"""
+        records = sorted(records, key=itemgetter(0))
+        if not records:
+            return 0
+        for record in records:
+            self.removed.discard(record[0])
+        self.segments.append(_Segment(records, self.block_size, self.level))
+        self.count += len(records)
+        if len(self.segments) > MAX_SEGMENTS:
+            self.compact()
+        return len(records)
+
+    def get(self, user_id: int) -> Optional[ColdRecord]:
+        if user_id in self.removed:
+            return None
+        for segment in reversed(self.segments):
+            record = segment.get(user_id)
+            if record is not None:
+                return record
+        return None
+
+    def pop(self, user_id: int) -> Optional[ColdRecord]:
+        """Извлечение записи для возврата читателя в память"""
+        record = self.get(user_id)
+        if record is not None:
+            self.removed.add(user_id)
+            self.count -= 1
+            self.faults += 1
+        return record
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) is not None
+
+    def __iter__(self) -> Iterator[ColdRecord]:
+        """Актуальные записи по возрастанию user_id"""
+        seen = None
+        # при равных user_id первой идет запись из более нового сегмента
+        streams = [_tagged(segment, -age) for age, segment in enumerate(self.segments)]
+        for user_id, _, record in heapq.merge(*streams):
+            if user_id == seen:
+                continue
+            seen = user_id
+            if user_id not in self.removed:
+                yield record
+
+    def compact(self) -> None:
+        """Слияние сегментов в один"""
+        merged = _Segment(iter(self), self.block_size, self.level)
+        self.segments = [merged] if merged.blocks else []
+        self.removed.clear()
+        self.count = len(merged)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def memory_bytes(self) -> int:
+        return sum(segment.memory_bytes() for segment in self.segments) + sys.getsizeof(self.removed)
+
+    def __repr__(self):
+        return (f"ColdBorrowerStore({self.count} borrowers, {len(self.segments)} segments, "
+                f"{self.memory_bytes()} bytes)")
@@ -0,0 +1,211 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO, Union
+from src.book_collection import Book, BookCollection, LibraryException
+from src.library import Library
+
+DEFAULT_CHUNK_SIZE = 10000
+
+BOOK_FIELDS = ('title', 'author', 'year', 'genre', 'isbn', 'count')
+LOAN_FIELDS = ('title', 'author', 'year', 'genre', 'isbn', 'user_id', 'count')
+
+Source = Union[str, os.PathLike, TextIO]
+
+
+@dataclass
+class ImportReport:
+    """Итог импорта"""
+    rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+
+    def __repr__(self):
+        return f"ImportReport({self.rows} rows, {self.imported} imported, {self.rejected} rejected)"
+
+
+@contextmanager
+def _open(target: Optional[Source], mode: str) -> Iterator[Optional[TextIO]]:
+    """Открыть путь или использовать уже открытый файл как есть"""
+    if target is None or hasattr(target, 'write') or hasattr(target, 'read'):
+        yield target # type: ignore
+    else:
+        with open(target, mode, encoding='utf-8', newline='') as f: # type: ignore
+            yield f
+
+
+def _detect_format(target: Optional[Source], fmt: Optional[str]) -> str:
+    if fmt is None:
+        name = str(getattr(target, 'name', target) or '')
+        fmt = 'jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv'
+    if fmt not in ('csv', 'jsonl'):
+        raise LibraryException(f"Unknown format '{fmt}', expected 'csv' or 'jsonl'")
+    return fmt
+
+
+def _read_records(f: TextIO, fmt: str) -> Iterator[tuple[int, Any, Optional[dict]]]:
+    """Построчное чтение: (номер строки, исходная запись, словарь полей или None)"""
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row, {k: (v if v != '' else None) for k, v in row.items()}
+    else:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield line_num, line.rstrip('\n'), None
+                continue
+            yield line_num, record, record if isinstance(record, dict) else None
+
+
+class _RejectWriter:
+    """Запись отклоненных строк вместе с причиной"""
+
+    def __init__(self, f: Optional[TextIO], fmt: str, fields: tuple):
+        self.f = f
+        self.fmt = fmt
+        self.writer: Optional[Any] = None
+        if f is not None and fmt == 'csv':
+            self.writer = csv.DictWriter(f, fieldnames=('line', 'reason') + fields, extrasaction='ignore')
+            self.writer.writeheader()
+
+    def write(self, line_num: int, raw: Any, reason: str) -> None:
+        if self.f is None:
+            return
+        if self.writer is not None:
+            row = dict(raw) if isinstance(raw, dict) else {}
+            row.update(line=line_num, reason=reason)
+            self.writer.writerow(row)
+        else:
+            self.f.write(json.dumps({'line': line_num, 'reason': reason, 'record': raw}, ensure_ascii=False) + "\n")
+
+
+def _to_int(value: Any) -> Any:
+    """Преобразование в int; некорректное значение остается как есть для validate_book"""
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _book_from_record(record: dict) -> Book:
+    return Book(
+        title=record.get('title'),
+        author=record.get('author'),
+        year=_to_int(record.get('year')),
+        genre=record.get('genre'),
+        isbn=record.get('isbn'),
+    )
+
+
+def _positive_int(record: dict, field: str, default: Optional[int] = None) -> int:
+    value = record.get(field)
+    if value is None and default is not None:
+        return default
+    value = _to_int(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise LibraryException(f"{field} must be an integer, found {type(value)}: {value}")
+    if value <= 0:
+        raise LibraryException(f"{field.replace('_', ' ').capitalize()} must be positive, found {value}")
+    return value
+
+
+def _import(source: Source, rejects: Optional[Source], fmt: Optional[str], chunk_size: int,
+            fields: tuple, apply: Callable[[dict], None]) -> ImportReport:
+    """Общий цикл импорта: чтение пачками, применение, отбраковка"""
+    if chunk_size <= 0:
+        raise LibraryException("Chunk size must be positive")
+    fmt = _detect_format(source, fmt)
+    report = ImportReport()
+    with _open(source, 'r') as f, _open(rejects, 'w') as rf:
+        reject_writer = _RejectWriter(rf, fmt, fields)
+        records = _read_records(f, fmt) # type: ignore
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            for line_num, raw, record in chunk:
+                report.rows += 1
+                if record is None:
+                    reject_writer.write(line_num, raw, "Malformed record")
+                    report.rejected += 1
+                    continue
+                try:
+                    apply(record)
+                except LibraryException as e:
+                    reject_writer.write(line_num, raw, e.message)
+                    report.rejected += 1
+                else:
+                    report.imported += 1
+    return report
+
+
+def _export(target: Source, fmt: Optional[str], fields: tuple, rows: Iterable[tuple]) -> int:
+    fmt = _detect_format(target, fmt)
+    written = 0
+    with _open(target, 'w') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f) # type: ignore
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow(row)
+                written += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n") # type: ignore
+                written += 1
+    return written
+
+
+def import_books(collection: BookCollection, source: Source, rejects: Optional[Source] = None,
+                 fmt: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportReport:
+    """Потоковый импорт книг (с количеством экземпляров) в коллекцию"""
+    def apply(record: dict) -> None:
+        book = _book_from_record(record)
+        count = _positive_int(record, 'count', default=1)
+        collection.add_book(book, count)
+    return _import(source, rejects, fmt, chunk_size, BOOK_FIELDS, apply)
+
+
+def export_books(collection: BookCollection, target: Source, fmt: Optional[str] = None) -> int:
+    """Потоковый экспорт книг коллекции с количеством экземпляров"""
+    rows = (
+        (book.title, book.author, book.year, book.genre, book.isbn, count)
+        for book, count in collection.items
+    )
+    return _export(target, fmt, BOOK_FIELDS, rows)
+
+
+def import_loans(library: Library, source: Source, rejects: Optional[Source] = None,
+                 fmt: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportReport:
+    """Потоковый импорт выданных книг без изменения коллекции.
+
+    Каждая строка проходит через Library.register_loan (журнал изменений, экземпляры,
+    статистика и индекс сроков); срок возврата в файле не хранится, поэтому отсчитывается
+    loan_period от импорта
+    """
+    def apply(record: dict) -> None:
+        book = _book_from_record(record)
+        library.collection.validate_book(book)
+        user_id = _positive_int(record, 'user_id')
+        count = _positive_int(record, 'count', default=1)
+        library.register_loan(book, user_id, count)
+    return _import(source, rejects, fmt, chunk_size, LOAN_FIELDS, apply)
+
+
+def export_loans(library: Library, target: Source, fmt: Optional[str] = None) -> int:
+    """Потоковый экспорт выданных книг: по строке на пару (книга, читатель)"""
+    rows = (
+        (book.title, book.author, book.year, book.genre, book.isbn, user_id, count)
+        for book, users in library.borrowed_books.items()
+        for user_id, count in users.items()
+    )
+    return _export(target, fmt, LOAN_FIELDS, rows)
@@ -0,0 +1,102 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import partial, wraps
+from itertools import count as counter
+from typing import Any, Callable, Iterator, Optional
+
+
+@dataclass(frozen=True)
+class Change:
+    """Запись журнала изменений: операция над библиотекой или коллекцией"""
+    seq: int
+    target: str          # 'library' или 'collection'
+    op: str              # имя публичного метода
+    args: tuple
+    kwargs: dict = field(default_factory=dict)
+
+
+class ChangeFeed:
+    """Журнал изменений с монотонными номерами.
+
+    Записываются только операции верхнего уровня: вложенные вызовы (например,
+    поступление экземпляров при возврате и выдача по заявке) повторяются на
+    реплике сами при применении внешней операции. maxlen ограничивает число
+    хранимых записей; отставшей дальше реплике нужна полная синхронизация
+    """
+
+    def __init__(self, maxlen: Optional[int] = None):
+        if maxlen is not None and maxlen <= 0:
+            raise ValueError("maxlen must be positive")
+        self.maxlen = maxlen
+        self.entries: list[Change] = []
+        self.depth = 0           # глубина вложенности операций, которые сейчас выполняются
+        self.trimmed_seq = 0     # последний номер, удаленный из журнала
+        self._seq = counter(1)
+
+    def append(self, target: str, op: str, args: tuple, kwargs: dict) -> Change:
+        change = Change(next(self._seq), target, op, args, kwargs)
+        entries = self.entries
+        entries.append(change)
+        if self.maxlen is not None and len(entries) >= 2 * self.maxlen:
+            # амортизированная обрезка: одна операция среза на maxlen записей
+            self.trimmed_seq = entries[-self.maxlen - 1].seq
+            del entries[:-self.maxlen]
+        return change
+
+    def retract(self, seq: int) -> None:
+        """Удалить запись (откат транзакции); номер повторно не выдается"""
+        entries = self.entries
+        if entries and entries[-1].seq == seq:
+            entries.pop()
+            return
+        position = bisect_right(entries, seq, key=lambda change: change.seq) - 1
+        if position >= 0 and entries[position].seq == seq:
+            del entries[position]
+
+    @property
+    def last_seq(self) -> int:
+        """Номер последней записи (0 - журнал пуст)"""
+        return self.entries[-1].seq if self.entries else self.trimmed_seq
+
+    def since(self, seq: int) -> Optional[list[Change]]:
+        """Записи с номером больше seq (None - часть из них уже удалена из журнала)"""
+        if seq < self.trimmed_seq:
+            return None
+        return self.entries[bisect_right(self.entries, seq, key=lambda change: change.seq):]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"ChangeFeed({len(self.entries)} changes, last seq {self.last_seq})"
+
+
+def replicated(target: str) -> Callable:
+    """Декоратор публичной операции: успешный вызов верхнего уровня попадает в журнал изменений.
+
+    Объект хранит журнал в атрибуте feed (None - журнал выключен)
+    """
+    def decorator(method: Callable) -> Callable:
+        op = method.__name__
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            feed = self.feed
+            if feed is None:
+                return method(self, *args, **kwargs)
+            top_level = feed.depth == 0
+            if top_level:
+                # одноразовые итераторы сохраняются списком, чтобы операцию можно было повторить
+                args = tuple(list(arg) if isinstance(arg, Iterator) else arg for arg in args)
+            feed.depth += 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                feed.depth -= 1
+            if top_level and getattr(result, 'ok', True):
+                change = feed.append(target, op, args, kwargs)
+                if self.journal is not None:
+                    self.journal.append(partial(feed.retract, change.seq))
+            return result
+        return wrapper
+    return decorator
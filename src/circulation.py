@@ -0,0 +1,125 @@
+import heapq
+from collections import Counter
+from datetime import datetime
+from typing import Any, Optional
+from src.book_collection import Book, LibraryException
+
+BORROW = 'borrow'
+RETURN = 'return'
+_KINDS = (BORROW, RETURN)
+
+DEFAULT_BUCKET_SECONDS = 3600
+DEFAULT_NUM_BUCKETS = 24 * 7
+
+
+class _Bucket:
+    """Агрегаты событий за один интервал времени"""
+
+    __slots__ = ('epoch', 'totals', 'books', 'genres')
+
+    def __init__(self):
+        self.epoch = -1
+        self.totals = {BORROW: 0, RETURN: 0}
+        self.books: dict[str, Counter] = {BORROW: Counter(), RETURN: Counter()}
+        self.genres: dict[str, Counter] = {BORROW: Counter(), RETURN: Counter()}
+
+    def reset(self, epoch: int) -> None:
+        self.epoch = epoch
+        for kind in _KINDS:
+            self.totals[kind] = 0
+            self.books[kind].clear()
+            self.genres[kind].clear()
+
+
+class EventStore:
+    """Хранилище событий выдачи и возврата с агрегатами по интервалам.
+
+    Кольцевой буфер из num_buckets интервалов по bucket_seconds секунд.
+    Старые интервалы перезаписываются, поэтому память ограничена, а запросы
+    за окно обходят только интервалы окна, а не всю историю
+    """
+
+    def __init__(self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS, num_buckets: int = DEFAULT_NUM_BUCKETS):
+        if bucket_seconds <= 0 or num_buckets <= 0:
+            raise LibraryException("Bucket size and number of buckets must be positive")
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.buckets = [_Bucket() for _ in range(num_buckets)]
+        self.latest_epoch = -1
+        self.dropped = 0
+
+    def _epoch(self, when: datetime) -> int:
+        return int(when.timestamp()) // self.bucket_seconds
+
+    def record(self, kind: str, book: Book, count: int = 1, when: Optional[datetime] = None) -> None:
+        """Учесть событие (borrow или return)"""
+        if kind not in _KINDS:
+            raise LibraryException(f"Unknown event kind '{kind}'")
+        epoch = self._epoch(when or datetime.now())
+        if epoch <= self.latest_epoch - self.num_buckets:
+            # событие старше окна хранения
+            self.dropped += 1
+            return
+        bucket = self.buckets[epoch % self.num_buckets]
+        if bucket.epoch != epoch:
+            bucket.reset(epoch)
+        self.latest_epoch = max(self.latest_epoch, epoch)
+        bucket.totals[kind] += count
+        bucket.books[kind][book] += count
+        if book.genre is not None:
+            bucket.genres[kind][book.genre] += count
+
+    def _window(self, window_seconds: int, now: Optional[datetime]) -> list[_Bucket]:
+        span = -(-window_seconds // self.bucket_seconds)
+        if span <= 0:
+            raise LibraryException("Window must be positive")
+        if span > self.num_buckets:
+            raise LibraryException(
+                f"Window of {window_seconds}s exceeds retention of {self.bucket_seconds * self.num_buckets}s"
+            )
+        end = self._epoch(now) if now is not None else self.latest_epoch
+        result = []
+        for epoch in range(end - span + 1, end + 1):
+            bucket = self.buckets[epoch % self.num_buckets]
+            if bucket.epoch == epoch:
+                result.append(bucket)
+        return result
+
+    def _top(self, attr: str, window_seconds: int, k: int, kind: str, now: Optional[datetime]) -> list[tuple[Any, int]]:
+        totals: Counter = Counter()
+        for bucket in self._window(window_seconds, now):
+            totals.update(getattr(bucket, attr)[kind])
+        # после отката транзакции в счетчиках могут остаться нули
+        positive = ((key, value) for key, value in totals.items() if value > 0)
+        return heapq.nlargest(k, positive, key=lambda item: item[1])
+
+    def top_books(self, window_seconds: int, k: int = 5, kind: str = BORROW,
+                  now: Optional[datetime] = None) -> list[tuple[Book, int]]:
+        """Самые выдаваемые книги за окно"""
+        return self._top('books', window_seconds, k, kind, now)
+
+    def top_genres(self, window_seconds: int, k: int = 5, kind: str = BORROW,
+                   now: Optional[datetime] = None) -> list[tuple[str, int]]:
+        """Самые выдаваемые жанры за окно"""
+        return self._top('genres', window_seconds, k, kind, now)
+
+    def count(self, window_seconds: int, kind: str = BORROW, book: Optional[Book] = None,
+              genre: Optional[str] = None, now: Optional[datetime] = None) -> int:
+        """Число экземпляров за окно (всего, по книге или по жанру)"""
+        total = 0
+        for bucket in self._window(window_seconds, now):
+            if book is not None:
+                total += bucket.books[kind][book]
+            elif genre is not None:
+                total += bucket.genres[kind][genre]
+            else:
+                total += bucket.totals[kind]
+        return total
+
+    def rate(self, window_seconds: int, kind: str = BORROW, book: Optional[Book] = None,
+             genre: Optional[str] = None, now: Optional[datetime] = None, per_seconds: int = 3600) -> float:
+        """Средняя интенсивность за окно (по умолчанию - экземпляров в час)"""
+        return self.count(window_seconds, kind, book, genre, now) * per_seconds / window_seconds
+
+    def __repr__(self):
+        return f"EventStore({self.num_buckets} buckets x {self.bucket_seconds}s)"
@@ -0,0 +1,189 @@
+from typing import Any, Iterable, Optional, Sequence, TYPE_CHECKING
+from src.book_collection import Book, LibraryException
+from src.isbn import isbn_key
+
+try:
+    import numpy as np
+except ImportError: # pragma: no cover
+    np = None
+
+if TYPE_CHECKING:
+    from src.book_collection import BookCollection
+
+KEY_COLUMNS = ('author', 'genre', 'year', 'decade')
+VALUE_COLUMNS = ('copies', 'loans')
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise LibraryException("Columnar analytics require numpy (pip install numpy)")
+
+
+class ColumnarSnapshot:
+    """Колоночный снимок коллекции на массивах NumPy.
+
+    Автор и жанр закодированы словарем (код - позиция в authors/genres),
+    год, число экземпляров на полке и число выданных экземпляров - целые
+    колонки. Группировки, гистограммы и top-k выполняются векторно,
+    без обхода книг в Python
+    """
+
+    def __init__(self, rows: Iterable[tuple[Book, int, int]]):
+        _require_numpy()
+        self.isbns: list[str] = []
+        self.authors: list[str] = []
+        self.genres: list[str] = []
+        author_ids: dict[str, int] = {}
+        genre_ids: dict[str, int] = {}
+        author_codes, genre_codes, years, copies, loans = [], [], [], [], []
+        for book, count, borrowed in rows:
+            self.isbns.append(book.isbn) # type: ignore
+            code = author_ids.get(book.author) # type: ignore
+            if code is None:
+                code = author_ids[book.author] = len(self.authors) # type: ignore
+                self.authors.append(book.author) # type: ignore
+            author_codes.append(code)
+            code = genre_ids.get(book.genre) # type: ignore
+            if code is None:
+                code = genre_ids[book.genre] = len(self.genres) # type: ignore
+                self.genres.append(book.genre) # type: ignore
+            genre_codes.append(code)
+            years.append(book.year)
+            copies.append(count)
+            loans.append(borrowed)
+        self.author = np.array(author_codes, dtype=np.int32)
+        self.genre = np.array(genre_codes, dtype=np.int32)
+        self.year = np.array(years, dtype=np.int32)
+        self.copies = np.array(copies, dtype=np.int64)
+        self.loans = np.array(loans, dtype=np.int64)
+
+    @classmethod
+    def from_collection(cls, collection: 'BookCollection', borrowed_books: Optional[dict] = None) -> 'ColumnarSnapshot':
+        """Снимок коллекции с числом выданных экземпляров из borrowed_books ({book: {user_id: count}})"""
+        borrowed = {}
+        for book, users in (borrowed_books or {}).items():
+            key = isbn_key(book.isbn) # type: ignore
+            borrowed[key] = borrowed.get(key, 0) + sum(users.values())
+        rows = []
+        seen = set()
+        for book, count in collection.items:
+            key = isbn_key(book.isbn) # type: ignore
+            seen.add(key)
+            rows.append((book, count, borrowed.get(key, 0)))
+        # полностью выданные книги в items не остаются, но в аналитике нужны
+        for book in borrowed_books or ():
+            key = isbn_key(book.isbn) # type: ignore
+            if key not in seen:
+                seen.add(key)
+                rows.append((book, 0, borrowed[key]))
+        return cls(rows)
+
+    def _key(self, name: str) -> tuple[Any, Sequence]:
+        """Коды и значения ключевой колонки"""
+        if name == 'author':
+            return self.author, self.authors
+        if name == 'genre':
+            return self.genre, self.genres
+        if name == 'year':
+            labels, codes = np.unique(self.year, return_inverse=True)
+            return codes, labels.tolist()
+        if name == 'decade':
+            labels, codes = np.unique(self.year // 10 * 10, return_inverse=True)
+            return codes, labels.tolist()
+        raise LibraryException(f"Unknown key column '{name}', expected one of {KEY_COLUMNS}")
+
+    def _values(self, name: str) -> Any:
+        if name not in VALUE_COLUMNS:
+            raise LibraryException(f"Unknown value column '{name}', expected one of {VALUE_COLUMNS}")
+        return getattr(self, name)
+
+    def _group_codes(self, names: tuple[str, ...]) -> tuple[Any, list[Sequence]]:
+        """Составной код группы: смешанная система счисления по размерам словарей"""
+        combined = np.zeros(len(self), dtype=np.int64)
+        labels = []
+        for name in names:
+            codes, values = self._key(name)
+            combined = combined * max(len(values), 1) + codes
+            labels.append(values)
+        return combined, labels
+
+    def group_by(self, by: str | Sequence[str], value: str = 'copies') -> dict[Any, int]:
+        """Сумма колонки value по группам: {значение: сумма} или {(значение, ...): сумма}"""
+        names = (by,) if isinstance(by, str) else tuple(by)
+        combined, labels = self._group_codes(names)
+        groups, inverse = np.unique(combined, return_inverse=True)
+        sums = np.bincount(inverse, weights=self._values(value), minlength=len(groups)).astype(np.int64)
+        # разложение составного кода обратно на коды колонок
+        parts = []
+        rest = groups
+        for values in reversed(labels):
+            rest, codes = np.divmod(rest, max(len(values), 1))
+            parts.append([values[code] for code in codes.tolist()])
+        parts.reverse()
+        keys = parts[0] if len(parts) == 1 else list(zip(*parts))
+        return dict(zip(keys, sums.tolist()))
+
+    def loan_ratio_by_author(self) -> dict[str, float]:
+        """Доля выданных экземпляров по авторам: loans / (loans + copies)"""
+        size = len(self.authors)
+        loans = np.bincount(self.author, weights=self.loans, minlength=size)
+        total = loans + np.bincount(self.author, weights=self.copies, minlength=size)
+        ratio = np.divide(loans, total, out=np.zeros(size), where=total > 0)
+        return dict(zip(self.authors, ratio.tolist()))
+
+    def histogram(self, column: str = 'year', bins: int | Sequence[int] = 10,
+                  weights: Optional[str] = None) -> tuple[list[int], list[float]]:
+        """Гистограмма колонки (year, copies, loans): (счетчики, границы бинов)"""
+        data = self.year if column == 'year' else self._values(column)
+        counts, edges = np.histogram(data, bins=bins, weights=self._values(weights) if weights else None)
+        return counts.astype(np.int64).tolist(), edges.tolist()
+
+    def top_k(self, value: str = 'loans', k: int = 5, by: Optional[str] = None) -> list[tuple[Any, int]]:
+        """k книг (по isbn) или групп by с наибольшей суммой value; при равенстве - в порядке коллекции"""
+        if k <= 0:
+            return []
+        if by is not None:
+            groups = self.group_by(by, value)
+            labels = list(groups)
+            data = np.array(list(groups.values()), dtype=np.int64)
+        else:
+            labels = self.isbns
+            data = self._values(value)
+        if k < len(data):
+            candidates = np.argpartition(-data, k - 1)[:k]
+            # argpartition не сохраняет порядок равных: добираем всех с пограничным значением
+            threshold = data[candidates].min()
+            candidates = np.flatnonzero(data >= threshold)
+        else:
+            candidates = np.arange(len(data))
+        order = candidates[np.lexsort((candidates, -data[candidates]))][:k]
+        return [(labels[i], int(data[i])) for i in order.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.isbns)
+
+    def __repr__(self):
+        return f"ColumnarSnapshot({len(self)} books, {len(self.authors)} authors, {len(self.genres)} genres)"
+
+
+def python_group_by(collection: 'BookCollection', borrowed_books: dict, by: Sequence[str],
+                    value: str = 'copies') -> dict[Any, int]:
+    """Та же группировка циклами Python по items и borrowed_books (для проверки колоночного пути)"""
+    keys = {
+        'author': lambda book: book.author,
+        'genre': lambda book: book.genre,
+        'year': lambda book: book.year,
+        'decade': lambda book: book.year // 10 * 10,
+    }
+    rows: dict[Any, list] = {}
+    for book, count in collection.items:
+        rows[isbn_key(book.isbn)] = [book, count, 0] # type: ignore
+    for book, users in borrowed_books.items():
+        row = rows.setdefault(isbn_key(book.isbn), [book, 0, 0]) # type: ignore
+        row[2] += sum(users.values())
+    result: dict[Any, int] = {}
+    for book, count, loans in rows.values():
+        key = tuple(keys[name](book) for name in by)
+        key = key[0] if len(key) == 1 else key
+        result[key] = result.get(key, 0) + (count if value == 'copies' else loans)
+    return result
@@ -0,0 +1,220 @@
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from src.book_collection import Book, LibraryException
+from src.isbn import IsbnKey, isbn_key
+
+AVAILABLE, ON_LOAN, WITHDRAWN = 0, 1, 2
+STATUSES = ('available', 'on_loan', 'withdrawn')
+CONDITIONS = ('new', 'good', 'fair', 'poor', 'damaged')
+NO_HOLDER = -1
+NO_COPY = -1
+
+
+@dataclass(frozen=True)
+class CopyInfo:
+    """Состояние одного физического экземпляра"""
+    barcode: int
+    isbn: str
+    status: str
+    holder: Optional[int]
+    condition: str
+
+
+class CopyRegistry:
+    """Учет физических экземпляров (штрихкод - номер экземпляра) в параллельных колонках array.
+
+    На экземпляр: книга (4 байта), статус и состояние (по 1), читатель (8) и ссылки
+    двусвязного списка свободных экземпляров книги (4 + 4) - 22 байта. Выданные экземпляры
+    дополнительно учтены в словаре (книга, читатель): штрихкоды. Выдача любого свободного
+    экземпляра, выдача конкретного, возврат и экземпляры на руках у читателя - O(1) на экземпляр
+    """
+
+    def __init__(self):
+        self.title = array('I')
+        self.status = array('B')
+        self.condition = array('B')
+        self.holder = array('q')
+        self.next_free = array('i')
+        self.prev_free = array('i')
+        self.titles: dict[IsbnKey, int] = {}     # ключ ISBN: номер книги
+        self.title_isbns: list[str] = []
+        self.title_copies: list[array] = []      # штрихкоды экземпляров каждой книги
+        self.free_head = array('i')
+        self.free_count = array('I')
+        # (номер книги, читатель): штрихкоды на руках в порядке выдачи
+        self.loans: dict[tuple[int, int], dict[int, None]] = {}
+
+    def _title_id(self, book: Book, create: bool = False) -> Optional[int]:
+        key = isbn_key(book.isbn) # type: ignore
+        title = self.titles.get(key)
+        if title is None and create:
+            title = self.titles[key] = len(self.title_isbns)
+            self.title_isbns.append(book.isbn) # type: ignore
+            self.title_copies.append(array('I'))
+            self.free_head.append(NO_COPY)
+            self.free_count.append(0)
+        return title
+
+    def _push_free(self, title: int, barcode: int) -> None:
+        head = self.free_head[title]
+        self.next_free[barcode] = head
+        self.prev_free[barcode] = NO_COPY
+        if head != NO_COPY:
+            self.prev_free[head] = barcode
+        self.free_head[title] = barcode
+        self.free_count[title] += 1
+
+    def _unlink_free(self, title: int, barcode: int) -> None:
+        prev, after = self.prev_free[barcode], self.next_free[barcode]
+        if prev != NO_COPY:
+            self.next_free[prev] = after
+        else:
+            self.free_head[title] = after
+        if after != NO_COPY:
+            self.prev_free[after] = prev
+        self.next_free[barcode] = self.prev_free[barcode] = NO_COPY
+        self.free_count[title] -= 1
+
+    def add_copies(self, book: Book, count: int, condition: str = 'good') -> list[int]:
+        """Поступление новых экземпляров; возвращает их штрихкоды"""
+        if condition not in CONDITIONS:
+            raise LibraryException(f"Unknown condition '{condition}'")
+        title = self._title_id(book, create=True)
+        barcodes = []
+        for _ in range(count):
+            barcode = len(self.status)
+            self.title.append(title) # type: ignore
+            self.status.append(AVAILABLE)
+            self.condition.append(CONDITIONS.index(condition))
+            self.holder.append(NO_HOLDER)
+            self.next_free.append(NO_COPY)
+            self.prev_free.append(NO_COPY)
+            self.title_copies[title].append(barcode) # type: ignore
+            self._push_free(title, barcode) # type: ignore
+            barcodes.append(barcode)
+        return barcodes
+
+    def sync(self, book: Book, available: int) -> None:
+        """Выравнивание числа свободных экземпляров с остатком коллекции.
+
+        Книги поступают и списываются через коллекцию: недостающие экземпляры
+        заводятся, лишние свободные помечаются списанными
+        """
+        title = self._title_id(book, create=available > 0)
+        if title is None:
+            return
+        missing = available - self.free_count[title]
+        if missing > 0:
+            self.add_copies(book, missing)
+        for _ in range(-missing):
+            barcode = self.free_head[title]
+            self._unlink_free(title, barcode)
+            self.status[barcode] = WITHDRAWN
+
+    def available(self, book: Book) -> int:
+        title = self._title_id(book)
+        return self.free_count[title] if title is not None else 0
+
+    def _check_barcode(self, barcode: int) -> None:
+        if not 0 <= barcode < len(self.status):
+            raise LibraryException(f"Unknown barcode {barcode}")
+
+    def checkout(self, book: Book, user_id: int, count: int, barcodes: Optional[list[int]] = None) -> list[int]:
+        """Выдача count экземпляров: указанных или первых свободных. Сначала все проверки, потом изменения"""
+        title = self._title_id(book)
+        if barcodes is None:
+            if title is None or self.free_count[title] < count:
+                raise LibraryException(f"Not enough available copies of {book.isbn}")
+            barcodes = []
+            barcode = self.free_head[title]
+            for _ in range(count):
+                barcodes.append(barcode)
+                barcode = self.next_free[barcode]
+        else:
+            if len(set(barcodes)) != len(barcodes) or len(barcodes) != count:
+                raise LibraryException("Barcodes must be distinct and match the count")
+            for barcode in barcodes:
+                self._check_barcode(barcode)
+                if self.title[barcode] != title:
+                    raise LibraryException(f"Copy {barcode} is not a copy of {book.isbn}")
+                if self.status[barcode] != AVAILABLE:
+                    raise LibraryException(f"Copy {barcode} is not available")
+        self.lend(barcodes, user_id)
+        return barcodes
+
+    def lend(self, barcodes: Iterable[int], user_id: int) -> None:
+        """Перевод свободных экземпляров на руки читателю (без проверок, также для отката возврата)"""
+        for barcode in barcodes:
+            title = self.title[barcode]
+            self._unlink_free(title, barcode)
+            self.status[barcode] = ON_LOAN
+            self.holder[barcode] = user_id
+            self.loans.setdefault((title, user_id), {})[barcode] = None
+
+    def return_copies(self, book: Book, user_id: int, count: int,
+                      barcodes: Optional[list[int]] = None) -> list[int]:
+        """Возврат count экземпляров читателем: указанных или любых из выданных ему"""
+        if barcodes is None:
+            held = self.held_by(book, user_id)
+            if len(held) < count:
+                raise LibraryException(f"User {user_id} holds only {len(held)} copies of {book.isbn}")
+            barcodes = held[:count]
+        else:
+            title = self._title_id(book)
+            if len(set(barcodes)) != len(barcodes) or len(barcodes) != count:
+                raise LibraryException("Barcodes must be distinct and match the count")
+            for barcode in barcodes:
+                self._check_barcode(barcode)
+                if (self.title[barcode] != title or self.status[barcode] != ON_LOAN
+                        or self.holder[barcode] != user_id):
+                    raise LibraryException(f"Copy {barcode} of {book.isbn} is not on loan to user {user_id}")
+        self.checkin(barcodes)
+        return barcodes
+
+    def checkin(self, barcodes: Iterable[int]) -> None:
+        """Возврат экземпляров на полку (без проверок, также для отката выдачи)"""
+        for barcode in barcodes:
+            title = self.title[barcode]
+            key = (title, self.holder[barcode])
+            held = self.loans[key]
+            del held[barcode]
+            if not held:
+                del self.loans[key]
+            self.status[barcode] = AVAILABLE
+            self.holder[barcode] = NO_HOLDER
+            self._push_free(title, barcode)
+
+    def held_by(self, book: Book, user_id: int) -> list[int]:
+        """Штрихкоды экземпляров книги на руках у читателя (в порядке выдачи)"""
+        title = self._title_id(book)
+        if title is None:
+            return []
+        return list(self.loans.get((title, user_id), ()))
+
+    def set_condition(self, barcode: int, condition: str) -> None:
+        self._check_barcode(barcode)
+        if condition not in CONDITIONS:
+            raise LibraryException(f"Unknown condition '{condition}'")
+        self.condition[barcode] = CONDITIONS.index(condition)
+
+    def copy(self, barcode: int) -> CopyInfo:
+        self._check_barcode(barcode)
+        holder = self.holder[barcode]
+        return CopyInfo(barcode, self.title_isbns[self.title[barcode]], STATUSES[self.status[barcode]],
+                        holder if holder != NO_HOLDER else None, CONDITIONS[self.condition[barcode]])
+
+    def copies_of(self, book: Book) -> list[CopyInfo]:
+        title = self._title_id(book)
+        return [self.copy(barcode) for barcode in self.title_copies[title]] if title is not None else []
+
+    def memory_bytes(self) -> int:
+        columns = (self.title, self.status, self.condition, self.holder, self.next_free, self.prev_free,
+                   self.free_head, self.free_count, *self.title_copies)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def __repr__(self):
+        return f"CopyRegistry({len(self.status)} copies of {len(self.title_isbns)} titles, {self.memory_bytes()} bytes)"
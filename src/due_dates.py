@@ -0,0 +1,160 @@
+import heapq
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count as counter
+from typing import Iterator, Optional
+from src.book_collection import Book, LibraryException
+
+
+@dataclass
+class Loan:
+    """Партия экземпляров книги, выданная читателю с одним сроком возврата"""
+    loan_id: int
+    book: Book
+    user_id: int
+    count: int
+    due: datetime
+    renewals: int = 0
+
+    def is_overdue(self, now: datetime) -> bool:
+        return self.due < now
+
+
+class DueIndex:
+    """Индекс сроков возврата на основе min-кучи.
+
+    Записи кучи (срок, id партии) не удаляются при возврате или продлении,
+    а становятся устаревшими и пропускаются; куча перестраивается, когда
+    устаревших записей становится больше, чем живых
+    """
+
+    def __init__(self):
+        self.heap: list[tuple[datetime, int]] = []
+        self.loans: dict[int, Loan] = {}                       # loan_id: Loan
+        self.by_holder: dict[tuple[Book, int], list[Loan]] = {} # (book, user_id): партии по сроку
+        self._ids = counter(1)
+        self.last_sweep: Optional[datetime] = None
+
+    def _is_live(self, entry: tuple[datetime, int]) -> bool:
+        loan = self.loans.get(entry[1])
+        return loan is not None and loan.due == entry[0]
+
+    def _push(self, loan: Loan) -> None:
+        heapq.heappush(self.heap, (loan.due, loan.loan_id))
+        self._compact()
+
+    def _compact(self) -> None:
+        if len(self.heap) > 2 * len(self.loans) + 16:
+            self.heap = [(loan.due, loan_id) for loan_id, loan in self.loans.items()]
+            heapq.heapify(self.heap)
+
+    def add(self, book: Book, user_id: int, count: int, due: datetime) -> Loan:
+        """Зарегистрировать выдачу со сроком возврата"""
+        if count <= 0:
+            raise LibraryException("Count must be positive")
+        loan = Loan(next(self._ids), book, user_id, count, due)
+        self.loans[loan.loan_id] = loan
+        lots = self.by_holder.setdefault((book, user_id), [])
+        lots.append(loan)
+        lots.sort(key=lambda lot: lot.due)
+        self._push(loan)
+        return loan
+
+    def release(self, book: Book, user_id: int, count: int) -> int:
+        """Возврат count экземпляров: закрываются партии с самым ранним сроком.
+
+        Возвращает число экземпляров, найденных в индексе
+        """
+        lots = self.by_holder.get((book, user_id))
+        if not lots:
+            return 0
+        released = 0
+        while lots and released < count:
+            lot = lots[0]
+            take = min(lot.count, count - released)
+            lot.count -= take
+            released += take
+            if lot.count == 0:
+                lots.pop(0)
+                del self.loans[lot.loan_id]
+        if not lots:
+            del self.by_holder[(book, user_id)]
+        self._compact()
+        return released
+
+    def renew(self, book: Book, user_id: int, due: datetime) -> list[Loan]:
+        """Продление всех партий читателя по книге до нового срока"""
+        lots = self.by_holder.get((book, user_id))
+        if not lots:
+            raise LibraryException(f"User {user_id} has no loans of '{book.title}'")
+        for lot in lots:
+            lot.due = due
+            lot.renewals += 1
+            self._push(lot)
+        return list(lots)
+
+    def snapshot_holder(self, book: Book, user_id: int) -> list[tuple[Loan, int, datetime, int]]:
+        """Состояние партий читателя по книге для последующего restore_holder"""
+        return [(lot, lot.count, lot.due, lot.renewals) for lot in self.by_holder.get((book, user_id), [])]
+
+    def restore_holder(self, book: Book, user_id: int, saved: list[tuple[Loan, int, datetime, int]]) -> None:
+        """Вернуть партии читателя по книге к сохраненному состоянию"""
+        for lot in self.by_holder.pop((book, user_id), []):
+            self.loans.pop(lot.loan_id, None)
+        for lot, count, due, renewals in saved:
+            changed = lot.due != due or lot.loan_id not in self.loans
+            lot.count, lot.due, lot.renewals = count, due, renewals
+            self.loans[lot.loan_id] = lot
+            self.by_holder.setdefault((book, user_id), []).append(lot)
+            if changed:
+                heapq.heappush(self.heap, (lot.due, lot.loan_id))
+        self._compact()
+
+    def loans_of(self, book: Book, user_id: int) -> list[Loan]:
+        return list(self.by_holder.get((book, user_id), []))
+
+    def next_due(self) -> Optional[Loan]:
+        """Ближайшая по сроку партия"""
+        while self.heap and not self._is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        return self.loans[self.heap[0][1]]
+
+    def due_before(self, moment: datetime) -> list[Loan]:
+        """Все партии со сроком раньше moment, по возрастанию срока.
+
+        Обход кучи в порядке приоритета: посещаются только узлы со сроком
+        раньше moment, без извлечения из самой кучи
+        """
+        heap = self.heap
+        result = []
+        seen = set()
+        frontier = [(heap[0], 0)] if heap and heap[0][0] < moment else []
+        while frontier:
+            entry, position = heapq.heappop(frontier)
+            if self._is_live(entry) and entry[1] not in seen:
+                seen.add(entry[1])
+                result.append(self.loans[entry[1]])
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap) and heap[child][0] < moment:
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def sweep(self, now: datetime, batch_size: int = 100, only_new: bool = False) -> Iterator[list[Loan]]:
+        """Пакеты просроченных партий для рассылки уведомлений.
+
+        При only_new выдаются только партии, просроченные после прошлого обхода
+        """
+        if batch_size <= 0:
+            raise LibraryException("Batch size must be positive")
+        since = self.last_sweep if only_new else None
+        overdue = [loan for loan in self.due_before(now) if since is None or loan.due >= since]
+        self.last_sweep = now
+        return (overdue[start:start + batch_size] for start in range(0, len(overdue), batch_size))
+
+    def __len__(self) -> int:
+        return len(self.loans)
+
+    def __repr__(self):
+        return f"DueIndex({len(self.loans)} loans)"
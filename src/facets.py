@@ -0,0 +1,97 @@
+from typing import Any, Callable, Iterable, Optional, TYPE_CHECKING
+from src.isbn import IsbnKey, isbn_key
+
+if TYPE_CHECKING:
+    from src.book_collection import Book
+
+
+def _decade(book: 'Book') -> Optional[int]:
+    return book.year // 10 * 10 if isinstance(book.year, int) else None
+
+
+FACET_KEYS: dict[str, Callable[['Book'], Any]] = {
+    'genre': lambda book: book.genre,
+    'author': lambda book: book.author,
+    'decade': _decade,
+}
+
+
+class FacetCounts:
+    """Счетчики фасетов: для каждого значения - число разных книг и доступных экземпляров.
+
+    Обновляются коллекцией при каждом изменении, поэтому получение фасета
+    не требует обхода книг
+    """
+
+    def __init__(self, track_copies: bool = True):
+        self.counts: dict[str, dict[Any, list[int]]] = {name: {} for name in FACET_KEYS} # фасет: значение: [книги, экземпляры]
+        # ключ ISBN: доступные экземпляры (для compute); None - остатки берутся из хранилища
+        self.copies: Optional[dict[IsbnKey, int]] = {} if track_copies else None
+
+    def add(self, book: 'Book', count: int, new_title: bool) -> None:
+        """Поступление count экземпляров (new_title - книги раньше не было в коллекции)"""
+        if self.copies is not None:
+            key = isbn_key(book.isbn) # type: ignore
+            self.copies[key] = self.copies.get(key, 0) + count
+        for name, key_fn in FACET_KEYS.items():
+            value = key_fn(book)
+            if value is None:
+                continue
+            entry = self.counts[name].get(value)
+            if entry is None:
+                entry = self.counts[name][value] = [0, 0]
+            entry[0] += new_title
+            entry[1] += count
+
+    def remove(self, book: 'Book', count: int, removed_title: bool) -> None:
+        """Списание count экземпляров (removed_title - книга ушла из коллекции полностью)"""
+        if self.copies is not None:
+            key = isbn_key(book.isbn) # type: ignore
+            if removed_title:
+                self.copies.pop(key, None)
+            else:
+                self.copies[key] -= count
+        for name, key_fn in FACET_KEYS.items():
+            value = key_fn(book)
+            entry = self.counts[name].get(value)
+            if entry is None:
+                continue
+            entry[0] -= removed_title
+            entry[1] -= count
+            if entry[0] <= 0:
+                del self.counts[name][value]
+
+    def facet(self, name: str, limit: Optional[int] = None) -> list[tuple[Any, int, int]]:
+        """Значения фасета: [(значение, книг, экземпляров)] по убыванию экземпляров"""
+        entries = self.counts[name].items()
+        result = sorted(
+            ((value, titles, copies) for value, (titles, copies) in entries),
+            key=lambda item: (-item[2], -item[1], str(item[0]))
+        )
+        return result[:limit] if limit is not None else result
+
+    def compute(self, books: Iterable['Book'], names: Optional[Iterable[str]] = None) -> dict[str, dict[Any, tuple[int, int]]]:
+        """Фасеты по произвольной выборке книг (например, результату поиска) за один проход"""
+        names = list(names) if names is not None else list(FACET_KEYS)
+        result: dict[str, dict[Any, list[int]]] = {name: {} for name in names}
+        copies = self.copies or {}
+        seen = set()
+        for book in books:
+            key = isbn_key(book.isbn) # type: ignore
+            if key in seen:
+                continue
+            seen.add(key)
+            count = copies.get(key, 0)
+            for name in names:
+                value = FACET_KEYS[name](book)
+                if value is None:
+                    continue
+                entry = result[name].get(value)
+                if entry is None:
+                    entry = result[name][value] = [0, 0]
+                entry[0] += 1
+                entry[1] += count
+        return {name: {value: (t, c) for value, (t, c) in values.items()} for name, values in result.items()}
+
+    def __repr__(self):
+        return f"FacetCounts({', '.join(f'{name}: {len(values)}' for name, values in self.counts.items())})"
@@ -0,0 +1,138 @@
+from typing import Optional
+
+GRAM_SIZE = 3
+_PAD = '\x00' * (GRAM_SIZE - 1)
+
+
+def levenshtein(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Расстояние Левенштейна; при max_distance считает с отсечением и возвращает max_distance + 1"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            value = min(previous[j - 1] + (ca != cb), current[j - 1] + 1, previous[j] + 1)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if max_distance is not None and row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    if max_distance is not None and previous[-1] > max_distance:
+        return max_distance + 1
+    return previous[-1]
+
+
+def normalize_key(key: str) -> str:
+    """Ключ для нечеткого сравнения: без учета регистра и различия е/ё"""
+    return key.casefold().replace('ё', 'е')
+
+
+def terms(key: str) -> set[str]:
+    """Термы ключа: вся строка и отдельные слова (от 3 символов)"""
+    norm = normalize_key(key)
+    result = {norm}
+    result.update(word for word in norm.replace('.', ' ').split() if len(word) >= 3)
+    return result
+
+
+def trigrams(text: str) -> set[str]:
+    """Множество триграмм строки с дополнением по краям"""
+    padded = _PAD + text + _PAD
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """Индекс триграмм для поиска ключей с опечатками.
+
+    Индексируются ключ целиком и его слова, поэтому "Достоевскии" находит
+    "Фёдор Достоевский". Кандидаты отбираются по общим триграммам (k правок
+    уничтожают не больше 3k различных триграмм запроса), затем проверяются
+    расстоянием Левенштейна
+    """
+
+    def __init__(self):
+        self.keys: set[str] = set()
+        self.postings: dict[str, set[str]] = {}   # триграмма: термы
+        self.by_length: dict[int, set[str]] = {}  # длина: термы
+        self.originals: dict[str, set[str]] = {}  # терм: исходные ключи
+
+    def add(self, key: str) -> None:
+        for term in terms(key):
+            originals = self.originals.get(term)
+            if originals is not None:
+                originals.add(key)
+                continue
+            self.originals[term] = {key}
+            self.by_length.setdefault(len(term), set()).add(term)
+            for gram in trigrams(term):
+                self.postings.setdefault(gram, set()).add(term)
+        self.keys.add(key)
+
+    def remove(self, key: str) -> None:
+        if key not in self.keys:
+            return
+        self.keys.discard(key)
+        for term in terms(key):
+            originals = self.originals[term]
+            originals.discard(key)
+            if originals:
+                continue
+            del self.originals[term]
+            same_length = self.by_length[len(term)]
+            same_length.discard(term)
+            if not same_length:
+                del self.by_length[len(term)]
+            for gram in trigrams(term):
+                keys = self.postings[gram]
+                keys.discard(term)
+                if not keys:
+                    del self.postings[gram]
+
+    def _candidates(self, norm: str, max_distance: int) -> set[str]:
+        grams = trigrams(norm)
+        threshold = len(grams) - GRAM_SIZE * max_distance
+        if threshold <= 0:
+            # короткий запрос: фильтр по триграммам не работает, берем ключи подходящей длины
+            candidates: set[str] = set()
+            for length in range(len(norm) - max_distance, len(norm) + max_distance + 1):
+                candidates |= self.by_length.get(length, set())
+            return candidates
+        # любой подходящий ключ содержит хотя бы одну из (len - threshold + 1) самых редких триграмм
+        rare = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = set()
+        for gram in rare[:len(grams) - threshold + 1]:
+            candidates |= self.postings.get(gram, set())
+        return candidates
+
+    def search(self, query: str, max_distance: int = 2, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Ключи на расстоянии не больше max_distance, по возрастанию расстояния"""
+        if max_distance < 0:
+            raise ValueError("max_distance must be non-negative")
+        norm = normalize_key(query)
+        best: dict[str, int] = {}
+        for candidate in self._candidates(norm, max_distance):
+            if abs(len(candidate) - len(norm)) > max_distance:
+                continue
+            distance = levenshtein(norm, candidate, max_distance)
+            if distance <= max_distance:
+                for original in self.originals[candidate]:
+                    if distance < best.get(original, max_distance + 1):
+                        best[original] = distance
+        found = sorted(best.items(), key=lambda item: (item[1], item[0]))
+        return found[:limit] if limit is not None else found
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys
+
+    def __repr__(self):
+        return f"TrigramIndex({len(self)} keys, {len(self.postings)} trigrams)"
@@ -0,0 +1,132 @@
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable
+from src.book_collection import LibraryException
+from src.isbn import IsbnKey, isbn_key
+
+DEFAULT_CHECKPOINT_INTERVAL = 10000
+SHELF = -1  # user_id изменения остатка на полке (а не выдачи)
+
+
+@dataclass
+class InventoryState:
+    """Состояние на момент времени: остатки на полке и выдачи (по каноническим ключам ISBN)"""
+    moment: datetime
+    shelf: dict[IsbnKey, int] = field(default_factory=dict)              # ключ ISBN: экземпляров на полке
+    loans: dict[tuple[IsbnKey, int], int] = field(default_factory=dict)  # (ключ ISBN, user_id): экземпляров
+
+    def copies(self, isbn: str) -> int:
+        return self.shelf.get(isbn_key(isbn), 0)
+
+    def holders(self, isbn: str) -> dict[int, int]:
+        """Читатели, у которых была книга: {user_id: экземпляров}"""
+        wanted = isbn_key(isbn)
+        return {user_id: count for (key, user_id), count in self.loans.items() if key == wanted}
+
+
+@dataclass
+class _Checkpoint:
+    timestamp: float
+    position: int  # число изменений, учтенных в контрольной точке
+    shelf: dict[IsbnKey, int]
+    loans: dict[tuple[IsbnKey, int], int]
+
+
+class InventoryHistory:
+    """История остатков и выдач: контрольные точки и изменения между ними.
+
+    Изменения хранятся в компактных массивах, а каждые checkpoint_interval
+    изменений сохраняется полная копия состояния. Запрос на момент времени
+    восстанавливает состояние от ближайшей предшествующей контрольной точки,
+    поэтому интервал задает баланс между памятью и задержкой запроса
+    """
+
+    def __init__(self, shelf: Iterable[tuple[str, int]] = (), loans: Iterable[tuple[str, int, int]] = (),
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+                 clock: Callable[[], datetime] = datetime.now):
+        if checkpoint_interval <= 0:
+            raise LibraryException("Checkpoint interval must be positive")
+        self.checkpoint_interval = checkpoint_interval
+        self.clock = clock
+        self.shelf: dict[IsbnKey, int] = {}
+        self.loans: dict[tuple[IsbnKey, int], int] = {}
+        for isbn, count in shelf:
+            key = isbn_key(isbn)
+            self.shelf[key] = self.shelf.get(key, 0) + count
+        for isbn, user_id, count in loans:
+            self.loans[(isbn_key(isbn), user_id)] = count
+        # изменения: время, ключ ISBN, читатель (SHELF - полка), приращение
+        self.timestamps = array('d')
+        self.isbns: list[IsbnKey] = []
+        self.users = array('q')
+        self.deltas = array('q')
+        self.checkpoints: list[_Checkpoint] = []
+        self._checkpoint()
+
+    def _now(self) -> float:
+        timestamp = self.clock().timestamp()
+        # время изменений не убывает, даже если часы перевели назад
+        return max(timestamp, self.timestamps[-1]) if self.timestamps else timestamp
+
+    def _checkpoint(self) -> None:
+        timestamp = self.timestamps[-1] if self.timestamps else self.clock().timestamp()
+        self.checkpoints.append(_Checkpoint(timestamp, len(self.deltas), self.shelf.copy(), self.loans.copy()))
+
+    def record(self, isbn: str, delta: int, user_id: int = SHELF) -> None:
+        """Учесть изменение остатка на полке (user_id=SHELF) или числа выданных читателю экземпляров"""
+        if delta == 0:
+            return
+        key = isbn_key(isbn)
+        self.timestamps.append(self._now())
+        self.isbns.append(key)
+        self.users.append(user_id)
+        self.deltas.append(delta)
+        _apply(self.shelf, self.loans, key, user_id, delta)
+        if len(self.deltas) - self.checkpoints[-1].position >= self.checkpoint_interval:
+            self._checkpoint()
+
+    def as_of(self, moment: datetime) -> InventoryState:
+        """Состояние на момент moment (изменения в сам момент учитываются)"""
+        timestamp = moment.timestamp()
+        k = bisect_right(self.checkpoints, timestamp, key=lambda checkpoint: checkpoint.timestamp) - 1
+        if k < 0:
+            raise LibraryException(f"No history before {self.start:%Y-%m-%d %H:%M:%S}")
+        checkpoint = self.checkpoints[k]
+        shelf, loans = checkpoint.shelf.copy(), checkpoint.loans.copy()
+        end = bisect_right(self.timestamps, timestamp, lo=checkpoint.position)
+        isbns, users, deltas = self.isbns, self.users, self.deltas
+        for i in range(checkpoint.position, end):
+            _apply(shelf, loans, isbns[i], users[i], deltas[i])
+        return InventoryState(moment, shelf, loans)
+
+    @property
+    def start(self) -> datetime:
+        """Начало истории (время первой контрольной точки)"""
+        return datetime.fromtimestamp(self.checkpoints[0].timestamp)
+
+    def memory_bytes(self) -> int:
+        """Приблизительный объем истории: массивы изменений и записи контрольных точек"""
+        arrays = sum(a.itemsize * len(a) for a in (self.timestamps, self.users, self.deltas))
+        # ссылка на isbn в списке и по ~3 ссылки на запись словаря контрольной точки
+        entries = sum(len(checkpoint.shelf) + len(checkpoint.loans) for checkpoint in self.checkpoints)
+        return arrays + 8 * len(self.isbns) + 24 * entries
+
+    def __len__(self) -> int:
+        return len(self.deltas)
+
+    def __repr__(self):
+        return f"InventoryHistory({len(self.deltas)} changes, {len(self.checkpoints)} checkpoints)"
+
+
+def _apply(shelf: dict, loans: dict, isbn: IsbnKey, user_id: int, delta: int) -> None:
+    if user_id == SHELF:
+        target, key = shelf, isbn
+    else:
+        target, key = loans, (isbn, user_id)
+    value = target.get(key, 0) + delta
+    if value:
+        target[key] = value
+    else:
+        target.pop(key, None)
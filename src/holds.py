@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count as counter
+from typing import Optional
+from src.book_collection import Book, LibraryException
+from src.isbn import IsbnKey, isbn_key
+
+
+@dataclass
+class Hold:
+    """Заявка читателя на книгу"""
+    hold_id: int
+    book: Book
+    user_id: int
+    count: int
+    created: datetime
+
+
+class HoldQueues:
+    """Очереди заявок (FIFO) по каноническому ключу ISBN (см. src/isbn.py).
+
+    Каждая очередь - OrderedDict по hold_id: постановка в очередь, извлечение
+    первой заявки и отмена любой заявки выполняются за O(1). Суммарное число
+    экземпляров, ожидаемых по заявкам книги, поддерживается там же
+    """
+
+    def __init__(self):
+        self.queues: dict[IsbnKey, OrderedDict[int, Hold]] = {}  # ключ ISBN: заявки в порядке поступления
+        self.holds: dict[int, Hold] = {}                     # hold_id: Hold
+        self.demand: dict[IsbnKey, int] = {}                 # ключ ISBN: экземпляров по заявкам
+        self._ids = counter(1)
+
+    def place(self, book: Book, user_id: int, count: int = 1, when: Optional[datetime] = None) -> Hold:
+        """Поставить заявку в конец очереди"""
+        if count <= 0:
+            raise LibraryException("Count must be positive")
+        if book.isbn is None:
+            raise LibraryException("Cannot place a hold on a book without ISBN")
+        hold = Hold(next(self._ids), book, user_id, count, when or datetime.now())
+        key = isbn_key(book.isbn)
+        self.queues.setdefault(key, OrderedDict())[hold.hold_id] = hold
+        self.holds[hold.hold_id] = hold
+        self.demand[key] = self.demand.get(key, 0) + count
+        return hold
+
+    def cancel(self, hold_id: int) -> Hold:
+        """Отменить заявку"""
+        hold = self.holds.pop(hold_id, None)
+        if hold is None:
+            raise LibraryException(f"Hold {hold_id} not found")
+        self._unlink(hold)
+        return hold
+
+    def _unlink(self, hold: Hold) -> None:
+        key = isbn_key(hold.book.isbn) # type: ignore
+        queue = self.queues[key]
+        del queue[hold.hold_id]
+        self._release(key, hold.count)
+        if not queue:
+            del self.queues[key]
+
+    def _release(self, key: IsbnKey, count: int) -> None:
+        self.demand[key] -= count
+        if not self.demand[key]:
+            del self.demand[key]
+
+    def restore(self, hold: Hold) -> None:
+        """Вернуть извлеченную или отмененную заявку на ее место в очереди"""
+        key = isbn_key(hold.book.isbn) # type: ignore
+        queue = self.queues.setdefault(key, OrderedDict())
+        queue[hold.hold_id] = hold
+        self.holds[hold.hold_id] = hold
+        self.demand[key] = self.demand.get(key, 0) + hold.count
+        if len(queue) > 1 and next(iter(queue)) > hold.hold_id:
+            # типичный случай - возврат первой заявки: O(1)
+            queue.move_to_end(hold.hold_id, last=False)
+        else:
+            for later in [hold_id for hold_id in queue if hold_id > hold.hold_id]:
+                queue.move_to_end(later)
+
+    def peek(self, isbn: str) -> Optional[Hold]:
+        """Первая заявка в очереди (ISBN в любой записи)"""
+        queue = self.queues.get(isbn_key(isbn))
+        if not queue:
+            return None
+        return queue[next(iter(queue))]
+
+    def pop(self, isbn: str) -> Optional[Hold]:
+        """Извлечь первую заявку"""
+        key = isbn_key(isbn)
+        queue = self.queues.get(key)
+        if not queue:
+            return None
+        _, hold = queue.popitem(last=False)
+        del self.holds[hold.hold_id]
+        self._release(key, hold.count)
+        if not queue:
+            del self.queues[key]
+        return hold
+
+    def position(self, hold_id: int) -> int:
+        """Позиция заявки в очереди (с 1)"""
+        hold = self.holds.get(hold_id)
+        if hold is None:
+            raise LibraryException(f"Hold {hold_id} not found")
+        for position, other_id in enumerate(self.queues[isbn_key(hold.book.isbn)], 1): # type: ignore
+            if other_id == hold_id:
+                return position
+        raise LibraryException(f"Hold {hold_id} not found") # pragma: no cover
+
+    def waiting(self, isbn: str) -> int:
+        """Число заявок в очереди"""
+        return len(self.queues.get(isbn_key(isbn), ()))
+
+    def reserved(self, isbn: str) -> int:
+        """Число экземпляров, ожидаемых по всем заявкам книги (за O(1))"""
+        return self.demand.get(isbn_key(isbn), 0)
+
+    def user_holds(self, user_id: int) -> list[Hold]:
+        return [hold for hold in self.holds.values() if hold.user_id == user_id]
+
+    def __len__(self) -> int:
+        return len(self.holds)
+
+    def __repr__(self):
+        return f"HoldQueues({len(self.holds)} holds, {len(self.queues)} titles)"
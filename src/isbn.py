@@ -0,0 +1,88 @@
+from typing import Any, Union
+
+IsbnKey = Union[int, str]
+
+# префиксы EAN, выделенные для книг
+ISBN_PREFIXES = ('978', '979')
+
+
+def normalize_isbn(value: Any) -> Any:
+    """ISBN без дефисов и пробелов, контрольный символ X в верхнем регистре"""
+    if not isinstance(value, str):
+        return value
+    value = value.replace('-', '').replace(' ', '').strip().upper()
+    return value or None
+
+
+def isbn10_check_digit(digits: str) -> str:
+    """Контрольный символ ISBN-10 по первым 9 цифрам (сумма с весами 10..2 по модулю 11)"""
+    total = sum((10 - i) * int(digit) for i, digit in enumerate(digits))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def isbn13_check_digit(digits: str) -> str:
+    """Контрольная цифра ISBN-13 по первым 12 цифрам (веса 1 и 3 по модулю 10)"""
+    # суммы по байтам считаются в C; коды цифр смещены на ord('0') = 48
+    codes = digits.encode()
+    ones, threes = codes[0::2], codes[1::2]
+    total = sum(ones) + 3 * sum(threes) - 48 * (len(ones) + 3 * len(threes))
+    return str((10 - total % 10) % 10)
+
+
+def parse_isbn(value: str) -> int:
+    """Канонический ключ ISBN: ISBN-13 в виде целого числа (ISBN-10 переводится в 978-).
+
+    Дефисы и пробелы игнорируются; ValueError при неверном формате или контрольной сумме
+    """
+    isbn = normalize_isbn(value)
+    if not isinstance(isbn, str):
+        raise ValueError(f"Isbn must be a string, found {type(value)}: {value}")
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        if isbn10_check_digit(isbn[:9]) != isbn[9]:
+            raise ValueError(f"Invalid ISBN-10 checksum: {value}")
+        body = '978' + isbn[:9]
+        return int(body + isbn13_check_digit(body))
+    if len(isbn) == 13 and isbn.isdigit() and isbn[:3] in ISBN_PREFIXES:
+        if isbn13_check_digit(isbn[:12]) != isbn[12]:
+            raise ValueError(f"Invalid ISBN-13 checksum: {value}")
+        return int(isbn)
+    raise ValueError(f"Invalid ISBN: {value}")
+
+
+def is_valid_isbn(value: Any) -> bool:
+    try:
+        parse_isbn(value)
+    except ValueError:
+        return False
+    return True
+
+
+def isbn_key(value: str) -> IsbnKey:
+    """Ключ для внутренних словарей: целое число для корректного ISBN, иначе сама строка.
+
+    Строковые ключи остаются для нестандартных идентификаторов, которые уже есть в каталогах
+    """
+    if not isinstance(value, str):
+        return value
+    if value.isdigit() and len(value) == 13 and value[:3] in ISBN_PREFIXES:
+        # быстрый путь для ISBN-13 без дефисов
+        if isbn13_check_digit(value[:12]) == value[12]:
+            return int(value)
+        return value
+    try:
+        return parse_isbn(value)
+    except ValueError:
+        return value
+
+
+def format_isbn13(key: int) -> str:
+    return f"{key:013d}"
+
+
+def to_isbn10(key: int) -> str:
+    """ISBN-10 для ключа с префиксом 978; у ISBN с префиксом 979 формы ISBN-10 нет"""
+    isbn = format_isbn13(key)
+    if not isbn.startswith('978'):
+        raise ValueError(f"ISBN {isbn} has no ISBN-10 form")
+    return isbn[3:12] + isbn10_check_digit(isbn[3:12])
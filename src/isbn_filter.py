@@ -0,0 +1,216 @@
+import random
+from array import array
+from typing import Hashable, Optional
+
+BUCKET_SIZE = 4
+FINGERPRINT_BITS = 16
+MAX_KICKS = 500
+DEFAULT_CAPACITY = 1 << 16
+MASK64 = (1 << 64) - 1
+
+
+def _mix(key: Hashable) -> int:
+    """Перемешанный 64-битный хеш ключа (финализатор splitmix64).
+
+    hash() целого числа - само число, а ключи ISBN (см. src/isbn.py) - соседние
+    13-значные числа: без перемешивания они делили бы корзины и отпечатки
+    """
+    h = hash(key) & MASK64
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EB & MASK64
+    return h ^ (h >> 31)
+
+
+def _fingerprint(h: int) -> int:
+    # 0 - признак пустой ячейки
+    return ((h >> 32) & 0xFFFF) or 1
+
+
+class CuckooFilter:
+    """Фильтр кукушки: проверка принадлежности с удалением и редкими ложными срабатываниями.
+
+    Ячейки - плоский массив 16-битных отпечатков, по BUCKET_SIZE в корзине.
+    Ключ может лежать в одной из двух корзин: i1 = h & mask и i1 ^ hash(отпечатка)
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, seed: int = 0):
+        buckets = 1
+        while buckets * BUCKET_SIZE < capacity:
+            buckets <<= 1
+        self.mask = buckets - 1
+        self.slots = array('H', bytes(2 * buckets * BUCKET_SIZE))
+        self.count = 0
+        self.victim: Optional[tuple[int, int]] = None  # (корзина, отпечаток), не поместившийся при вставке
+        self._random = random.Random(seed)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.slots)
+
+    @property
+    def full(self) -> bool:
+        return self.victim is not None
+
+    def _alternate(self, index: int, fingerprint: int) -> int:
+        return (index ^ (fingerprint * 0x5BD1E995)) & self.mask
+
+    def _insert_into(self, index: int, fingerprint: int) -> bool:
+        slots = self.slots
+        start = index * BUCKET_SIZE
+        for slot in range(start, start + BUCKET_SIZE):
+            if slots[slot] == 0:
+                slots[slot] = fingerprint
+                return True
+        return False
+
+    def _find(self, index: int, fingerprint: int) -> int:
+        slots = self.slots
+        start = index * BUCKET_SIZE
+        for slot in range(start, start + BUCKET_SIZE):
+            if slots[slot] == fingerprint:
+                return slot
+        return -1
+
+    def add_hash(self, h: int) -> bool:
+        """Вставка по хешу ключа; False - фильтр заполнен (ключ не добавлен)"""
+        if self.victim is not None:
+            return False
+        fingerprint = _fingerprint(h)
+        i1 = h & self.mask
+        i2 = self._alternate(i1, fingerprint)
+        if self._insert_into(i1, fingerprint) or self._insert_into(i2, fingerprint):
+            self.count += 1
+            return True
+        # вытеснение: случайный отпечаток переезжает в свою вторую корзину
+        index = self._random.choice((i1, i2))
+        for _ in range(MAX_KICKS):
+            slot = index * BUCKET_SIZE + self._random.randrange(BUCKET_SIZE)
+            fingerprint, self.slots[slot] = self.slots[slot], fingerprint
+            index = self._alternate(index, fingerprint)
+            if self._insert_into(index, fingerprint):
+                self.count += 1
+                return True
+        # ключ уже вставлен, а вытесненный отпечаток хранится отдельно
+        self.victim = (index, fingerprint)
+        self.count += 1
+        return True
+
+    def contains_hash(self, h: int) -> bool:
+        fingerprint = _fingerprint(h)
+        i1 = h & self.mask
+        i2 = self._alternate(i1, fingerprint)
+        if self._find(i1, fingerprint) >= 0 or self._find(i2, fingerprint) >= 0:
+            return True
+        victim = self.victim
+        return victim is not None and victim[1] == fingerprint and victim[0] in (i1, i2)
+
+    def remove_hash(self, h: int) -> bool:
+        """Удаление ранее добавленного ключа (удалять отсутствующие ключи нельзя)"""
+        fingerprint = _fingerprint(h)
+        i1 = h & self.mask
+        i2 = self._alternate(i1, fingerprint)
+        victim = self.victim
+        if victim is not None and victim[1] == fingerprint and victim[0] in (i1, i2):
+            self.victim = None
+            self.count -= 1
+            return True
+        for index in (i1, i2):
+            slot = self._find(index, fingerprint)
+            if slot >= 0:
+                self.slots[slot] = 0
+                self.count -= 1
+                if victim is not None:
+                    # освободилось место - возвращаем вытесненный отпечаток
+                    self.victim = None
+                    self.count -= 1
+                    self._reinsert(*victim)
+                return True
+        return False
+
+    def _reinsert(self, index: int, fingerprint: int) -> None:
+        if self._insert_into(index, fingerprint) or self._insert_into(self._alternate(index, fingerprint), fingerprint):
+            self.count += 1
+        else:
+            self.victim = (index, fingerprint)
+            self.count += 1
+
+    def load_factor(self) -> float:
+        return self.count / self.capacity
+
+    def estimated_fpr(self) -> float:
+        """Оценка доли ложных срабатываний: 2 корзины по BUCKET_SIZE сравнений с заполнением load"""
+        return min(1.0, 2 * BUCKET_SIZE * self.load_factor() / (1 << FINGERPRINT_BITS))
+
+    def memory_bytes(self) -> int:
+        return self.slots.itemsize * len(self.slots)
+
+
+class ScalableCuckooFilter:
+    """Масштабируемый фильтр: при заполнении добавляется слой вдвое большей емкости.
+
+    Используется коллекцией как быстрый отрицательный ответ для ISBN,
+    которых точно нет: ложные срабатывания возможны, пропуски - нет
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.layers: list[CuckooFilter] = [CuckooFilter(capacity)]
+        self.lookups = 0
+        self.negatives = 0          # ответов "точно нет"
+        self.false_positives = 0    # ответов "возможно есть" для отсутствующих ключей
+
+    def add(self, key: Hashable) -> None:
+        h = _mix(key)
+        layer = self.layers[-1]
+        if not layer.add_hash(h):
+            layer = CuckooFilter(2 * layer.capacity, seed=len(self.layers))
+            self.layers.append(layer)
+            layer.add_hash(h)
+
+    def remove(self, key: Hashable) -> None:
+        h = _mix(key)
+        for layer in reversed(self.layers):
+            if layer.remove_hash(h):
+                return
+
+    def might_contain(self, key: Hashable) -> bool:
+        self.lookups += 1
+        h = _mix(key)
+        for layer in self.layers:
+            if layer.contains_hash(h):
+                return True
+        self.negatives += 1
+        return False
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.might_contain(key)
+
+    def __len__(self) -> int:
+        return sum(layer.count for layer in self.layers)
+
+    def memory_bytes(self) -> int:
+        return sum(layer.memory_bytes() for layer in self.layers)
+
+    def estimated_fpr(self) -> float:
+        """Оценка доли ложных срабатываний (ошибки слоев складываются)"""
+        return min(1.0, sum(layer.estimated_fpr() for layer in self.layers))
+
+    def observed_fpr(self) -> float:
+        """Доля ложных срабатываний среди запросов отсутствующих ключей"""
+        misses = self.negatives + self.false_positives
+        return self.false_positives / misses if misses else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'keys': len(self),
+            'layers': len(self.layers),
+            'capacity': sum(layer.capacity for layer in self.layers),
+            'memory_bytes': self.memory_bytes(),
+            'estimated_fpr': self.estimated_fpr(),
+            'observed_fpr': self.observed_fpr(),
+            'lookups': self.lookups,
+            'negatives': self.negatives,
+            'false_positives': self.false_positives,
+        }
+
+    def __repr__(self):
+        return f"ScalableCuckooFilter({len(self)} keys, {len(self.layers)} layers, {self.memory_bytes()} bytes)"
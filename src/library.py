@@ -1,8 +1,24 @@
-from src.book_collection import BookCollection, Book, LibraryException
-from dataclasses import dataclass
-from datetime import datetime
-from src.constants import COLORS
-from typing import Optional
+from src.book_collection import BookCollection, Book, LibraryException, same_book
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from src.results import OperationResult, OperationStatus
+from functools import partial
+from typing import Any, Iterator, Optional
+from weakref import WeakSet
+from src.metrics import Metrics, instrument, uninstrument
+from src.circulation import EventStore, BORROW, RETURN
+from src.due_dates import DueIndex, Loan
+from src.holds import Hold, HoldQueues
+from src.recommendations import CoBorrowRecommender
+from src.transactions import Transaction
+from src.snapshot import ABSENT, ChangeLayer, LayeredView, LibrarySnapshot
+from src.change_feed import ChangeFeed, replicated
+from src.history import InventoryHistory, InventoryState, DEFAULT_CHECKPOINT_INTERVAL
+from src.borrower_store import ColdBorrowerStore, DEFAULT_IDLE_PERIOD, DEFAULT_BLOCK_SIZE
+from src.pagination import Page, DEFAULT_PAGE_SIZE, SortedKeys, iter_paged
+from src.copies import CopyRegistry
+from src.isbn import isbn_key
+from src.sketches import StreamingStats, DEFAULT_HLL_PRECISION, DEFAULT_HEAVY_HITTERS, DEFAULT_CMS_WIDTH, DEFAULT_CMS_DEPTH
 
 @dataclass
 class BorrowerInfo:
@@ -13,33 +29,345 @@ class BorrowerInfo:
     first_borrow_date: Optional[datetime] = None
     last_activity_date: Optional[datetime] = None
 
+DEFAULT_LOAN_PERIOD = timedelta(days=14)
+
 class Library:
-    def __init__(self, library_name: str = "Unnamed Library"):
+    METRICS_EXCLUDE = ('enable_metrics', 'disable_metrics', 'transaction', 'snapshot', 'enable_change_feed', 'enable_history',
+                       'enable_streaming_stats', 'enable_borrower_tiering', 'enable_copy_tracking', 'enable_state_hashes')
+
+    def __init__(self, library_name: str = "Unnamed Library", loan_period: timedelta = DEFAULT_LOAN_PERIOD,
+                 collection: Optional[BookCollection] = None):
         self.name: str = library_name
-        self.collection: BookCollection = BookCollection(library_name)
+        # хранилище коллекции подключаемое: по умолчанию в памяти, например SQLiteBookCollection - на диске
+        self.collection: BookCollection = collection if collection is not None else BookCollection(library_name)
         self.borrowed_books: dict = {}  # book: {user_id: count}
         self.borrowers: dict = {}       # user_id: BorrowerInfo
+        self.borrower_ids: SortedKeys = SortedKeys()  # ключи borrowers по возрастанию (для page_borrowers)
         self.statistics: dict = {
             'total_borrowed': 0,
             'total_returned': 0,
             'unique_borrowers': 0,
-            'active_borrowers': 0
+            'active_borrowers': 0,
+            'holds_fulfilled': 0
         }
+        self.metrics: Optional[Metrics] = None
+        self.circulation: EventStore = EventStore()
+        self.loan_period: timedelta = loan_period
+        self.due_index: DueIndex = DueIndex()
+        self.holds: HoldQueues = HoldQueues()
+        self.recommender: CoBorrowRecommender = CoBorrowRecommender()
+        self.journal: Optional[Any] = None  # UndoLog активной транзакции
+        # копирование при записи для снимков: живые снимки и слой прежних значений записей после последнего снимка
+        self._snapshots: WeakSet = WeakSet()
+        self._layer: Optional[ChangeLayer] = None
+        self.feed: Optional[ChangeFeed] = None
+        self.history: Optional[InventoryHistory] = None
+        self.stream_stats: Optional[StreamingStats] = None
+        # холодный уровень читателей без книг, давно не приходивших в библиотеку
+        self.cold_borrowers: Optional[ColdBorrowerStore] = None
+        self.idle_period: timedelta = DEFAULT_IDLE_PERIOD
+        self.copies: Optional[CopyRegistry] = None
+        self.state_hashes: Optional[Any] = None  # StateHashes (см. src/replication.py)
+        self.collection.add_listeners.append(self._allocate_holds)
+
+    def transaction(self) -> Transaction:
+        """Транзакция: при исключении внутри with все изменения откатываются.
+
+        Вложенные транзакции работают как точки сохранения
+        """
+        return Transaction(self)
+
+    def enable_change_feed(self, maxlen: Optional[int] = None) -> ChangeFeed:
+        """Включение журнала изменений библиотеки и коллекции (для реплик, см. src/replication.py)"""
+        if self.feed is None:
+            self.feed = self.collection.feed = ChangeFeed(maxlen)
+        return self.feed
+
+    def enable_history(self, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+                       clock=datetime.now) -> InventoryHistory:
+        """Включение истории остатков и выдач (начиная с текущего состояния)"""
+        if self.history is None:
+            self.history = self.collection.history = InventoryHistory(
+                ((book.isbn, count) for book, count in self.collection.items),
+                ((book.isbn, user_id, count) for book, users in self.borrowed_books.items()
+                 for user_id, count in users.items()),
+                checkpoint_interval, clock
+            )
+        return self.history
+
+    def enable_streaming_stats(self, precision: int = DEFAULT_HLL_PRECISION, k: int = DEFAULT_HEAVY_HITTERS,
+                               width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH) -> StreamingStats:
+        """Включение потоковой статистики выдач в фиксированной памяти (с текущего момента)"""
+        if self.stream_stats is None:
+            self.stream_stats = StreamingStats(precision, k, width, depth)
+        return self.stream_stats
+
+    def enable_borrower_tiering(self, idle_period: timedelta = DEFAULT_IDLE_PERIOD,
+                                block_size: int = DEFAULT_BLOCK_SIZE) -> ColdBorrowerStore:
+        """Включение холодного уровня для неактивных читателей (вытеснение - evict_idle_borrowers)"""
+        if self.cold_borrowers is None:
+            self.cold_borrowers = ColdBorrowerStore(block_size)
+        self.idle_period = idle_period
+        return self.cold_borrowers
+
+    def enable_copy_tracking(self) -> CopyRegistry:
+        """Включение учета экземпляров по штрихкодам (с текущими остатками и выдачами)"""
+        if self.copies is None:
+            self.copies = CopyRegistry()
+            for book, count in self.collection.items:
+                self.copies.add_copies(book, count)
+            for book, users in self.borrowed_books.items():
+                for user_id, count in users.items():
+                    self.copies.lend(self.copies.add_copies(book, count), user_id)
+        return self.copies
+
+    def enable_state_hashes(self, buckets: Optional[int] = None):
+        """Включение хешей состояния по бакетам, обновляемых при записи (для replication.diff)"""
+        from src.replication import StateHashes, DEFAULT_BUCKETS
+        if self.state_hashes is None or (buckets is not None and buckets != self.state_hashes.buckets):
+            self.state_hashes = self.collection.state_hashes = StateHashes(self, buckets or DEFAULT_BUCKETS)
+        return self.state_hashes
+
+    def evict_idle_borrowers(self, moment: Optional[datetime] = None) -> int:
+        """Перенос в холодный уровень читателей без книг, неактивных дольше idle_period.
+
+        Возвращает число вытесненных; при обращении читатель возвращается в память автоматически
+        """
+        if self.cold_borrowers is None:
+            raise LibraryException("Borrower tiering is not enabled")
+        deadline = (moment if moment is not None else datetime.now()) - self.idle_period
+        idle = [
+            borrower for borrower in self.borrowers.values()
+            if not borrower.borrowed_books and (borrower.last_activity_date is None
+                                                or borrower.last_activity_date < deadline)
+        ]
+        if not idle:
+            return 0
+        for borrower in idle:
+            self._own_borrower(borrower.user_id)
+            del self.borrowers[borrower.user_id]
+            self.borrower_ids.discard(borrower.user_id)
+        return self.cold_borrowers.put_many(
+            (borrower.user_id, borrower.total_borrowed, borrower.total_returned,
+             borrower.first_borrow_date, borrower.last_activity_date) for borrower in idle
+        )
+
+    def _fault_in(self, user_id: int) -> Optional[BorrowerInfo]:
+        """Читатель из памяти или из холодного уровня (с возвратом в память)"""
+        borrower = self.borrowers.get(user_id)
+        if borrower is not None or self.cold_borrowers is None:
+            return borrower
+        record = self.cold_borrowers.pop(user_id)
+        if record is None:
+            return None
+        _, total_borrowed, total_returned, first_borrow_date, last_activity_date = record
+        self._own_borrower(user_id)
+        borrower = self.borrowers[user_id] = BorrowerInfo(
+            user_id, {}, total_borrowed, total_returned, first_borrow_date, last_activity_date
+        )
+        self.borrower_ids.add(user_id)
+        return borrower
 
-    def borrow_books(self, book: Book, user_id: int, count: int = 1) -> str:
-        """Выдача нескольких экземпляров книги читателю"""
+    def as_of(self, moment: datetime) -> InventoryState:
+        """Остатки и выдачи на момент времени (нужна включенная история)"""
+        if self.history is None:
+            raise LibraryException("History is not enabled")
+        return self.history.as_of(moment)
+
+    def snapshot(self) -> LibrarySnapshot:
+        """Согласованный неизменяемый снимок для отчетов (за O(1), без блокировки выдач)"""
+        layer = ChangeLayer()
+        if self._live_layer() is not None:
+            self._layer.newer = layer # type: ignore
+        self._layer = layer
+        snap = LibrarySnapshot(
+            self.name, self.collection.share_items(), LayeredView(self.borrowed_books, layer, 'books'),
+            LayeredView(self.borrowers, layer, 'users'), self.statistics.copy(),
+            self.collection.index_dict.author_count(), self.collection.index_dict.genre_count()
+        )
+        self._snapshots.add(snap)
+        return snap
+
+    def _live_layer(self) -> Optional[ChangeLayer]:
+        """Слой последнего снимка; None - живых снимков нет"""
+        if self._layer is not None and not self._snapshots:
+            # все снимки освобождены - сохранять больше нечего
+            self._layer = None
+        return self._layer
+
+    def _own_loan(self, book: Book, user_id: int) -> None:
+        """Сохранение записей выдачи книги и читателя, видимых из снимков, перед изменением.
+
+        Снимкам остается прежний объект, библиотека дальше меняет его копию
+        """
+        layer = self._live_layer()
+        if layer is None:
+            return
+        if book not in layer.books:
+            book_users = self.borrowed_books.get(book)
+            layer.books[book] = book_users if book_users is not None else ABSENT
+            if book_users is not None:
+                self.borrowed_books[book] = book_users.copy()
+        self._own_borrower(user_id)
+
+    def _own_borrower(self, user_id: int) -> None:
+        """Сохранение записи читателя, видимой из снимков, перед изменением"""
+        layer = self._live_layer()
+        if layer is None or user_id in layer.users:
+            return
+        borrower = self.borrowers.get(user_id)
+        layer.users[user_id] = borrower if borrower is not None else ABSENT
+        if borrower is not None:
+            self.borrowers[user_id] = replace(borrower, borrowed_books=borrower.borrowed_books.copy())
+
+    def _journal_loan(self, book: Book, user_id: int) -> None:
+        """Запись в журнал состояния выдач книги у читателя перед изменением"""
+        users = self.borrowed_books.get(book)
+        borrower = self.borrowers.get(user_id)
+        self.journal.append(partial( # type: ignore
+            self._undo_loan, book, user_id,
+            users.copy() if users is not None else None,
+            dict(vars(borrower), borrowed_books=borrower.borrowed_books.copy()) if borrower is not None else None,
+            self.statistics.copy(),
+            self.due_index.snapshot_holder(book, user_id)
+        ))
+
+    def _undo_loan(self, book: Book, user_id: int, users: Optional[dict],
+                   borrower: Optional[dict], statistics: dict, lots: list) -> None:
+        self._own_loan(book, user_id)
+        restored = users.get(user_id, 0) if users is not None else 0
+        delta = restored - self.borrowed_books.get(book, {}).get(user_id, 0)
+        if self.history is not None:
+            self.history.record(book.isbn, delta, user_id) # type: ignore
+        if self.state_hashes is not None:
+            self.state_hashes.loan(book, user_id, delta)
+        if users is None:
+            self.borrowed_books.pop(book, None)
+        else:
+            self.borrowed_books[book] = users
+        if borrower is None:
+            self.borrowers.pop(user_id, None)
+            self.borrower_ids.discard(user_id)
+        else:
+            self.borrowers[user_id] = BorrowerInfo(**borrower)
+            self.borrower_ids.add(user_id)
+        self.statistics.clear()
+        self.statistics.update(statistics)
+        self.due_index.restore_holder(book, user_id, lots)
+
+    def enable_metrics(self) -> Metrics:
+        """Включение сбора метрик по операциям библиотеки, коллекции и индексов"""
+        if self.metrics is None:
+            self.metrics = Metrics()
+            instrument(self, self.metrics)
+            instrument(self.collection, self.metrics)
+            instrument(self.collection.index_dict, self.metrics)
+        return self.metrics
+
+    def disable_metrics(self) -> None:
+        """Отключение сбора метрик (обертки снимаются полностью)"""
+        if self.metrics is not None:
+            uninstrument(self)
+            uninstrument(self.collection)
+            uninstrument(self.collection.index_dict)
+            self.metrics = None
+
+    @replicated('library')
+    def borrow_books(self, book: Book, user_id: int, count: int = 1,
+                     due: Optional[datetime] = None, barcodes: Optional[list[int]] = None) -> OperationResult:
+        """Выдача нескольких экземпляров книги читателю (срок по умолчанию - loan_period).
+
+        Экземпляры, ожидаемые по заявкам, зарезервированы за очередью и не выдаются.
+        При учете экземпляров можно указать штрихкоды выдаваемых экземпляров
+        """
         if count <= 0:
             raise LibraryException("Count must be positive")
         if book not in self.collection:
-            return f"{COLORS.RED}Borrow: Book '{book.title}' not available{COLORS.RESET}"
+            return OperationResult(OperationStatus.NOT_AVAILABLE, book, count, 0, user_id)
+        # выдачи учитываются по записи книги в коллекции: ISBN мог прийти в другой записи
+        book = self.collection[book.isbn] # type: ignore
         current_count = self.collection.get_count(book)
-        if current_count < count:
-            return f"{COLORS.RED}Borrow: Not enough copies of '{book.title}'. Available: {current_count}, requested: {count}{COLORS.RESET}"
+        available = max(current_count - self.holds.reserved(book.isbn), 0) # type: ignore
+        if available < count:
+            return OperationResult(OperationStatus.NOT_ENOUGH_COPIES, book, count, available, user_id)
+        return self._lend(book, user_id, count, current_count, due, barcodes)
+
+    def _lend(self, book: Book, user_id: int, count: int, current_count: int,
+              due: Optional[datetime] = None, barcodes: Optional[list[int]] = None) -> OperationResult:
+        """Выдача после всех проверок (также выдача по заявке - в обход резерва)"""
+        if barcodes is not None or self.copies is not None:
+            self._checkout_copies(book, user_id, count, current_count, barcodes)
+        self._register_loan(book, user_id, count)
+        self.collection.delete_book(book, count)
+        self.statistics['total_borrowed'] += count
+        now = datetime.now()
+        self.circulation.record(BORROW, book, count, now)
+        if self.journal is not None:
+            self.journal.append(partial(self.circulation.record, BORROW, book, -count, now))
+        self.due_index.add(book, user_id, count, due if due is not None else now + self.loan_period)
+        return OperationResult(OperationStatus.BORROWED, book, count, current_count - count, user_id)
+
+    @replicated('library')
+    def register_loan(self, book: Book, user_id: int, count: int = 1,
+                      due: Optional[datetime] = None) -> OperationResult:
+        """Учет уже выданных экземпляров (перенос выдач из другой системы) без изменения коллекции.
 
+        Выдача учитывается как при borrow_books: у книги и читателя, в статистике, журнале
+        обращений и индексе сроков; при учете экземпляров заводятся выданные экземпляры
+        """
+        if count <= 0:
+            raise LibraryException("Count must be positive")
+        self.collection.validate_book(book)
+        # выдача учитывается по записи книги в коллекции или среди выданных
+        book = self.collection[book.isbn] if book in self.collection else self._loaned_book(book) # type: ignore
+        if self.copies is not None:
+            lent = self.copies.add_copies(book, count)
+            self.copies.lend(lent, user_id)
+            if self.journal is not None:
+                self.journal.append(partial(self._discard_copies, book, lent))
+        self._register_loan(book, user_id, count)
+        self.statistics['total_borrowed'] += count
+        now = datetime.now()
+        self.circulation.record(BORROW, book, count, now)
+        if self.journal is not None:
+            self.journal.append(partial(self.circulation.record, BORROW, book, -count, now))
+        self.due_index.add(book, user_id, count, due if due is not None else now + self.loan_period)
+        return OperationResult(OperationStatus.BORROWED, book, count, self.collection.get_count(book), user_id)
+
+    def _discard_copies(self, book: Book, barcodes: list[int]) -> None:
+        """Откат учета выданных экземпляров: их нет на полке, поэтому после возврата они списываются"""
+        self.copies.checkin(barcodes) # type: ignore
+        self.copies.sync(book, self.collection.get_count(book)) # type: ignore
+
+    def _checkout_copies(self, book: Book, user_id: int, count: int, available: int,
+                         barcodes: Optional[list[int]]) -> None:
+        if self.copies is None:
+            raise LibraryException("Copy tracking is not enabled")
+        # поступления и списания идут мимо реестра - выравниваем его с коллекцией перед выдачей
+        self.copies.sync(book, available)
+        lent = self.copies.checkout(book, user_id, count, barcodes)
+        if self.journal is not None:
+            self.journal.append(partial(self.copies.checkin, lent))
+
+    def _register_loan(self, book: Book, user_id: int, count: int) -> None:
+        """Учет выдачи у книги и у читателя (без изменения коллекции)"""
+        # до записи в журнал: при откате читатель остается в памяти, а не теряется
+        self._fault_in(user_id)
+        self._own_loan(book, user_id)
+        if self.journal is not None:
+            self._journal_loan(book, user_id)
         if book not in self.borrowed_books:
             self.borrowed_books[book] = {}
         current_borrowed = self.borrowed_books[book].get(user_id, 0)
         self.borrowed_books[book][user_id] = current_borrowed + count
+        if self.history is not None:
+            self.history.record(book.isbn, count, user_id) # type: ignore
+        if self.state_hashes is not None:
+            self.state_hashes.loan(book, user_id, count)
+        if self.stream_stats is not None:
+            self.stream_stats.record_borrow(book, user_id, count)
+            if self.journal is not None:
+                self.journal.append(partial(self.stream_stats.unrecord_borrow, book, count))
 
         if user_id not in self.borrowers:
             self.statistics['active_borrowers']+=1
@@ -48,28 +376,52 @@ class Library:
                 borrowed_books={},
                 first_borrow_date=datetime.now()
             )
+            self.borrower_ids.add(user_id)
             self.statistics['unique_borrowers'] += 1
         borrower = self.borrowers[user_id]
+        if not borrower.borrowed_books and borrower.total_borrowed:
+            # читатель вернул все книги ранее и снова стал активным
+            self.statistics['active_borrowers'] += 1
         borrower.borrowed_books[book] = borrower.borrowed_books.get(book, 0) + count
         borrower.total_borrowed += count
         borrower.last_activity_date = datetime.now()
+        if self.recommender.record(user_id, book) and self.journal is not None:
+            self.journal.append(partial(self.recommender.unrecord, user_id, book))
 
-        self.collection.delete_book(book, count)
-        self.statistics['total_borrowed'] += count
-        return f"{COLORS.GREEN}Borrowed {count} copy/copies of '{book.title}' for user {user_id}{COLORS.RESET}"
+    def _loaned_book(self, book: Book) -> Book:
+        """Ключ borrowed_books для книги, ISBN которой мог прийти в другой записи"""
+        if book in self.borrowed_books:
+            return book
+        key = isbn_key(book.isbn) # type: ignore
+        for loaned in self.borrowed_books:
+            if isbn_key(loaned.isbn) == key and same_book(loaned, book): # type: ignore
+                return loaned
+        return book
 
-    def return_books(self, book: Book, user_id: int, count: int = 1) -> str:
-        """Возврат нескольких экземпляров книги"""
+    @replicated('library')
+    def return_books(self, book: Book, user_id: int, count: int = 1,
+                     barcodes: Optional[list[int]] = None) -> OperationResult:
+        """Возврат нескольких экземпляров книги (при учете экземпляров - указанных штрихкодов или любых)"""
         if count <= 0:
             raise LibraryException("Count must be positive")
+        book = self._loaned_book(book)
         if book not in self.borrowed_books or user_id not in self.borrowed_books[book]:
-            return f"{COLORS.RED}Return: User {user_id} has no copies of '{book.title}' borrowed{COLORS.RESET}"
+            return OperationResult(OperationStatus.NOT_BORROWED, book, count, 0, user_id)
 
         current_borrowed = self.borrowed_books[book][user_id]
         if current_borrowed < count:
-            return f"{COLORS.RED}Return: User {user_id} has only {current_borrowed} copies of '{book.title}' borrowed, but trying to return {count}{COLORS.RESET}"
+            return OperationResult(OperationStatus.RETURN_EXCEEDS, book, count, current_borrowed, user_id)
 
+        if barcodes is not None or self.copies is not None:
+            self._return_copies(book, user_id, count, barcodes)
+        self._own_loan(book, user_id)
+        if self.journal is not None:
+            self._journal_loan(book, user_id)
         self.borrowed_books[book][user_id] -= count
+        if self.history is not None:
+            self.history.record(book.isbn, -count, user_id) # type: ignore
+        if self.state_hashes is not None:
+            self.state_hashes.loan(book, user_id, -count)
         if self.borrowed_books[book][user_id] == 0:
             del self.borrowed_books[book][user_id]
         if not self.borrowed_books[book]:
@@ -87,20 +439,73 @@ class Library:
                 # del self.borrowers[user_id]
                 self.statistics['active_borrowers']-=1
 
-        self.collection.add_book(book, count)
         self.statistics['total_returned'] += count
+        now = datetime.now()
+        self.circulation.record(RETURN, book, count, now)
+        if self.journal is not None:
+            self.journal.append(partial(self.circulation.record, RETURN, book, -count, now))
+        self.due_index.release(book, user_id, count)
+        # последним шагом: поступление экземпляров запускает выдачу по заявкам
+        self.collection.add_book(book, count)
+
+        return OperationResult(OperationStatus.RETURNED, book, count, current_borrowed - count, user_id)
+
+    def _return_copies(self, book: Book, user_id: int, count: int, barcodes: Optional[list[int]]) -> None:
+        if self.copies is None:
+            raise LibraryException("Copy tracking is not enabled")
+        returned = self.copies.return_copies(book, user_id, count, barcodes)
+        if self.journal is not None:
+            self.journal.append(partial(self.copies.lend, returned, user_id))
+
+    @replicated('library')
+    def place_hold(self, book: Book, user_id: int, count: int = 1) -> Hold:
+        """Заявка на книгу: экземпляры будут выданы автоматически при поступлении"""
+        self.collection.validate_book(book)
+        hold = self.holds.place(book, user_id, count)
+        if self.journal is not None:
+            self.journal.append(partial(self.holds.cancel, hold.hold_id))
+        self._allocate_holds(book, 0)
+        return hold
+
+    @replicated('library')
+    def cancel_hold(self, hold_id: int) -> Hold:
+        """Отмена заявки"""
+        hold = self.holds.cancel(hold_id)
+        if self.journal is not None:
+            self.journal.append(partial(self.holds.restore, hold))
+        return hold
+
+    def get_hold_position(self, hold_id: int) -> int:
+        """Позиция заявки в очереди (с 1)"""
+        return self.holds.position(hold_id)
 
-        return f"{COLORS.GREEN}Returned {count} copy/copies of '{book.title}' from user {user_id}{COLORS.RESET}"
+    def _allocate_holds(self, book: Book, count: int) -> None:
+        """Выдача поступивших экземпляров по заявкам в порядке очереди"""
+        isbn = book.isbn
+        while True:
+            hold = self.holds.peek(isbn) # type: ignore
+            if hold is None:
+                return
+            current_count = self.collection.get_count(book)
+            if current_count < hold.count:
+                # экземпляры остаются на полке в резерве очереди (см. borrow_books)
+                return
+            self.holds.pop(isbn) # type: ignore
+            if self.journal is not None:
+                self.journal.append(partial(self.holds.restore, hold))
+            self._lend(self.collection[isbn], hold.user_id, hold.count, current_count) # type: ignore
+            self.statistics['holds_fulfilled'] += 1
 
     def get_user_borrowed_books(self, user_id: int) -> dict:
         """Получить все книги, выданные пользователю"""
-        if user_id in self.borrowers:
-            return self.borrowers[user_id].borrowed_books.copy()
+        borrower = self._fault_in(user_id)
+        if borrower is not None:
+            return borrower.borrowed_books.copy()
         return {}
 
     def get_borrower_info(self, user_id: int):
         """Полная информация о читателе"""
-        return self.borrowers.get(user_id)
+        return self._fault_in(user_id)
 
     def get_active_borrowers(self) -> list:
         """Активные читатели (у которых есть книги на руках)"""
@@ -109,6 +514,12 @@ class Library:
             for user_id, borrower in self.borrowers.items() if borrower.borrowed_books
         ]
 
+    def page_borrowers(self, cursor: Optional[int] = None, size: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Страница читателей (BorrowerInfo) по возрастанию user_id; курсор - последний выданный user_id"""
+        page = self.borrower_ids.page(cursor, size)
+        page.items = [self.borrowers[user_id] for user_id in page.items]
+        return page
+
     def get_book_borrow_info(self, book: Book) -> dict:
         """Получить информацию о выдаче конкретной книги"""
         if book not in self.borrowed_books:
@@ -140,6 +551,53 @@ class Library:
             book_borrow_counts.append((book, total_borrowed))
         return sorted(book_borrow_counts, key=lambda x: x[1], reverse=True)[:limit]
 
+    def get_overdue_loans(self, moment: Optional[datetime] = None) -> list[Loan]:
+        """Партии выдач со сроком возврата раньше moment (по умолчанию - сейчас)"""
+        return self.due_index.due_before(moment or datetime.now())
+
+    def get_next_due_loan(self) -> Optional[Loan]:
+        """Ближайшая по сроку возврата партия"""
+        return self.due_index.next_due()
+
+    @replicated('library')
+    def renew_loan(self, book: Book, user_id: int, period: Optional[timedelta] = None) -> list[Loan]:
+        """Продление выдачи на period (по умолчанию - loan_period) от текущего момента"""
+        if self.journal is not None:
+            self.journal.append(partial(
+                self.due_index.restore_holder, book, user_id, self.due_index.snapshot_holder(book, user_id)
+            ))
+        return self.due_index.renew(book, user_id, datetime.now() + (period or self.loan_period))
+
+    def sweep_overdue(self, batch_size: int = 100, only_new: bool = False):
+        """Пакеты просроченных выдач для рассылки уведомлений"""
+        return self.due_index.sweep(datetime.now(), batch_size, only_new)
+
+    def recommend_books(self, book: Book, limit=5) -> list:
+        """Книги, которые чаще всего брали читатели этой книги: [(book, score)]"""
+        return self.recommender.recommend(book, limit)
+
+    def rebuild_recommendations(self) -> None:
+        """Полная пересборка матрицы совместных выдач (с учетом текущих выдач читателей)"""
+        self.recommender.rebuild(
+            (user_id, borrower.borrowed_books.keys()) for user_id, borrower in self.borrowers.items()
+        )
+
+    def to_columnar(self):
+        """Колоночный снимок коллекции с числом выданных экземпляров (нужен numpy)"""
+        return self.collection.to_columnar(self.borrowed_books)
+
+    def get_trending_books(self, window_seconds: int = 7 * 24 * 3600, limit=5) -> list:
+        """Самые выдаваемые книги за последнее окно времени (по всем выдачам, а не только текущим)"""
+        return self.circulation.top_books(window_seconds, limit, now=datetime.now())
+
+    def get_trending_genres(self, window_seconds: int = 7 * 24 * 3600, limit=5) -> list:
+        """Самые выдаваемые жанры за последнее окно времени"""
+        return self.circulation.top_genres(window_seconds, limit, now=datetime.now())
+
+    def get_borrow_rate(self, window_seconds: int = 3600) -> float:
+        """Выдач в час за последнее окно времени"""
+        return self.circulation.rate(window_seconds, now=datetime.now())
+
     def generate_report(self) -> dict:
         """Генерация отчета"""
         return {
@@ -148,7 +606,8 @@ class Library:
             'total_copies': self.collection.total_count(),
             'authors_count': self.collection.index_dict.author_count(),
             'genres_count': self.collection.index_dict.genre_count(),
-            'statistics': self.statistics.copy()
+            'statistics': self.statistics.copy(),
+            'metrics': self.metrics.snapshot() if self.metrics is not None else {}
         }
 
     def __repr__(self):
@@ -160,10 +619,16 @@ class Library:
         """Получить все доступные книги"""
         return [book for book, count in self.collection.items if count > 0]
 
+    def iter_available_books(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Book]:
+        """Доступные книги постранично, без списка всей коллекции в памяти"""
+        for book, count in iter_paged(lambda cursor: self.collection.page(cursor, page_size)):
+            if count > 0:
+                yield book
+
     def is_book_available(self, book: Book, count: int = 1) -> bool:
-        """Доступна ли книга в нужном количестве"""
+        """Доступна ли книга в нужном количестве (без экземпляров в резерве заявок)"""
         return (book in self.collection and
-                self.collection.get_count(book) >= count)
+                self.collection.get_count(book) - self.holds.reserved(book.isbn) >= count) # type: ignore
 
     def get_top_borrowers(self, limit=5) -> list:
         """Самые активные читатели на текущий момент"""
@@ -175,10 +640,10 @@ class Library:
 
     def get_borrower_history(self, user_id: int) -> None | dict:
         """История выдачи/возврата для читателя"""
-        if user_id not in self.borrowers:
+        borrower = self._fault_in(user_id)
+        if borrower is None:
             return None
 
-        borrower = self.borrowers[user_id]
         return {
             'user_id': user_id,
             'currently_borrowed': borrower.borrowed_books.copy(),
@@ -0,0 +1,250 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+from src.book_collection import Book, BookCollection, LibraryException
+from src.isbn import IsbnKey, isbn_key
+from src.query_cache import MISSING
+from src.results import OperationResult
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_TTL = 24 * 3600.0
+DEFAULT_NEGATIVE_TTL = 600.0
+DEFAULT_BATCH_SIZE = 50
+
+
+class MetadataProvider(ABC):
+    """Источник библиографических данных (внешний сервис каталога)"""
+
+    @abstractmethod
+    def fetch_many(self, isbns: list[str]) -> dict[str, Book]:
+        """Данные по списку ISBN за один запрос (ключи ответа - ISBN как в запросе);
+        отсутствующие в ответе ISBN неизвестны сервису"""
+
+
+class FakeMetadataServer(MetadataProvider):
+    """Локальный сервер для тестов и бенчмарков: фиксированная задержка на каждый запрос"""
+
+    def __init__(self, books: Iterable[Book] = (), latency: float = 0.0, max_batch_size: Optional[int] = None):
+        self.books: dict[IsbnKey, Book] = {isbn_key(book.isbn): book for book in books} # type: ignore
+        self.latency = latency
+        self.max_batch_size = max_batch_size
+        self.round_trips = 0
+        self.requested: list[str] = []
+        self.fail_next = 0  # сколько следующих запросов завершатся ошибкой
+        self._lock = threading.Lock()
+
+    def fetch_many(self, isbns: list[str]) -> dict[str, Book]:
+        if self.max_batch_size is not None and len(isbns) > self.max_batch_size:
+            raise LibraryException(f"Batch of {len(isbns)} ISBNs exceeds server limit {self.max_batch_size}")
+        with self._lock:
+            self.round_trips += 1
+            self.requested.extend(isbns)
+            failing = self.fail_next > 0
+            if failing:
+                self.fail_next -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            raise LibraryException("Metadata server unavailable")
+        found = {isbn: self.books.get(isbn_key(isbn)) for isbn in isbns}
+        return {isbn: book for isbn, book in found.items() if book is not None}
+
+
+class MetadataCache:
+    """Кэш перед MetadataProvider: LRU с TTL, кэширование отсутствия, склейка одновременных запросов одного ISBN
+    и пакетные запросы (не больше batch_size ISBN за обращение к сервису)"""
+
+    def __init__(self, provider: MetadataProvider, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL, batch_size: int = DEFAULT_BATCH_SIZE,
+                 clock: Callable[[], float] = time.monotonic):
+        if maxsize < 0:
+            raise LibraryException("Cache size must be non-negative")
+        if batch_size <= 0:
+            raise LibraryException("Batch size must be positive")
+        self.provider = provider
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+        self.clock = clock
+        # ключ ISBN (см. src/isbn.py): (истекает, книга или None) - запись ISBN в запросе не важна
+        self.entries: OrderedDict[IsbnKey, tuple[float, Optional[Book]]] = OrderedDict()
+        self._inflight: dict[IsbnKey, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.coalesced = 0   # запросы, дождавшиеся чужого обращения к сервису
+        self.round_trips = 0
+        self.errors = 0
+        self.fetch_time = 0.0
+        self.max_fetch_time = 0.0
+
+    def _lookup(self, key: IsbnKey, now: float):
+        """Запись из кэша (книга или None) или MISSING; вызывается под блокировкой"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        if entry[0] <= now:
+            del self.entries[key]
+            self.expired += 1
+            return MISSING
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: IsbnKey, book: Optional[Book], now: float) -> None:
+        if self.maxsize == 0:
+            return
+        ttl = self.ttl if book is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        self.entries[key] = (now + ttl, book)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, isbn: str) -> Optional[Book]:
+        """Книга по ISBN или None, если сервис ее не знает"""
+        return self.get_many([isbn])[isbn]
+
+    def get_many(self, isbns: Iterable[str]) -> dict[str, Optional[Book]]:
+        """Книги по списку ISBN: из кэша, из уже идущих запросов или пакетами из сервиса.
+
+        Разные записи одного ISBN (ISBN-10 и ISBN-13, дефисы) - один запрос и одна запись кэша
+        """
+        spellings: dict[IsbnKey, str] = {}   # ключ ISBN: первая запись из запроса (для сервиса)
+        requested = [(isbn, isbn_key(isbn)) for isbn in isbns]
+        for isbn, key in requested:
+            spellings.setdefault(key, isbn)
+        values: dict[IsbnKey, Optional[Book]] = {}
+        waiting: dict[IsbnKey, Future] = {}
+        owned: dict[IsbnKey, Future] = {}
+        with self._lock:
+            now = self.clock()
+            for key in spellings:
+                cached = self._lookup(key, now)
+                if cached is not MISSING:
+                    if cached is None:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    values[key] = cached
+                elif key in self._inflight:
+                    self.coalesced += 1
+                    waiting[key] = self._inflight[key]
+                else:
+                    self.misses += 1
+                    owned[key] = self._inflight[key] = Future()
+
+        pending = [(key, spellings[key]) for key in owned]
+        for start in range(0, len(pending), self.batch_size):
+            self._fetch(pending[start:start + self.batch_size], owned)
+        for key, future in {**owned, **waiting}.items():
+            values[key] = future.result()
+        return {isbn: values[key] for isbn, key in requested}
+
+    def _fetch(self, batch: list[tuple[IsbnKey, str]], futures: dict[IsbnKey, Future]) -> None:
+        started = time.perf_counter()
+        try:
+            found = self.provider.fetch_many([isbn for _, isbn in batch])
+        except Exception as error:
+            with self._lock:
+                self.round_trips += 1
+                self.errors += 1
+                for key, _ in batch:
+                    del self._inflight[key]
+            # ошибка сервиса не кэшируется: следующий запрос повторит обращение
+            for key, _ in batch:
+                futures[key].set_exception(error)
+            return
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.round_trips += 1
+            self.fetch_time += elapsed
+            self.max_fetch_time = max(self.max_fetch_time, elapsed)
+            now = self.clock()
+            for key, isbn in batch:
+                self._store(key, found.get(isbn), now)
+                del self._inflight[key]
+        for key, isbn in batch:
+            futures[key].set_result(found.get(isbn))
+
+    def invalidate(self, isbn: str) -> None:
+        with self._lock:
+            self.entries.pop(isbn_key(isbn), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'round_trips': self.round_trips,
+            'errors': self.errors,
+            'hit_ratio': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            'mean_fetch_time': self.fetch_time / self.round_trips if self.round_trips else 0.0,
+            'max_fetch_time': self.max_fetch_time,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"MetadataCache({len(self.entries)}/{self.maxsize} entries, {self.round_trips} round trips)"
+
+
+@dataclass
+class IntakeReport:
+    """Итог приема книг по ISBN"""
+    added: list[OperationResult] = field(default_factory=list)
+    unknown: list[str] = field(default_factory=list)                 # ISBN, не найденные в сервисе
+    errors: list[tuple[str, str]] = field(default_factory=list)      # (ISBN, причина)
+
+    def __repr__(self):
+        return f"IntakeReport({len(self.added)} added, {len(self.unknown)} unknown, {len(self.errors)} errors)"
+
+
+def intake(collection: BookCollection, metadata: MetadataCache, items: Iterable[tuple[str, int]]) -> IntakeReport:
+    """Прием возвращенных или подаренных книг по ISBN.
+
+    Книги, которых нет в коллекции, запрашиваются у сервиса одним набором запросов
+    (пакетами через кэш), а не по одной
+    """
+    items = list(items)
+    report = IntakeReport()
+    missing = [isbn for isbn, _ in items if collection.index_dict.get_by_isbn(isbn) is None]
+    try:
+        fetched = metadata.get_many(missing) if missing else {}
+    except Exception as error:
+        report.errors.extend((isbn, str(error)) for isbn in dict.fromkeys(missing))
+        fetched = None
+    for isbn, count in items:
+        book = collection.index_dict.get_by_isbn(isbn)
+        if book is None:
+            if fetched is None:
+                continue
+            book = fetched.get(isbn)
+            if book is None:
+                report.unknown.append(isbn)
+                continue
+        try:
+            report.added.append(collection.add_book(book, count))
+        except LibraryException as error:
+            report.errors.append((isbn, str(error)))
+    return report
@@ -0,0 +1,163 @@
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter_ns
+from typing import Any, Callable, Optional
+
+# Лог-линейные границы бакетов в наносекундах: 1..9 * 10^e, от 1 мкс до 100 с
+BUCKET_BOUNDS_NS: tuple[int, ...] = tuple(
+    m * 10 ** e for e in range(3, 11) for m in range(1, 10)
+) + (10 ** 11,)
+
+
+class Histogram:
+    """Гистограмма задержек с лог-линейными бакетами"""
+
+    __slots__ = ('counts', 'count', 'sum_ns')
+
+    def __init__(self):
+        # последний бакет - переполнение (+Inf)
+        self.counts: list[int] = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count: int = 0
+        self.sum_ns: int = 0
+
+    def observe(self, value_ns: int) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, value_ns)] += 1
+        self.count += 1
+        self.sum_ns += value_ns
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля (в секундах) по верхней границе бакета"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                if i < len(BUCKET_BOUNDS_NS):
+                    return BUCKET_BOUNDS_NS[i] / 1e9
+                return float('inf')
+        return float('inf')
+
+
+class OperationStats:
+    """Счетчики одной операции"""
+
+    __slots__ = ('calls', 'errors', 'latency')
+
+    def __init__(self):
+        self.calls: int = 0
+        self.errors: int = 0
+        self.latency = Histogram()
+
+    def snapshot(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_seconds': self.latency.sum_ns / 1e9,
+            'p50_seconds': self.latency.quantile(0.5),
+            'p99_seconds': self.latency.quantile(0.99),
+        }
+
+
+class Metrics:
+    """Реестр метрик по операциям (component.operation)"""
+
+    def __init__(self):
+        self.operations: dict[tuple[str, str], OperationStats] = {}
+
+    def stats(self, component: str, operation: str) -> OperationStats:
+        key = (component, operation)
+        stats = self.operations.get(key)
+        if stats is None:
+            stats = self.operations[key] = OperationStats()
+        return stats
+
+    def snapshot(self) -> dict:
+        """Срез метрик в виде словаря"""
+        return {
+            f"{component}.{operation}": stats.snapshot()
+            for (component, operation), stats in sorted(self.operations.items())
+        }
+
+    def reset(self) -> None:
+        self.operations.clear()
+
+    def to_prometheus(self, prefix: str = "library") -> str:
+        """Экспорт в текстовом формате Prometheus"""
+        lines = [
+            f"# HELP {prefix}_operation_calls_total Number of operation calls",
+            f"# TYPE {prefix}_operation_calls_total counter",
+        ]
+        items = sorted(self.operations.items())
+        for (component, operation), stats in items:
+            lines.append(f'{prefix}_operation_calls_total{{component="{component}",operation="{operation}"}} {stats.calls}')
+        lines.append(f"# HELP {prefix}_operation_errors_total Number of operations that raised")
+        lines.append(f"# TYPE {prefix}_operation_errors_total counter")
+        for (component, operation), stats in items:
+            lines.append(f'{prefix}_operation_errors_total{{component="{component}",operation="{operation}"}} {stats.errors}')
+        lines.append(f"# HELP {prefix}_operation_duration_seconds Operation latency")
+        lines.append(f"# TYPE {prefix}_operation_duration_seconds histogram")
+        for (component, operation), stats in items:
+            labels = f'component="{component}",operation="{operation}"'
+            cumulative = 0
+            for bound, c in zip(BUCKET_BOUNDS_NS, stats.latency.counts):
+                cumulative += c
+                lines.append(f'{prefix}_operation_duration_seconds_bucket{{{labels},le="{bound / 1e9:g}"}} {cumulative}')
+            lines.append(f'{prefix}_operation_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.latency.count}')
+            lines.append(f'{prefix}_operation_duration_seconds_sum{{{labels}}} {stats.latency.sum_ns / 1e9}')
+            lines.append(f'{prefix}_operation_duration_seconds_count{{{labels}}} {stats.latency.count}')
+        return "\n".join(lines) + "\n"
+
+
+def _timed(method: Callable, stats: OperationStats) -> Callable:
+    """Обертка, считающая вызовы, ошибки и задержку"""
+    latency = stats.latency
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        stats.calls += 1
+        start = perf_counter_ns()
+        try:
+            return method(*args, **kwargs)
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            latency.observe(perf_counter_ns() - start)
+    return wrapper
+
+
+def public_methods(obj: Any) -> list[str]:
+    """Имена публичных методов класса объекта"""
+    names = []
+    for klass in type(obj).__mro__:
+        if klass is object:
+            continue
+        for name, value in vars(klass).items():
+            if name.startswith('_') or name in names or not callable(value):
+                continue
+            if name in getattr(obj, 'METRICS_EXCLUDE', ()):
+                continue
+            names.append(name)
+    return names
+
+
+def instrument(obj: Any, metrics: Metrics, component: Optional[str] = None) -> None:
+    """Подмена публичных методов объекта на измеряющие обертки.
+
+    Обертки кладутся в атрибуты экземпляра, поэтому класс не меняется,
+    а после uninstrument вызовы снова идут напрямую в методы класса
+    """
+    component = component or type(obj).__name__
+    wrapped = []
+    for name in public_methods(obj):
+        setattr(obj, name, _timed(getattr(obj, name), metrics.stats(component, name)))
+        wrapped.append(name)
+    obj.__dict__['_instrumented'] = wrapped
+
+
+def uninstrument(obj: Any) -> None:
+    """Снятие оберток: на горячем пути не остается лишних фреймов"""
+    for name in obj.__dict__.pop('_instrumented', ()):
+        obj.__dict__.pop(name, None)
@@ -0,0 +1,149 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional, Sequence
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+@dataclass
+class Page:
+    """Страница выдачи и курсор для следующей.
+
+    Курсор указывает на последний выданный элемент, поэтому его можно
+    сохранить и продолжить позже, в том числе когда появятся новые записи
+    """
+    items: list = field(default_factory=list)
+    cursor: Optional[Any] = None
+    has_more: bool = False
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self):
+        return f"Page({len(self.items)} items, {'more' if self.has_more else 'last'})"
+
+
+def check_page_size(size: int) -> None:
+    if size <= 0:
+        raise ValueError("Page size must be positive")
+
+
+def resume_position(sequence: Sequence, cursor: Optional[tuple], key: Callable[[Any], Hashable]) -> int:
+    """Позиция, с которой продолжать выдачу последовательности в порядке добавления.
+
+    Курсор - (позиция после последнего выданного элемента, ключ этого элемента).
+    Вставки идут в конец и позиций не сдвигают; удаления левее курсора сдвигают
+    последний выданный элемент влево, поэтому он ищется назад от позиции
+    """
+    if cursor is None:
+        return 0
+    position, last_key = cursor
+    for i in range(min(position, len(sequence)) - 1, -1, -1):
+        if key(sequence[i]) == last_key:
+            return i + 1
+    # последний выданный элемент удален: следующие за ним сдвинулись на его место
+    # (если между страницами удалены и другие элементы левее курсора, часть записей пропустится;
+    # где порядок задан номерами позиций, используйте positions_page)
+    return max(0, min(position - 1, len(sequence)))
+
+
+def sequence_page(sequence: Sequence, cursor: Optional[tuple], size: int,
+                  key: Callable[[Any], Hashable]) -> Page:
+    """Страница последовательности (items коллекции, список книг индекса) по курсору"""
+    check_page_size(size)
+    start = resume_position(sequence, cursor, key)
+    items = list(sequence[start:start + size])
+    if not items:
+        return Page([], cursor, False)
+    end = start + len(items)
+    return Page(items, (end, key(items[-1])), end < len(sequence))
+
+
+def positions_page(sequence: Sequence, positions: Sequence[int], cursor: Optional[tuple], size: int,
+                   key: Callable[[Any], Hashable]) -> Page:
+    """Страница последовательности по курсору на номер позиции (keyset).
+
+    positions - возрастающие номера элементов sequence, которые не меняются при
+    вставках и удалениях; курсор - (номер последнего выданного элемента, его ключ).
+    Продолжение ищется бинарным поиском за O(log N + size) и ничего не пропускает,
+    сколько бы элементов ни удалили левее курсора
+    """
+    check_page_size(size)
+    start = bisect_right(positions, cursor[0]) if cursor is not None else 0
+    items = list(sequence[start:start + size])
+    if not items:
+        return Page([], cursor, False)
+    end = start + len(items)
+    return Page(items, (positions[end - 1], key(items[-1])), end < len(sequence))
+
+
+class SortedKeys:
+    """Поддерживаемый отсортированный список ключей для страниц по возрастанию (bisect).
+
+    Добавление и удаление - бинарный поиск и сдвиг списка; страница - O(log N + size)
+    """
+
+    def __init__(self, keys: Iterable = ()):
+        self.keys: list = sorted(set(keys))
+
+    def add(self, key: Any) -> None:
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.keys.insert(i, key)
+
+    def discard(self, key: Any) -> None:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def page(self, cursor: Optional[Any], size: int) -> Page:
+        """Страница ключей после курсора (последнего выданного ключа)"""
+        check_page_size(size)
+        start = bisect_right(self.keys, cursor) if cursor is not None else 0
+        items = self.keys[start:start + size]
+        return Page(items, items[-1] if items else cursor, start + size < len(self.keys))
+
+    def __contains__(self, key: Any) -> bool:
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __repr__(self):
+        return f"SortedKeys({len(self.keys)} keys)"
+
+
+def sorted_keys_page(keys: Iterable, cursor: Optional[Any], size: int) -> Page:
+    """Страница ключей по возрастанию, начиная после курсора (последнего выданного ключа).
+
+    Память - O(size) независимо от числа ключей; время - один проход по ключам, поэтому
+    для частого обхода поддерживаемых ключей лучше SortedKeys
+    """
+    check_page_size(size)
+    if cursor is not None:
+        keys = (key for key in keys if key > cursor)
+    page = heapq.nsmallest(size + 1, keys)
+    items = page[:size]
+    return Page(items, items[-1] if items else cursor, len(page) > size)
+
+
+def iter_pages(fetch: Callable[[Optional[Any]], Page], cursor: Optional[Any] = None) -> Iterator[Page]:
+    """Все страницы, начиная с курсора: fetch(cursor) возвращает следующую"""
+    while True:
+        page = fetch(cursor)
+        if page.items:
+            yield page
+        if not page.has_more:
+            return
+        cursor = page.cursor
+
+
+def iter_paged(fetch: Callable[[Optional[Any]], Page], cursor: Optional[Any] = None) -> Iterator[Any]:
+    """Элементы всех страниц подряд (в памяти только текущая страница)"""
+    for page in iter_pages(fetch, cursor):
+        yield from page.items
@@ -0,0 +1,148 @@
+import os
+import unicodedata
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+from src.book_collection import Book, BookCollection, LibraryException
+from src.isbn import normalize_isbn
+
+DEFAULT_SHARD_SIZE = 5000
+
+
+@dataclass
+class ValidatedBatch:
+    """Пакет проверенных записей одного шарда.
+
+    books - компактные кортежи (title, author, year, genre, isbn, count),
+    errors - (номер записи во входном потоке, причина)
+    """
+    start: int
+    books: list[tuple] = field(default_factory=list)
+    positions: list[int] = field(default_factory=list)
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+
+@dataclass
+class ParallelImportReport:
+    """Итог параллельного импорта"""
+    rows: int = 0
+    imported: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def rejected(self) -> int:
+        return len(self.errors)
+
+    def __repr__(self):
+        return f"ParallelImportReport({self.rows} rows, {self.imported} imported, {self.rejected} rejected)"
+
+
+def normalize_text(value: Any) -> Any:
+    """NFC-нормализация и схлопывание пробелов; пустая строка становится None"""
+    if not isinstance(value, str):
+        return value
+    value = " ".join(unicodedata.normalize('NFC', value).split())
+    return value or None
+
+
+def _normalize_int(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def normalize_record(record: dict) -> tuple[Book, int]:
+    """Нормализация и проверка одной записи, LibraryException при ошибке"""
+    book = Book(
+        title=normalize_text(record.get('title')),
+        author=normalize_text(record.get('author')),
+        year=_normalize_int(record.get('year')),
+        genre=normalize_text(record.get('genre')),
+        isbn=normalize_isbn(record.get('isbn')),
+    )
+    BookCollection.validate_book(book)
+    count = _normalize_int(record.get('count'))
+    if count is None:
+        count = 1
+    if not isinstance(count, int) or isinstance(count, bool):
+        raise LibraryException(f"Count must be an integer, found {type(count)}: {count}")
+    if count <= 0:
+        raise LibraryException("Count must be positive")
+    return book, count
+
+
+def validate_shard(start: int, records: list[dict]) -> ValidatedBatch:
+    """Обработка шарда (выполняется в рабочем процессе)"""
+    batch = ValidatedBatch(start)
+    for offset, record in enumerate(records):
+        position = start + offset
+        try:
+            if not isinstance(record, dict):
+                raise LibraryException("Malformed record")
+            book, count = normalize_record(record)
+        except LibraryException as e:
+            batch.errors.append((position, e.message))
+            continue
+        batch.books.append((book.title, book.author, book.year, book.genre, book.isbn, count))
+        batch.positions.append(position)
+    return batch
+
+
+def _shards(records: Iterable[dict], shard_size: int) -> Iterator[tuple[int, list[dict]]]:
+    iterator = iter(records)
+    start = 0
+    while True:
+        shard = list(islice(iterator, shard_size))
+        if not shard:
+            return
+        yield start, shard
+        start += len(shard)
+
+
+def prevalidate(records: Iterable[dict], workers: Optional[int] = None,
+                shard_size: int = DEFAULT_SHARD_SIZE) -> Iterator[ValidatedBatch]:
+    """Параллельная проверка записей с сохранением порядка входа.
+
+    В работе одновременно не больше 2 * workers шардов, поэтому память
+    ограничена независимо от длины входа. workers=0 - без процессов
+    """
+    if shard_size <= 0:
+        raise LibraryException("Shard size must be positive")
+    if workers == 0:
+        for start, shard in _shards(records, shard_size):
+            yield validate_shard(start, shard)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        window = 2 * workers
+        pending: deque[Future] = deque()
+        for start, shard in _shards(records, shard_size):
+            pending.append(executor.submit(validate_shard, start, shard))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parallel_import(collection: BookCollection, records: Iterable[dict], workers: Optional[int] = None,
+                    shard_size: int = DEFAULT_SHARD_SIZE) -> ParallelImportReport:
+    """Импорт в коллекцию: проверка в пуле процессов, вставка пакетами без повторной проверки"""
+    report = ParallelImportReport()
+    for batch in prevalidate(records, workers, shard_size):
+        report.rows += len(batch.books) + len(batch.errors)
+        insert_errors = collection.add_prevalidated(
+            (Book(*row[:5]), row[5]) for row in batch.books
+        )
+        report.imported += len(batch.books) - len(insert_errors)
+        errors = batch.errors + [(batch.positions[i], reason) for i, reason in insert_errors]
+        errors.sort()
+        report.errors.extend(errors)
+    return report
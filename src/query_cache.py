@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+DEFAULT_CACHE_SIZE = 1024
+
+MISSING = object()
+
+
+class QueryCache:
+    """LRU-кэш результатов запросов с проверкой поколений индексов.
+
+    Каждая запись хранит поколения индексов, от которых она зависит.
+    Если хотя бы одно поколение изменилось, запись считается устаревшей,
+    поэтому изменение индекса авторов не трогает записи по жанрам
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        if maxsize < 0:
+            raise ValueError("Cache size must be non-negative")
+        self.maxsize = maxsize
+        self.entries: OrderedDict[Hashable, tuple[tuple, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, generations: tuple) -> Any:
+        """Значение по ключу или MISSING, если его нет или оно устарело"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        if entry[0] != generations:
+            del self.entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return MISSING
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, generations: tuple, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        self.entries[key] = (generations, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"QueryCache({len(self.entries)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses)"
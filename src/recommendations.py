@@ -0,0 +1,127 @@
+import heapq
+import math
+from array import array
+from typing import Iterable, Optional
+from src.book_collection import Book
+from src.isbn import IsbnKey, isbn_key
+
+
+class CoBorrowRecommender:
+    """Рекомендации "с этой книгой также брали" по совместным выдачам.
+
+    Матрица совместных выдач хранится в сжатом построчном виде (CSR на
+    массивах array) после полной пересборки, а изменения между пересборками
+    копятся в небольшом словаре дельт. Сходство - косинусное:
+    cooc(x, y) / sqrt(readers(x) * readers(y))
+    """
+
+    def __init__(self):
+        self.item_ids: dict[IsbnKey, int] = {}    # ключ ISBN: id
+        self.items: list[Book] = []               # id: Book
+        self.readers = array('i')                 # id: число разных читателей
+        self.user_items: dict[int, set[int]] = {} # user_id: id книг, которые он брал
+        # CSR: строка x - indices[indptr[x]:indptr[x + 1]] и counts в тех же позициях
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.counts = array('i')
+        self.delta: dict[int, dict[int, int]] = {}
+
+    def _item_id(self, book: Book) -> int:
+        key = isbn_key(book.isbn) # type: ignore
+        item_id = self.item_ids.get(key)
+        if item_id is None:
+            item_id = self.item_ids[key] = len(self.items)
+            self.items.append(book)
+            self.readers.append(0)
+        else:
+            self.items[item_id] = book
+        return item_id
+
+    def record(self, user_id: int, book: Book) -> bool:
+        """Учесть выдачу книги читателю (повторные выдачи той же книги не считаются)"""
+        item = self._item_id(book)
+        seen = self.user_items.setdefault(user_id, set())
+        if item in seen:
+            return False
+        self.readers[item] += 1
+        delta = self.delta
+        row = delta.setdefault(item, {})
+        for other in seen:
+            row[other] = row.get(other, 0) + 1
+            other_row = delta.setdefault(other, {})
+            other_row[item] = other_row.get(item, 0) + 1
+        seen.add(item)
+        return True
+
+    def unrecord(self, user_id: int, book: Book) -> None:
+        """Отменить учет выдачи, ранее добавленной record"""
+        item = self.item_ids.get(isbn_key(book.isbn)) # type: ignore
+        seen = self.user_items.get(user_id)
+        if item is None or seen is None or item not in seen:
+            return
+        seen.discard(item)
+        if not seen:
+            del self.user_items[user_id]
+        self.readers[item] -= 1
+        delta = self.delta
+        row = delta.setdefault(item, {})
+        for other in seen:
+            row[other] = row.get(other, 0) - 1
+            other_row = delta.setdefault(other, {})
+            other_row[item] = other_row.get(item, 0) - 1
+
+    def _row(self, item: int) -> dict[int, int]:
+        row: dict[int, int] = {}
+        if item + 1 < len(self.indptr):
+            start, end = self.indptr[item], self.indptr[item + 1]
+            row = dict(zip(self.indices[start:end], self.counts[start:end]))
+        for other, count in self.delta.get(item, {}).items():
+            row[other] = row.get(other, 0) + count
+        return row
+
+    def rebuild(self, histories: Optional[Iterable[tuple[int, Iterable[Book]]]] = None) -> None:
+        """Полная пересборка матрицы из истории выдач (и дополнительных пар читатель-книги)"""
+        if histories is not None:
+            for user_id, books in histories:
+                for book in books:
+                    self.record(user_id, book)
+        rows: list[dict[int, int]] = [{} for _ in self.items]
+        for seen in self.user_items.values():
+            ordered = sorted(seen)
+            for i, x in enumerate(ordered):
+                row_x = rows[x]
+                for y in ordered[i + 1:]:
+                    row_x[y] = row_x.get(y, 0) + 1
+                    row_y = rows[y]
+                    row_y[x] = row_y.get(x, 0) + 1
+        indptr = array('q', [0])
+        indices = array('i')
+        counts = array('i')
+        for row in rows:
+            for other in sorted(row):
+                indices.append(other)
+                counts.append(row[other])
+            indptr.append(len(indices))
+        self.indptr, self.indices, self.counts = indptr, indices, counts
+        self.delta = {}
+
+    def recommend(self, book: Book, k: int = 5) -> list[tuple[Book, float]]:
+        """Top-k книг, которые чаще всего брали вместе с данной"""
+        item = self.item_ids.get(isbn_key(book.isbn)) # type: ignore
+        if item is None or k <= 0:
+            return []
+        readers = self.readers
+        norm = readers[item]
+        scored = (
+            (other, count / math.sqrt(norm * readers[other]))
+            for other, count in self._row(item).items() if count > 0
+        )
+        best = heapq.nlargest(k, scored, key=lambda pair: (pair[1], -pair[0]))
+        return [(self.items[other], score) for other, score in best]
+
+    def memory_bytes(self) -> int:
+        """Объем сжатой части матрицы в байтах"""
+        return sum(a.itemsize * len(a) for a in (self.indptr, self.indices, self.counts, self.readers))
+
+    def __repr__(self):
+        return f"CoBorrowRecommender({len(self.items)} books, {len(self.user_items)} readers)"
@@ -0,0 +1,150 @@
+import hashlib
+import zlib
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+from src.book_collection import Book, LibraryException
+from src.change_feed import Change
+from src.isbn import isbn_key
+from src.library import Library
+
+DEFAULT_BUCKETS = 64
+MASK64 = (1 << 64) - 1
+
+
+def apply_changes(library: Library, changes: Iterable[Change]) -> int:
+    """Применение записей журнала к библиотеке по порядку; возвращает номер последней"""
+    last = 0
+    for change in changes:
+        target = library if change.target == 'library' else library.collection
+        getattr(target, change.op)(*change.args, **change.kwargs)
+        last = change.seq
+    return last
+
+
+class Replicator:
+    """Инкрементальная синхронизация реплики с основной библиотекой по журналу изменений"""
+
+    def __init__(self, source: Library, replica: Library, position: int = 0):
+        if source.feed is None:
+            raise LibraryException(f"Change feed is not enabled for library '{source.name}'")
+        self.source = source
+        self.replica = replica
+        self.position = position  # последний примененный номер
+
+    def sync(self) -> int:
+        """Применить новые записи журнала; возвращает их число"""
+        changes = self.source.feed.since(self.position) # type: ignore
+        if changes is None:
+            raise LibraryException(
+                f"Changes after {self.position} are no longer retained: full resync required"
+            )
+        if changes:
+            self.position = apply_changes(self.replica, changes)
+        return len(changes)
+
+    @property
+    def lag(self) -> int:
+        return self.source.feed.last_seq - self.position # type: ignore
+
+    def __repr__(self):
+        return f"Replicator('{self.source.name}' -> '{self.replica.name}', position {self.position})"
+
+
+def _bucket(isbn: str, buckets: int) -> int:
+    # по каноническому ключу: одна книга в разной записи ISBN попадает в один бакет
+    return zlib.crc32(str(isbn_key(isbn)).encode()) % buckets
+
+
+def _digest(entry: tuple) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(entry).encode(), digest_size=8).digest(), 'big')
+
+
+def _book_entry(book: Book) -> tuple:
+    return ('book', book.title, book.author, book.year, book.genre, book.isbn)
+
+
+def _loan_entry(book: Book, user_id: int) -> tuple:
+    return ('loan', book.isbn, user_id)
+
+
+class StateHashes:
+    """Хеши состояния по бакетам ISBN, которые поддерживаются при каждой записи.
+
+    Хеш бакета - сумма хешей записей (книга, выдача читателю), умноженных на число
+    экземпляров, по модулю 2**64: не зависит от порядка, а изменение остатка на delta
+    учитывается за O(1) без старого значения. Подключается через Library.enable_state_hashes
+    """
+
+    def __init__(self, library: Library, buckets: int = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.hashes = [0] * buckets
+        for book, count in library.collection.items:
+            self.stock(book, count)
+        for book, users in library.borrowed_books.items():
+            for user_id, count in users.items():
+                self.loan(book, user_id, count)
+
+    def _add(self, isbn: str, entry: tuple, delta: int) -> None:
+        bucket = _bucket(isbn, self.buckets)
+        self.hashes[bucket] = (self.hashes[bucket] + delta * _digest(entry)) & MASK64
+
+    def stock(self, book: Book, delta: int) -> None:
+        """Изменение остатка книги в коллекции"""
+        self._add(book.isbn, _book_entry(book), delta) # type: ignore
+
+    def loan(self, book: Book, user_id: int, delta: int) -> None:
+        """Изменение числа экземпляров книги у читателя"""
+        self._add(book.isbn, _loan_entry(book, user_id), delta) # type: ignore
+
+    def __repr__(self):
+        return f"StateHashes({self.buckets} buckets)"
+
+
+def _entries(library: Library) -> Iterator[tuple[str, tuple]]:
+    """Записи состояния для сравнения: остатки книг и выдачи (isbn, запись с числом экземпляров)"""
+    for book, count in library.collection.items:
+        yield book.isbn, (*_book_entry(book), count)
+    for book, users in library.borrowed_books.items():
+        for user_id, count in users.items():
+            yield book.isbn, (*_loan_entry(book, user_id), count)
+
+
+def state_hashes(library: Library, buckets: int = DEFAULT_BUCKETS) -> list[int]:
+    """Хеши состояния по бакетам ISBN.
+
+    При включенных Library.enable_state_hashes с тем же числом бакетов - готовые, за O(buckets);
+    иначе считаются проходом по коллекции и выдачам
+    """
+    hashes = library.state_hashes
+    if hashes is None or hashes.buckets != buckets:
+        hashes = StateHashes(library, buckets)
+    return hashes.hashes.copy()
+
+
+@dataclass
+class LibraryDiff:
+    """Расхождение двух библиотек: бакеты с разными хешами и записи, которые есть только с одной стороны"""
+    buckets: list[int] = field(default_factory=list)
+    only_left: list[tuple] = field(default_factory=list)
+    only_right: list[tuple] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.buckets)
+
+
+def diff(left: Library, right: Library, buckets: int = DEFAULT_BUCKETS) -> LibraryDiff:
+    """Поиск расхождений: сравниваются хеши бакетов, записи - только в несовпавших бакетах.
+
+    Совпадающие библиотеки с включенными хешами состояния сравниваются за O(buckets)
+    """
+    result = LibraryDiff()
+    result.buckets = [
+        i for i, (a, b) in enumerate(zip(state_hashes(left, buckets), state_hashes(right, buckets))) if a != b
+    ]
+    if result.buckets:
+        wanted = set(result.buckets)
+        left_entries = {entry for isbn, entry in _entries(left) if _bucket(isbn, buckets) in wanted}
+        right_entries = {entry for isbn, entry in _entries(right) if _bucket(isbn, buckets) in wanted}
+        result.only_left = sorted(left_entries - right_entries, key=repr)
+        result.only_right = sorted(right_entries - left_entries, key=repr)
+    return result
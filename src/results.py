@@ -0,0 +1,112 @@
+from enum import Enum
+from typing import Optional, TYPE_CHECKING
+from src.constants import COLORS
+
+if TYPE_CHECKING:
+    from src.book_collection import Book
+
+
+class OperationStatus(Enum):
+    """Исход операции над коллекцией или библиотекой"""
+    ADDED = "added"
+    INCREMENTED = "incremented"
+    DELETED = "deleted"
+    DELETED_ALL = "deleted_all"
+    DELETED_CAPPED = "deleted_capped"
+    NOT_FOUND = "not_found"
+    UPDATED = "updated"
+    BORROWED = "borrowed"
+    NOT_AVAILABLE = "not_available"
+    NOT_ENOUGH_COPIES = "not_enough_copies"
+    RETURNED = "returned"
+    NOT_BORROWED = "not_borrowed"
+    RETURN_EXCEEDS = "return_exceeds"
+
+
+# Статус -> (цвет, шаблон сообщения); текст собирается только при выводе
+_MESSAGES: dict[OperationStatus, tuple[str, str]] = {
+    OperationStatus.ADDED: (COLORS.GREEN, "Book '{title}' added to collection '{collection}', number of items: {count}"),
+    OperationStatus.INCREMENTED: (COLORS.GREEN, "Book '{title}' is already in collection '{collection}', added items: {count}, summary items: {available}"),
+    OperationStatus.DELETED: (COLORS.GREEN, "Book '{title}' deleted from collection '{collection}', number of items deleted: {count}, number of items left: {available}"),
+    OperationStatus.DELETED_ALL: (COLORS.GREEN, "Book '{title}' deleted from collection '{collection}', deleted all available items: {count}"),
+    OperationStatus.DELETED_CAPPED: (COLORS.YELLOW, "Warning: Trying to delete book '{title}' from collection '{collection}' in count {count}\n\t Available items count: {available}\n\t Deleting all..."),
+    OperationStatus.NOT_FOUND: (COLORS.RED, "Cannot delete book '{title}': not found in collection '{collection}'"),
+    OperationStatus.UPDATED: (COLORS.GREEN, "Updated book with ISBN '{isbn}' in collection '{collection}'"),
+    OperationStatus.BORROWED: (COLORS.GREEN, "Borrowed {count} copy/copies of '{title}' for user {user_id}"),
+    OperationStatus.NOT_AVAILABLE: (COLORS.RED, "Borrow: Book '{title}' not available"),
+    OperationStatus.NOT_ENOUGH_COPIES: (COLORS.RED, "Borrow: Not enough copies of '{title}'. Available: {available}, requested: {count}"),
+    OperationStatus.RETURNED: (COLORS.GREEN, "Returned {count} copy/copies of '{title}' from user {user_id}"),
+    OperationStatus.NOT_BORROWED: (COLORS.RED, "Return: User {user_id} has no copies of '{title}' borrowed"),
+    OperationStatus.RETURN_EXCEEDS: (COLORS.RED, "Return: User {user_id} has only {available} copies of '{title}' borrowed, but trying to return {count}"),
+}
+
+_FAILURES = frozenset({
+    OperationStatus.NOT_FOUND,
+    OperationStatus.NOT_AVAILABLE,
+    OperationStatus.NOT_ENOUGH_COPIES,
+    OperationStatus.NOT_BORROWED,
+    OperationStatus.RETURN_EXCEEDS,
+})
+
+
+class OperationResult:
+    """Результат операции: статус, книга и количества.
+
+    count - запрошенное количество экземпляров, available - количество,
+    относительно которого выполнялась операция (остаток, сумма или доступное)
+    """
+
+    __slots__ = ('status', 'book', 'count', 'available', 'user_id', 'collection_name')
+
+    def __init__(self, status: OperationStatus, book: 'Book', count: int = 0,
+                 available: int = 0, user_id: Optional[int] = None,
+                 collection_name: Optional[str] = None):
+        self.status = status
+        self.book = book
+        self.count = count
+        self.available = available
+        self.user_id = user_id
+        self.collection_name = collection_name
+
+    @property
+    def ok(self) -> bool:
+        """Операция выполнена (возможно, с предупреждением)"""
+        return self.status not in _FAILURES
+
+    @property
+    def affected(self) -> int:
+        """Сколько экземпляров фактически затронула операция"""
+        if self.status in _FAILURES or self.status is OperationStatus.UPDATED:
+            return 0
+        if self.status is OperationStatus.DELETED_CAPPED:
+            return self.available
+        return self.count
+
+    def render(self) -> str:
+        color, template = _MESSAGES[self.status]
+        text = template.format(
+            title=self.book.title,
+            isbn=self.book.isbn,
+            collection=self.collection_name,
+            count=self.count,
+            available=self.available,
+            user_id=self.user_id,
+        )
+        return f"{color}{text}{COLORS.RESET}"
+
+    def __str__(self):
+        return self.render()
+
+    def __contains__(self, text: str) -> bool:
+        return text in self.render()
+
+    def __eq__(self, other):
+        if not isinstance(other, OperationResult):
+            return NotImplemented
+        return (self.status, self.book, self.count, self.available, self.user_id) == \
+            (other.status, other.book, other.count, other.available, other.user_id)
+
+    __hash__ = None # type: ignore
+
+    def __repr__(self):
+        return f"OperationResult({self.status.name}, count={self.count}, available={self.available})"
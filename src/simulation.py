@@ -3,7 +3,6 @@ from src.book_database import BOOKS, AUTHORS, YEARS, GENRES
 import random
 import numpy as np # type: ignore
 from src.constants import COLORS
-from copy import deepcopy
 from src.book_collection import Book
 
 class Simulator():
@@ -22,10 +21,10 @@ class Simulator():
             print(f"{COLORS.RED}Cannot perferm delete_book: no available books found{COLORS.RESET}")
             return
         try:
-            index_before = deepcopy(self.library.collection.index_dict)
+            length_before = len(self.library.collection.index_dict.group_by_isbn)
             print(self.library.collection.delete_book(random.choice(books_available), count=random.randint(1,5)))
-            index_after = self.library.collection.index_dict
-            print(f"\t{COLORS.GRAY}Index_dict length before delete: {len(index_before.group_by_isbn.values())}{COLORS.RESET}\n\t{COLORS.GRAY}Index_dict length after delete: {len(index_after.group_by_isbn.values())}{COLORS.RESET}")
+            length_after = len(self.library.collection.index_dict.group_by_isbn)
+            print(f"\t{COLORS.GRAY}Index_dict length before delete: {length_before}{COLORS.RESET}\n\t{COLORS.GRAY}Index_dict length after delete: {length_after}{COLORS.RESET}")
         except Exception as e:
             print(f"{COLORS.RED}Error found in delete_book: {e}{COLORS.RESET}")
 
@@ -0,0 +1,215 @@
+import hashlib
+import math
+from array import array
+from typing import Hashable, Optional
+from src.book_collection import Book, LibraryException
+from src.isbn import format_isbn13, isbn_key
+
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_CMS_WIDTH = 2048
+DEFAULT_CMS_DEPTH = 5
+DEFAULT_HEAVY_HITTERS = 20
+
+
+def stable_hash(key: Hashable) -> int:
+    """64-битный хеш, одинаковый во всех процессах (нужен для объединения состояний)"""
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """Оценка числа различных элементов в фиксированной памяти (2^precision байт).
+
+    Относительная ошибка около 1.04 / sqrt(2^precision): 0.8% при precision=14
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise LibraryException("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: Hashable) -> None:
+        h = stable_hash(key)
+        index = h & ((1 << self.precision) - 1)
+        rest = h >> self.precision
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # малые значения: линейный подсчет по пустым регистрам точнее
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """Объединение с состоянием другой библиотеки (поэлементный максимум)"""
+        if other.precision != self.precision:
+            raise LibraryException("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def memory_bytes(self) -> int:
+        return len(self.registers)
+
+    def __len__(self) -> int:
+        return self.estimate()
+
+    def __repr__(self):
+        return f"HyperLogLog(~{self.estimate()} distinct, {len(self.registers)} registers)"
+
+
+class CountMinSketch:
+    """Оценка частот в фиксированной памяти: только завышение, не больше e/width * N с вероятностью 1 - e^-depth"""
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        if width <= 0 or depth <= 0:
+            raise LibraryException("Count-Min Sketch width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.table = array('q', bytes(8 * width * depth))
+        self.total = 0
+
+    def _cells(self, key: Hashable) -> list[int]:
+        h = stable_hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key: Hashable, count: int = 1) -> int:
+        """Учесть count событий; возвращает новую оценку частоты"""
+        table = self.table
+        estimate = None
+        for cell in self._cells(key):
+            table[cell] += count
+            estimate = table[cell] if estimate is None else min(estimate, table[cell])
+        self.total += count
+        return estimate # type: ignore
+
+    def estimate(self, key: Hashable) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(key))
+
+    def merge(self, other: 'CountMinSketch') -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise LibraryException("Cannot merge Count-Min Sketches with different dimensions")
+        self.table = array('q', map(sum, zip(self.table, other.table)))
+        self.total += other.total
+
+    def memory_bytes(self) -> int:
+        return self.table.itemsize * len(self.table)
+
+    def __repr__(self):
+        return f"CountMinSketch({self.depth}x{self.width}, {self.total} events)"
+
+
+class HeavyHitters:
+    """Top-k самых частых ключей по оценкам Count-Min Sketch (хранится не больше k кандидатов)"""
+
+    def __init__(self, k: int = DEFAULT_HEAVY_HITTERS, width: int = DEFAULT_CMS_WIDTH,
+                 depth: int = DEFAULT_CMS_DEPTH):
+        if k <= 0:
+            raise LibraryException("Number of heavy hitters must be positive")
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates: dict[Hashable, int] = {}  # ключ: оценка частоты
+        self._min: Optional[tuple[int, Hashable]] = None
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        estimate = self.sketch.add(key, count)
+        candidates = self.candidates
+        if key in candidates:
+            candidates[key] = estimate
+            if self._min is not None and self._min[1] == key:
+                self._min = None
+        elif len(candidates) < self.k:
+            candidates[key] = estimate
+            self._min = None
+        else:
+            if self._min is None:
+                candidate = min(candidates, key=candidates.__getitem__)
+                self._min = (candidates[candidate], candidate)
+            if estimate > self._min[0]:
+                # вытесняется кандидат с наименьшей оценкой; минимум пересчитывается лениво
+                del candidates[self._min[1]]
+                candidates[key] = estimate
+                self._min = None
+
+    def top(self, k: Optional[int] = None) -> list[tuple[Hashable, int]]:
+        ranked = sorted(self.candidates.items(), key=lambda item: -item[1])
+        return ranked[:k] if k is not None else ranked
+
+    def merge(self, other: 'HeavyHitters') -> None:
+        """Объединение: кандидаты обеих сторон переоцениваются по объединенному скетчу"""
+        self.sketch.merge(other.sketch)
+        keys = set(self.candidates) | set(other.candidates)
+        ranked = sorted(((self.sketch.estimate(key), key) for key in keys), key=lambda item: -item[0])
+        self.candidates = {key: estimate for estimate, key in ranked[:self.k]}
+        self._min = None
+
+    def memory_bytes(self) -> int:
+        return self.sketch.memory_bytes()
+
+    def __repr__(self):
+        return f"HeavyHitters(top {self.k}, {self.sketch!r})"
+
+
+class StreamingStats:
+    """Потоковая статистика выдач: различные читатели (всего и по жанрам) и самые выдаваемые книги.
+
+    Память фиксирована и не зависит от числа событий; состояния разных
+    библиотек объединяются через merge
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION, k: int = DEFAULT_HEAVY_HITTERS,
+                 width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        self.precision = precision
+        self.borrowers = HyperLogLog(precision)
+        self.genre_borrowers: dict[str, HyperLogLog] = {}
+        self.books = HeavyHitters(k, width, depth)
+
+    def record_borrow(self, book: Book, user_id: int, count: int = 1) -> None:
+        self.borrowers.add(user_id)
+        if book.genre is not None:
+            sketch = self.genre_borrowers.get(book.genre)
+            if sketch is None:
+                sketch = self.genre_borrowers[book.genre] = HyperLogLog(self.precision)
+            sketch.add(user_id)
+        self.books.add(isbn_key(book.isbn), count) # type: ignore
+
+    def unrecord_borrow(self, book: Book, count: int = 1) -> None:
+        """Отмена выдачи при откате транзакции: частоты уменьшаются, HyperLogLog не откатывается"""
+        self.books.add(isbn_key(book.isbn), -count) # type: ignore
+
+    def unique_borrowers(self, genre: Optional[str] = None) -> int:
+        if genre is None:
+            return self.borrowers.estimate()
+        sketch = self.genre_borrowers.get(genre)
+        return sketch.estimate() if sketch is not None else 0
+
+    def borrow_count(self, isbn: str) -> int:
+        return self.books.sketch.estimate(isbn_key(isbn))
+
+    def hot_books(self, k: Optional[int] = None) -> list[tuple[str, int]]:
+        # частоты считаются по каноническим ключам; ISBN возвращаются в виде ISBN-13
+        return [(format_isbn13(key) if isinstance(key, int) else key, count) for key, count in self.books.top(k)]
+
+    def merge(self, other: 'StreamingStats') -> None:
+        self.borrowers.merge(other.borrowers)
+        for genre, sketch in other.genre_borrowers.items():
+            own = self.genre_borrowers.get(genre)
+            if own is None:
+                own = self.genre_borrowers[genre] = HyperLogLog(self.precision)
+            own.merge(sketch)
+        self.books.merge(other.books)
+
+    def memory_bytes(self) -> int:
+        return (self.borrowers.memory_bytes() + self.books.memory_bytes()
+                + sum(sketch.memory_bytes() for sketch in self.genre_borrowers.values()))
+
+    def __repr__(self):
+        return (f"StreamingStats(~{self.borrowers.estimate()} borrowers, "
+                f"{len(self.genre_borrowers)} genres, {self.memory_bytes()} bytes)")
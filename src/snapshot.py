@@ -0,0 +1,144 @@
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Iterator, Optional
+from src.book_collection import Book
+from src.isbn import isbn_key
+
+
+ABSENT = object()  # записи не было на момент снимка
+
+
+class ChangeLayer:
+    """Прежние значения записей выдач и читателей, измененных после снимка.
+
+    Библиотека сохраняет сюда запись перед первым изменением (копирование при записи
+    по записям, а не по словарям целиком). Слои связаны от старых снимков к новым:
+    запись, не менявшаяся до следующего снимка, ищется в более новом слое
+    """
+
+    __slots__ = ('books', 'users', 'newer')
+
+    def __init__(self):
+        self.books: dict = {}   # book: {user_id: count} или ABSENT
+        self.users: dict = {}   # user_id: BorrowerInfo или ABSENT
+        self.newer: Optional['ChangeLayer'] = None
+
+
+class LayeredView(Mapping):
+    """Словарь выдач или читателей на момент снимка: слои изменений поверх живого словаря"""
+
+    __slots__ = ('live', 'layer', 'field')
+
+    def __init__(self, live: dict, layer: ChangeLayer, field: str):
+        self.live = live
+        self.layer = layer
+        self.field = field   # 'books' или 'users'
+
+    def _lookup(self, key: Any) -> Any:
+        layer: Optional[ChangeLayer] = self.layer
+        while layer is not None:
+            saved = getattr(layer, self.field)
+            if key in saved:
+                return saved[key]
+            layer = layer.newer
+        return self.live.get(key, ABSENT)
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._lookup(key)
+        if value is ABSENT:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator:
+        seen = set()
+        layer: Optional[ChangeLayer] = self.layer
+        while layer is not None:
+            seen.update(getattr(layer, self.field))
+            layer = layer.newer
+        # список ключей берется сразу: библиотека может менять словарь во время чтения снимка
+        keys = list(self.live)
+        for key in seen:
+            if self._lookup(key) is not ABSENT:
+                yield key
+        for key in keys:
+            if key not in seen:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class LibrarySnapshot:
+    """Неизменяемое согласованное представление библиотеки для отчетов.
+
+    Создается за O(1): хранит ссылки на текущие структуры библиотеки; библиотека
+    копирует список книг перед первым изменением после снимка, а записи выдач и
+    читателей - по одной, перед первым изменением каждой (см. ChangeLayer).
+    Читать снимок можно параллельно с выдачей и возвратом
+    """
+
+    __slots__ = ('name', 'taken_at', 'items', 'borrowed_books', 'borrowers', 'statistics',
+                 'authors_count', 'genres_count', '__weakref__')
+
+    def __init__(self, name: str, items: list[tuple], borrowed_books: Mapping, borrowers: Mapping,
+                 statistics: dict, authors_count: int, genres_count: int, taken_at: Optional[datetime] = None):
+        self.name = name
+        self.taken_at = taken_at or datetime.now()
+        self.items = items
+        self.borrowed_books = borrowed_books
+        self.borrowers = borrowers
+        self.statistics = statistics
+        self.authors_count = authors_count
+        self.genres_count = genres_count
+
+    def get_count(self, book: Book) -> int:
+        """Доступные экземпляры книги на момент снимка"""
+        key = isbn_key(book.isbn) # type: ignore
+        for existing_book, count in self.items:
+            if isbn_key(existing_book.isbn) == key: # type: ignore
+                return count
+        return 0
+
+    def get_all_books_with_counts(self) -> list[tuple]:
+        return self.items.copy()
+
+    def total_count(self) -> int:
+        return sum(count for book, count in self.items)
+
+    def get_popular_books(self, limit=5) -> list:
+        """Самые популярные книги (по количеству экземпляров)"""
+        return sorted(self.items, key=lambda x: x[1], reverse=True)[:limit]
+
+    def get_most_borrowed_books(self, limit=5) -> list:
+        """Самые популярные книги по количеству выдач"""
+        book_borrow_counts = [(book, sum(users.values())) for book, users in self.borrowed_books.items()]
+        return sorted(book_borrow_counts, key=lambda x: x[1], reverse=True)[:limit]
+
+    def get_top_borrowers(self, limit=5) -> list:
+        """Самые активные читатели на момент снимка"""
+        borrowers_with_counts = [
+            (user_id, sum(borrower.borrowed_books.values()))
+            for user_id, borrower in self.borrowers.items()
+        ]
+        return sorted(borrowers_with_counts, key=lambda x: x[1], reverse=True)[:limit]
+
+    def generate_report(self) -> dict:
+        """Отчет в формате Library.generate_report (без метрик)"""
+        return {
+            'library_name': self.name,
+            'unique_books': len(self.items),
+            'total_copies': self.total_count(),
+            'authors_count': self.authors_count,
+            'genres_count': self.genres_count,
+            'statistics': self.statistics.copy(),
+            'taken_at': self.taken_at
+        }
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self):
+        return (f"Snapshot of library '{self.name}' at {self.taken_at:%Y-%m-%d %H:%M:%S} "
+                f"({len(self.items)} books, {self.total_count()} copies available, "
+                f"{self.statistics['total_borrowed']} total borrowed, "
+                f"{self.statistics['active_borrowers']} active borrowers)")
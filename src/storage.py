@@ -0,0 +1,581 @@
+import sqlite3
+from functools import partial
+import weakref
+from typing import Any, Iterable, Iterator, Optional
+from src.book_collection import (Book, BookCollection, CustomIndexes, FunctionIndex, LibraryException,
+                                 INDEXED_FIELDS, same_book)
+from src.facets import FACET_KEYS, FacetCounts
+from src.fuzzy import TrigramIndex
+from src.change_feed import replicated
+from src.isbn import isbn_key
+from src.query_cache import QueryCache, MISSING
+from src.pagination import Page, DEFAULT_PAGE_SIZE, check_page_size
+from src.results import OperationResult, OperationStatus
+
+DEFAULT_BOOK_CACHE_SIZE = 4096
+DEFAULT_BATCH_SIZE = 1000
+
+TABLE = """
+CREATE TABLE IF NOT EXISTS books (
+    key TEXT PRIMARY KEY,
+    isbn TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    genre TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS books_position ON books(position);
+CREATE INDEX IF NOT EXISTS books_author ON books(author, position);
+CREATE INDEX IF NOT EXISTS books_title ON books(title, position);
+CREATE INDEX IF NOT EXISTS books_genre ON books(genre, position);
+CREATE INDEX IF NOT EXISTS books_year ON books(year, position);
+"""
+
+_COLUMNS = "title, author, year, genre, isbn, count, position"
+
+Row = tuple[Book, int, int]  # книга, экземпляров, позиция в порядке добавления
+
+
+def _key(isbn: str) -> str:
+    """Первичный ключ строки: канонический ISBN-13 (см. src/isbn.py), для нестандартных идентификаторов - сама строка"""
+    return str(isbn_key(isbn))
+
+
+class SQLiteStorage:
+    """Хранилище книг в SQLite (файл или :memory:) с LRU-кэшем горячих записей.
+
+    Записи копятся в открытой транзакции и фиксируются пакетами по
+    batch_size изменений (или при flush/close), чтобы не платить за
+    синхронизацию с диском на каждую операцию
+    """
+
+    def __init__(self, path: str = ':memory:', cache_size: int = DEFAULT_BOOK_CACHE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size <= 0:
+            raise LibraryException("Batch size must be positive")
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if path != ':memory:':
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(TABLE + INDEXES)
+        self.cache = QueryCache(cache_size)  # isbn: Row или None (книги нет)
+        self.batch_size = batch_size
+        self.pending = 0
+        self.size, last_position = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(MAX(position), 0) FROM books"
+        ).fetchone()
+        self.next_position = last_position + 1
+
+    def _write(self, sql: str, params: tuple) -> None:
+        self.connection.execute(sql, params)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Фиксация накопленных изменений"""
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
+
+    @staticmethod
+    def _row(record: tuple) -> Row:
+        return Book(*record[:5]), record[5], record[6]
+
+    def get(self, isbn: str) -> Optional[Row]:
+        """Запись по ISBN в любой записи (через кэш)"""
+        key = _key(isbn)
+        row = self.cache.get(key, ())
+        if row is MISSING:
+            record = self.connection.execute(f"SELECT {_COLUMNS} FROM books WHERE key = ?", (key,)).fetchone()
+            row = self._row(record) if record is not None else None
+            self.cache.put(key, (), row)
+        return row
+
+    def put(self, book: Book, count: int, position: Optional[int] = None) -> None:
+        """Вставка или замена записи (position=None - в конец порядка добавления)"""
+        if position is None:
+            position = self.next_position
+        self.next_position = max(self.next_position, position + 1)
+        if self.get(book.isbn) is None: # type: ignore
+            self.size += 1
+        key = _key(book.isbn) # type: ignore
+        self._write(
+            "INSERT OR REPLACE INTO books (key, title, author, year, genre, isbn, count, position) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, book.title, book.author, book.year, book.genre, book.isbn, count, position)
+        )
+        self.cache.put(key, (), (book, count, position))
+
+    def set_count(self, row: Row, count: int) -> None:
+        book, _, position = row
+        key = _key(book.isbn) # type: ignore
+        self._write("UPDATE books SET count = ? WHERE key = ?", (count, key))
+        self.cache.put(key, (), (book, count, position))
+
+    def remove(self, isbn: str) -> None:
+        if self.get(isbn) is not None:
+            self.size -= 1
+        key = _key(isbn)
+        self._write("DELETE FROM books WHERE key = ?", (key,))
+        self.cache.put(key, (), None)
+
+    def select(self, where: str = "", params: tuple = (), limit: Optional[int] = None,
+               offset: int = 0) -> Iterator[Row]:
+        """Записи в порядке добавления (where - условие SQL по колонкам таблицы)"""
+        sql = f"SELECT {_COLUMNS} FROM books {f'WHERE {where}' if where else ''} ORDER BY position"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + (-1 if limit is None else limit, offset)
+        for record in self.connection.execute(sql, params):
+            yield self._row(record)
+
+    def scalar(self, sql: str, params: tuple = ()) -> Any:
+        return self.connection.execute(sql, params).fetchone()[0]
+
+    def __repr__(self):
+        return f"SQLiteStorage('{self.path}', {self.size} books, {self.pending} pending writes)"
+
+
+class _ItemsView:
+    """Представление items коллекции в SQLite: последовательность (book, count) без загрузки в память"""
+
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+
+    def __iter__(self) -> Iterator[tuple[Book, int]]:
+        for book, count, _ in self.storage.select():
+            yield book, count
+
+    def __len__(self) -> int:
+        return self.storage.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return list(self)[key]
+            return [(book, count) for book, count, _ in self.storage.select(limit=max(stop - start, 0), offset=start)]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("Collection index out of range")
+        book, count, _ = next(self.storage.select(limit=1, offset=key))
+        return book, count
+
+    def copy(self) -> list[tuple[Book, int]]:
+        return list(self)
+
+    def __add__(self, other) -> list[tuple[Book, int]]:
+        return list(self) + list(other)
+
+
+class _SnapshotItems:
+    """Записи коллекции для снимка: читающая транзакция на отдельном соединении к файлу базы.
+
+    Транзакция открывается при создании и держится, пока жив снимок; запись
+    в основное соединение (WAL) ее не блокирует и в ней не видна
+    """
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("BEGIN")
+        self.size = self.connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        self._finalizer = weakref.finalize(self, self.connection.close)
+
+    def __iter__(self) -> Iterator[tuple[Book, int]]:
+        for record in self.connection.execute(f"SELECT {_COLUMNS} FROM books ORDER BY position"):
+            book, count, _ = SQLiteStorage._row(record)
+            yield book, count
+
+    def __len__(self) -> int:
+        return self.size
+
+    def copy(self) -> list[tuple[Book, int]]:
+        return list(self)
+
+    def close(self) -> None:
+        self._finalizer()
+
+
+class SQLiteIndexDict(CustomIndexes):
+    """Поиск по вторичным индексам SQLite с тем же интерфейсом, что у IndexDict.
+
+    Встроенные индексы (title, author, genre, year) поддерживает сама база. Пользовательские
+    индексы (register_index) и нечеткий поиск по авторам и названиям живут в памяти, как в
+    IndexDict: их обновляет коллекция через add_book/delete_book
+    """
+
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        self.indexes: dict[str, FunctionIndex] = {}  # только пользовательские, встроенные - в SQLite
+        self.custom_indexes: dict[str, FunctionIndex] = {}
+        # поле: (триграммный индекс значений, число книг с каждым значением) - строится при первом запросе
+        self.fuzzy: dict[str, tuple[TrigramIndex, dict[str, int]]] = {}
+
+    def _source(self) -> Iterable[Book]:
+        return iter(self)
+
+    def _books(self, where: str, params: tuple) -> list[Book]:
+        return [book for book, _, _ in self.storage.select(where, params)]
+
+    def add_book(self, book: Book) -> None:
+        """Учет новой книги в индексах в памяти (строка в SQLite уже записана)"""
+        for index in self.custom_indexes.values():
+            index.add_new(book)
+        for field, (trigrams, counts) in self.fuzzy.items():
+            key = getattr(book, field)
+            counts[key] = counts.get(key, 0) + 1
+            if counts[key] == 1:
+                trigrams.add(key)
+
+    def delete_book(self, book: Book) -> None:
+        """Удаление книги из индексов в памяти"""
+        for index in self.custom_indexes.values():
+            index.remove(book)
+        for field, (trigrams, counts) in self.fuzzy.items():
+            key = getattr(book, field)
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+                trigrams.remove(key)
+
+    def _fuzzy(self, field: str) -> TrigramIndex:
+        entry = self.fuzzy.get(field)
+        if entry is None:
+            trigrams, counts = TrigramIndex(), {}
+            for key, books in self.storage.connection.execute(f"SELECT {field}, COUNT(*) FROM books GROUP BY {field}"):
+                counts[key] = books
+                trigrams.add(key)
+            entry = self.fuzzy[field] = (trigrams, counts)
+        return entry[0]
+
+    def get_by(self, name: str, key: Any) -> list[Book]:
+        """Книги по ключу любого индекса, в том числе пользовательского"""
+        if name in INDEXED_FIELDS:
+            return self._books(f"{name} = ?", (key,))
+        index = self.custom_indexes.get(name)
+        if index is None:
+            raise LibraryException(f"Unknown index '{name}'")
+        return list(index.search(key))
+
+    def get_by_isbn(self, isbn: str) -> Optional[Book]:
+        row = self.storage.get(isbn)
+        return row[0] if row is not None else None
+
+    def get_by_author(self, author: str) -> list[Book]:
+        return self._books("author = ?", (author,))
+
+    def get_by_title(self, title: str) -> list[Book]:
+        return self._books("title = ?", (title,))
+
+    def get_by_genre(self, genre: str) -> list[Book]:
+        return self._books("genre = ?", (genre,))
+
+    def get_by_year(self, year: int) -> list[Book]:
+        return self._books("year = ?", (year,))
+
+    def find(self, **filters) -> list[Book]:
+        """Поиск по нескольким полям сразу (title, author, genre, year и пользовательские индексы)"""
+        if not filters:
+            raise LibraryException("At least one filter is required")
+        for name in filters:
+            if name not in INDEXED_FIELDS and name not in self.custom_indexes:
+                raise LibraryException(f"Unknown index '{name}'")
+        custom = {name: self.custom_indexes[name].search(value)
+                  for name, value in filters.items() if name in self.custom_indexes}
+        if custom:
+            # перебираем самый короткий список пользовательского индекса и проверяем остальные поля у книги
+            name = min(custom, key=lambda name: len(custom[name]))
+            return [
+                book for book in custom[name]
+                if all(self.custom_indexes[other].matches(book, value) if other in self.custom_indexes
+                       else getattr(book, other) == value for other, value in filters.items())
+            ]
+        names = sorted(filters)
+        return self._books(" AND ".join(f"{name} = ?" for name in names), tuple(filters[name] for name in names))
+
+    def get_by_author_fuzzy(self, author: str, max_distance: int = 2, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Авторы, похожие на запрос (с опечатками), по возрастанию расстояния"""
+        return self._fuzzy('author').search(author, max_distance, limit)
+
+    def get_by_title_fuzzy(self, title: str, max_distance: int = 2, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Названия, похожие на запрос (с опечатками), по возрастанию расстояния"""
+        return self._fuzzy('title').search(title, max_distance, limit)
+
+    def cache_stats(self) -> dict:
+        """Статистика кэша записей"""
+        return self.storage.cache.stats()
+
+    def book_count(self) -> int:
+        return self.storage.size
+
+    def author_count(self) -> int:
+        return self.storage.scalar("SELECT COUNT(DISTINCT author) FROM books")
+
+    def year_count(self) -> int:
+        return self.storage.scalar("SELECT COUNT(DISTINCT year) FROM books")
+
+    def genre_count(self) -> int:
+        return self.storage.scalar("SELECT COUNT(DISTINCT genre) FROM books")
+
+    def __len__(self) -> int:
+        return self.storage.size
+
+    def __iter__(self):
+        for book, _, _ in self.storage.select():
+            yield book
+
+    def __repr__(self):
+        return f"SQLiteIndexDict({self.storage.size} books, {len(self.custom_indexes)} custom indexes)"
+
+
+class SQLiteBookCollection(BookCollection):
+    """Коллекция книг в SQLite с теми же публичными методами, что у BookCollection.
+
+    Подходит для каталогов, которые не помещаются в память: в памяти
+    остается только LRU-кэш горячих записей. Подключается к библиотеке
+    через Library(collection=...)
+    """
+
+    def __init__(self, collection_name=None, path: str = ':memory:',
+                 cache_size: int = DEFAULT_BOOK_CACHE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.storage = SQLiteStorage(path, cache_size, batch_size)
+        super().__init__(collection_name)
+        self.index_dict = SQLiteIndexDict(self.storage) # type: ignore
+        # счетчики фасетов загружаются из базы при первом запросе; остатки по ISBN не держим в памяти
+        self.facets = FacetCounts(track_copies=False)
+        self._facets_loaded = False
+
+    @property
+    def items(self) -> _ItemsView: # type: ignore
+        return _ItemsView(self.storage)
+
+    @items.setter
+    def items(self, value: list) -> None:
+        # базовый конструктор начинает с пустого списка, а записи коллекции живут в SQLite
+        if value:
+            raise LibraryException("Items of a SQLite collection are stored in the database")
+
+    def flush(self) -> None:
+        """Фиксация накопленных записей на диск"""
+        self.storage.flush()
+
+    def close(self) -> None:
+        self.storage.close()
+
+    def share_items(self) -> Any:
+        """Записи для снимка: в файле - читающая транзакция на отдельном соединении (за O(1)).
+
+        Строки в SQLite меняются на месте; WAL дает отдельному соединению согласованное
+        состояние на начало транзакции. База :memory: недоступна другим соединениям,
+        и снимок получает копию, которая не больше самой базы в памяти
+        """
+        if self.storage.path == ':memory:':
+            return self.items.copy()
+        self.storage.flush()
+        return _SnapshotItems(self.storage.path)
+
+    def _journal_row(self, isbn: str, row: Optional[tuple]) -> None:
+        if self.journal is not None:
+            self.journal.append(partial(self._undo_row, isbn, row))
+
+    def _undo_row(self, isbn: str, row: Optional[tuple]) -> None:
+        """Откат записи к сохраненному состоянию (None - записи не было)"""
+        current = self.storage.get(isbn)
+        if row is None:
+            self.storage.remove(isbn)
+        else:
+            self.storage.put(*row)
+        if current is not None and row is not None and current[0] == row[0]:
+            if row[1] > current[1]:
+                self._stock_added(row[0], row[1] - current[1], False)
+            elif row[1] < current[1]:
+                self._stock_removed(row[0], current[1] - row[1], False)
+            return
+        # запись появилась, исчезла или заменена другой книгой
+        if current is not None:
+            self._stock_removed(current[0], current[1], True)
+        if row is not None:
+            self._stock_added(row[0], row[1], True)
+
+    def _stock_added(self, book: Book, count: int, new_title: bool) -> None:
+        # встроенные индексы обновляет SQLite, пользовательские и нечеткие - в памяти
+        if new_title:
+            self.index_dict.add_book(book)
+        super()._stock_added(book, count, new_title)
+
+    def _stock_removed(self, book: Book, count: int, removed_title: bool) -> None:
+        if removed_title:
+            self.index_dict.delete_book(book)
+        super()._stock_removed(book, count, removed_title)
+
+    @replicated('collection')
+    def __setitem__(self, index: int, book: Book):
+        if not isinstance(book, Book):
+            raise LibraryException("Can only assign Book objects")
+        old_book, old_count = self.items[index]
+        new_key = isbn_key(book.isbn) != isbn_key(old_book.isbn) # type: ignore
+        if new_key and self.storage.get(book.isbn) is not None: # type: ignore
+            # строка по ключу одна: замена молча затерла бы другую книгу
+            raise LibraryException(f"ISBN conflict: {book.isbn} is already in collection")
+        old_row = self.storage.get(old_book.isbn) # type: ignore
+        self._journal_row(old_book.isbn, old_row) # type: ignore
+        if new_key:
+            self._journal_row(book.isbn, None) # type: ignore
+            self.storage.remove(old_book.isbn) # type: ignore
+        self.storage.put(book, old_count, old_row[2]) # type: ignore # с сохранением количества и позиции
+        self._stock_removed(old_book, old_count, True)
+        self._stock_added(book, old_count, True)
+
+    def _add_validated(self, book: Book, count: int) -> OperationResult:
+        row = self.storage.get(book.isbn) # type: ignore
+        self._journal_row(book.isbn, row) # type: ignore
+        if row is not None:
+            existing_book, existing_count, _ = row
+            if not same_book(existing_book, book):
+                raise LibraryException(
+                    f"ISBN conflict: {book.isbn}\n"
+                    f"Existing: {existing_book}\n"
+                    f"New: {book}"
+                )
+            self.storage.set_count(row, existing_count + count)
+            self._stock_added(existing_book, count, False)
+            return OperationResult(OperationStatus.INCREMENTED, book, count, existing_count + count,
+                                   collection_name=self.collection_name)
+        self.storage.put(book, count)
+        self._stock_added(book, count, True)
+        return OperationResult(OperationStatus.ADDED, book, count, count, collection_name=self.collection_name)
+
+    @replicated('collection')
+    def delete_book(self, book: Book, count=1) -> OperationResult:
+        """Удаление книги"""
+        if count <= 0:
+            raise LibraryException("Count must be positive")
+        row = self.storage.get(book.isbn) # type: ignore
+        if row is None:
+            return OperationResult(OperationStatus.NOT_FOUND, book, count, 0, collection_name=self.collection_name)
+        self._journal_row(book.isbn, row) # type: ignore
+        existing_book, existing_count, _ = row
+        if count < existing_count:
+            self.storage.set_count(row, existing_count - count)
+            self._stock_removed(existing_book, count, False)
+            return OperationResult(OperationStatus.DELETED, book, count, existing_count - count,
+                                   collection_name=self.collection_name)
+        self.storage.remove(book.isbn) # type: ignore
+        self._stock_removed(existing_book, existing_count, True)
+        if count == existing_count:
+            return OperationResult(OperationStatus.DELETED_ALL, book, count, 0, collection_name=self.collection_name)
+        return OperationResult(OperationStatus.DELETED_CAPPED, book, count, existing_count,
+                               collection_name=self.collection_name)
+
+    @replicated('collection')
+    def update_book(self, old_book: Book, new_book: Book) -> OperationResult:
+        """Обновление данных книги"""
+        if isbn_key(old_book.isbn) != isbn_key(new_book.isbn): # type: ignore
+            raise LibraryException("Cannot change ISBN. Use delete/add instead")
+        self.validate_book(new_book)
+        row = self.storage.get(old_book.isbn) # type: ignore
+        if row is None:
+            raise LibraryException(f"Can't update book '{old_book.title}': not found in collection")
+        self._journal_row(old_book.isbn, row) # type: ignore
+        existing_book, count, position = row
+        self.storage.put(new_book, count, position)
+        self._stock_removed(existing_book, count, True)
+        self._stock_added(new_book, count, True)
+        return OperationResult(OperationStatus.UPDATED, new_book, 0, count, collection_name=self.collection_name)
+
+    def get_facet(self, name: str, limit: Optional[int] = None) -> list[tuple]:
+        """Фасет коллекции (genre, author, decade): [(значение, книг, доступных экземпляров)]"""
+        if name not in FACET_KEYS:
+            raise LibraryException(f"Unknown facet '{name}'")
+        if not self._facets_loaded:
+            # одна агрегация на фасет, дальше счетчики поддерживаются при каждом изменении
+            for facet in FACET_KEYS:
+                column = "year / 10 * 10" if facet == 'decade' else facet
+                self.facets.counts[facet] = {
+                    value: [titles, copies] for value, titles, copies in self.storage.connection.execute(
+                        f"SELECT {column}, COUNT(*), SUM(count) FROM books GROUP BY {column}"
+                    )
+                }
+            self._facets_loaded = True
+        return self.facets.facet(name, limit)
+
+    def facets_for(self, books, names=None) -> dict:
+        """Фасеты по выборке книг (например, по результату find)"""
+        names = list(names) if names is not None else list(FACET_KEYS)
+        result: dict[str, dict[Any, tuple[int, int]]] = {name: {} for name in names}
+        seen = set()
+        for book in books:
+            key = isbn_key(book.isbn) # type: ignore
+            if key in seen:
+                continue
+            seen.add(key)
+            count = self.get_count(book)
+            for name in names:
+                value = FACET_KEYS[name](book)
+                if value is not None:
+                    titles, copies = result[name].get(value, (0, 0))
+                    result[name][value] = (titles + 1, copies + count)
+        return result
+
+    def get_all_books_with_counts(self) -> list[tuple]:
+        return self.items.copy()
+
+    def page(self, cursor: Optional[tuple] = None, size: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Страница по ключу position (индекс books_position) без OFFSET: курсор - (position, isbn)"""
+        check_page_size(size)
+        after = cursor[0] if cursor is not None else 0
+        rows = list(self.storage.select("position > ?", (after,), limit=size + 1))
+        items = [(book, count) for book, count, _ in rows[:size]]
+        if not items:
+            return Page([], cursor, False)
+        last_book, _, last_position = rows[len(items) - 1]
+        return Page(items, (last_position, last_book.isbn), len(rows) > size)
+
+    def get_count(self, book: Book) -> int:
+        isbn_filter = self.isbn_filter
+        if isbn_filter is not None and not isbn_filter.might_contain(isbn_key(book.isbn)): # type: ignore
+            return 0
+        row = self.storage.get(book.isbn) # type: ignore
+        if row is None:
+            if isbn_filter is not None:
+                isbn_filter.false_positives += 1
+            return 0
+        return row[1]
+
+    def total_count(self) -> int:
+        return self.storage.scalar("SELECT COALESCE(SUM(count), 0) FROM books")
+
+    def __contains__(self, book: Book):
+        if self.isbn_filter is not None and not self.isbn_filter.might_contain(isbn_key(book.isbn)): # type: ignore
+            return False
+        row = self.storage.get(book.isbn) # type: ignore
+        return row is not None and same_book(row[0], book)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if self.storage.size == 0:
+                raise IndexError(f"Collection {self.collection_name} is empty")
+            return self.items[key][0]
+        elif isinstance(key, slice):
+            return [book for book, _ in self.items[key]]
+        elif isinstance(key, str):
+            row = self.storage.get(key)
+            if row is None:
+                raise KeyError(f"Book with ISBN '{key}' not found")
+            return row[0]
+        else:
+            raise TypeError("Invalid key type")
+
+    def __len__(self):
+        return self.storage.size
@@ -0,0 +1,105 @@
+from typing import Any, Callable, Optional, TYPE_CHECKING
+from src.book_collection import LibraryException
+
+if TYPE_CHECKING:
+    from src.library import Library
+
+
+class UndoLog:
+    """Журнал отмены: для каждого изменения - функция, возвращающая прежнее состояние.
+
+    Записываются только затронутые записи, поэтому стоимость транзакции
+    пропорциональна числу изменений, а не размеру библиотеки
+    """
+
+    def __init__(self):
+        self.entries: list[Callable[[], Any]] = []
+
+    def append(self, undo: Callable[[], Any]) -> None:
+        self.entries.append(undo)
+
+    def mark(self) -> int:
+        """Текущая позиция журнала (точка сохранения)"""
+        return len(self.entries)
+
+    def rollback_to(self, mark: int) -> None:
+        """Отмена изменений, записанных после mark, в обратном порядке"""
+        entries = self.entries
+        while len(entries) > mark:
+            entries.pop()()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"UndoLog({len(self.entries)} entries)"
+
+
+class Transaction:
+    """Транзакция над библиотекой (контекстный менеджер).
+
+    Внешняя транзакция подключает журнал отмены к библиотеке и коллекции,
+    вложенная - только запоминает позицию журнала и при ошибке откатывает
+    изменения до нее. Фиксация - отключение журнала, без копирования данных
+    """
+
+    def __init__(self, library: 'Library'):
+        self.library = library
+        self.log: Optional[UndoLog] = None
+        self.start = 0
+        self.outermost = False
+
+    def __enter__(self) -> 'Transaction':
+        if self.log is not None:
+            raise LibraryException("Transaction is already active")
+        log = self.library.journal
+        self.outermost = log is None
+        if log is None:
+            log = UndoLog()
+            self._attach(log)
+        self.log = log
+        self.start = log.mark()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if exc_type is not None:
+                self.rollback_to(self.start)
+        finally:
+            if self.outermost:
+                self._attach(None)
+            self.log = None
+        return False
+
+    def _attach(self, log: Optional[UndoLog]) -> None:
+        self.library.journal = log
+        self.library.collection.journal = log
+
+    def _active_log(self) -> UndoLog:
+        if self.log is None:
+            raise LibraryException("Transaction is not active")
+        return self.log
+
+    def savepoint(self) -> int:
+        """Точка сохранения внутри транзакции"""
+        return self._active_log().mark()
+
+    def rollback_to(self, savepoint: int) -> None:
+        """Откат изменений, сделанных после точки сохранения"""
+        log = self._active_log()
+        if not self.start <= savepoint <= log.mark():
+            raise LibraryException(f"Invalid savepoint {savepoint}")
+        # на время отката журнал отключен, чтобы отмена не записывалась сама
+        self._attach(None)
+        try:
+            log.rollback_to(savepoint)
+        finally:
+            self._attach(log)
+
+    def rollback(self) -> None:
+        """Откат всех изменений этой транзакции (она остается активной)"""
+        self.rollback_to(self.start)
+
+    def __repr__(self):
+        state = f"{len(self.log) - self.start} changes" if self.log is not None else "inactive"
+        return f"Transaction({state})"
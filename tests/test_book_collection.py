@@ -69,6 +69,113 @@ class TestIndexDict:
 
         assert len(index.get_by_author("Author")) == 2
 
+    def test_get_all_rebuilt_after_change(self):
+        index = IndexDict()
+        book1 = Book("Title1", "Author", 2020, "Fiction", "1")
+        book2 = Book("Title2", "Author", 2021, "Fiction", "2")
+
+        index.add_book(book1)
+        first = index.group_by_author.get_all()
+        assert first == [book1]
+        generation = index.group_by_author._all_generation
+        first.append(book2)
+        # без изменений индекса список не пересобирается, а изменение копии его не портит
+        assert index.group_by_author.get_all() == [book1]
+        assert index.group_by_author._all_generation == generation
+
+        index.add_book(book2)
+        assert index.group_by_author.get_all() == [book1, book2]
+
+    def test_find_combined_filters(self):
+        index = IndexDict()
+        book1 = Book("Title1", "Author", 2020, "Fiction", "1")
+        book2 = Book("Title2", "Author", 2021, "Drama", "2")
+        book3 = Book("Title3", "Other", 2020, "Fiction", "3")
+        for book in (book1, book2, book3):
+            index.add_book(book)
+
+        assert index.find(author="Author", genre="Fiction") == [book1]
+        assert index.find(year=2020) == [book1, book3]
+        index.find(author="Author", genre="Fiction").clear()
+        assert index.find(author="Author", genre="Fiction") == [book1]
+        assert index.cache_stats()['hits'] == 2
+
+        with pytest.raises(LibraryException, match="Unknown index"):
+            index.find(isbn="1")
+
+    def test_find_invalidated_per_index(self):
+        index = IndexDict()
+        book1 = Book("Title1", "Author", 2020, "Fiction", "1")
+        index.add_book(book1)
+        index.find(genre="Fiction")
+        index.find(author="Author")
+
+        genre_generation = index.group_by_genre.generation
+        index.group_by_author.add(Book("Title2", "Author", None, None, "2"))
+        assert index.group_by_genre.generation == genre_generation
+
+        index.find(genre="Fiction")
+        assert index.cache_stats()['hits'] == 1
+        assert len(index.find(author="Author")) == 2
+        assert index.cache_stats()['invalidations'] == 1
+
+class TestCustomIndexes:
+    BOOKS = [
+        Book("War and Peace", "Tolstoy", 1869, "Novel", "1"),
+        Book("Anna Karenina", "Tolstoy", 1878, "Novel", "2"),
+        Book("Demons", "Dostoevsky", 1872, "Drama", "3"),
+        Book("Dubliners", "Joyce", 1914, "Novel", "4"),
+    ]
+
+    def make_index(self) -> IndexDict:
+        index = IndexDict()
+        for book in self.BOOKS:
+            index.add_book(book)
+        return index
+
+    def test_bulk_build_and_incremental_updates(self):
+        index = self.make_index()
+        decade = index.register_index('decade', lambda book: book.year // 10 * 10)
+        assert decade.built and index.get_by('decade', 1870) == self.BOOKS[1:3]
+        new_book = Book("Resurrection", "Tolstoy", 1899, "Novel", "5")
+        index.add_book(new_book)
+        assert index.get_by('decade', 1890) == [new_book]
+        index.delete_book(self.BOOKS[1])
+        assert index.get_by('decade', 1870) == [self.BOOKS[2]]
+
+    def test_composite_and_multi_keys(self):
+        index = self.make_index()
+        index.register_index('author_genre', lambda book: (book.author, book.genre))
+        index.register_index('letters', lambda book: book.title.lower().split(), multi=True)
+        assert index.get_by('author_genre', ("Tolstoy", "Novel")) == self.BOOKS[:2]
+        assert index.get_by('letters', "and") == [self.BOOKS[0]]
+        assert index.find(author="Tolstoy", letters="peace") == [self.BOOKS[0]]
+        with pytest.raises(LibraryException, match="already exists"):
+            index.register_index('author', lambda book: book.author)
+
+    def test_lazy_build_and_release(self):
+        index = self.make_index()
+        initial = index.register_index('initial', lambda book: book.author[0], lazy=True)
+        index.add_book(Book("Ulysses", "Joyce", 1922, "Novel", "6"))
+        assert not initial.built
+        assert len(index.find(initial="J")) == 2 and initial.built
+        assert index.find(initial="J") and index.index_stats()['initial'] == {'built': True, 'keys': 3, 'queries': 2}
+        assert index.release_unused_indexes(min_queries=3) == ['initial']
+        assert not initial.built and index.index_stats()['initial']['queries'] == 0
+        # после освобождения кэш запросов не отдает устаревший результат
+        index.add_book(Book("Dracula", "Stoker", 1897, "Horror", "7"))
+        assert len(index.find(initial="J")) == 2 and index.get_by('initial', "S")[0].title == "Dracula"
+
+    def test_drop_index(self):
+        index = self.make_index()
+        index.register_index('length', lambda book: len(book.title) // 5)
+        index.drop_index('length')
+        with pytest.raises(LibraryException, match="Unknown index"):
+            index.get_by('length', 2)
+        with pytest.raises(LibraryException, match="Unknown custom index"):
+            index.drop_index('author')
+        index.add_book(Book("Ulysses", "Joyce", 1922, "Novel", "6"))
+
 class TestBookCollection:
     def test_add_book(self):
         collection = BookCollection("Test")
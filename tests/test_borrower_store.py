@@ -0,0 +1,97 @@
+import pytest # type: ignore
+from datetime import datetime, timedelta
+from src.book_collection import Book, LibraryException
+from src.borrower_store import ColdBorrowerStore
+from src.library import Library
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+FIRST = datetime(2020, 1, 1, 10, 30)
+LAST = datetime(2021, 6, 1, 18, 0)
+
+
+class TestColdBorrowerStore:
+    def test_get_and_pop(self):
+        store = ColdBorrowerStore(block_size=4)
+        store.put_many([(user_id, user_id * 2, user_id * 2, FIRST, LAST) for user_id in range(30, 0, -3)])
+        assert len(store) == 10 and len(store.segments[0].blocks) == 3
+        assert store.get(12) == (12, 24, 24, FIRST, LAST)
+        assert store.get(13) is None and store.get(100) is None and store.get(-5) is None
+        assert store.pop(12) == (12, 24, 24, FIRST, LAST)
+        assert 12 not in store and len(store) == 9 and store.faults == 1
+        assert store.pop(12) is None
+
+    def test_newer_segment_wins_and_compact(self):
+        store = ColdBorrowerStore(block_size=2)
+        store.put_many([(1, 1, 1, None, None), (2, 2, 2, FIRST, None), (3, 3, 3, FIRST, LAST)])
+        store.pop(2)
+        store.put_many([(2, 5, 5, FIRST, LAST)])
+        store.pop(3)
+        assert store.get(2) == (2, 5, 5, FIRST, LAST)
+        assert [record[0] for record in store] == [1, 2]
+        store.compact()
+        assert len(store.segments) == 1 and len(store) == 2
+        assert list(store) == [(1, 1, 1, None, None), (2, 5, 5, FIRST, LAST)]
+
+    def test_packed_smaller_than_records(self):
+        store = ColdBorrowerStore()
+        store.put_many((user_id, 3, 3, FIRST + timedelta(minutes=user_id), LAST) for user_id in range(20000))
+        assert store.memory_bytes() < 20000 * 40
+
+
+class TestLibraryTiering:
+    def make_library(self) -> Library:
+        lib = Library()
+        lib.collection.add_book(BOOK1, 10)
+        lib.collection.add_book(BOOK2, 10)
+        lib.enable_borrower_tiering(idle_period=timedelta(days=30))
+        for user_id in range(1, 6):
+            lib.borrow_books(BOOK1, user_id)
+        for user_id in range(1, 4):
+            lib.return_books(BOOK1, user_id)
+        return lib
+
+    def test_evicts_only_idle_borrowers_without_books(self):
+        lib = self.make_library()
+        assert lib.evict_idle_borrowers(datetime.now()) == 0
+        assert lib.evict_idle_borrowers(datetime.now() + timedelta(days=31)) == 3
+        assert sorted(lib.borrowers) == [4, 5]
+        assert len(lib.cold_borrowers) == 3 # type: ignore
+
+    def test_fault_in_is_transparent(self):
+        lib = self.make_library()
+        before = lib.get_borrower_history(2)
+        lib.evict_idle_borrowers(datetime.now() + timedelta(days=31))
+        assert lib.get_borrower_history(2) == before
+        assert 2 in lib.borrowers and 2 not in lib.cold_borrowers # type: ignore
+        assert lib.get_borrower_info(7) is None
+
+    def test_borrowing_again_keeps_statistics(self):
+        lib = self.make_library()
+        lib.evict_idle_borrowers(datetime.now() + timedelta(days=31))
+        statistics = lib.statistics.copy()
+        lib.borrow_books(BOOK2, 1)
+        info = lib.get_borrower_info(1)
+        assert (info.total_borrowed, info.total_returned) == (2, 1) # type: ignore
+        assert lib.statistics['unique_borrowers'] == statistics['unique_borrowers']
+        assert lib.statistics['active_borrowers'] == statistics['active_borrowers'] + 1
+
+    def test_rollback_keeps_faulted_borrower(self):
+        lib = self.make_library()
+        lib.evict_idle_borrowers(datetime.now() + timedelta(days=31))
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK2, 3)
+            tx.rollback()
+        info = lib.get_borrower_info(3)
+        assert info is not None and info.total_borrowed == 1 and not info.borrowed_books
+
+    def test_snapshot_keeps_evicted_borrowers(self):
+        lib = self.make_library()
+        snap = lib.snapshot()
+        lib.evict_idle_borrowers(datetime.now() + timedelta(days=31))
+        assert sorted(snap.borrowers) == [1, 2, 3, 4, 5]
+        assert sorted(lib.borrowers) == [4, 5]
+
+    def test_not_enabled(self):
+        with pytest.raises(LibraryException, match="not enabled"):
+            Library().evict_idle_borrowers()
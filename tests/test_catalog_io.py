@@ -0,0 +1,136 @@
+import io
+import json
+import pytest # type: ignore
+from datetime import datetime
+from src.book_collection import Book, BookCollection, LibraryException
+from src.library import Library
+from src.catalog_io import import_books, export_books, import_loans, export_loans
+from src.replication import apply_changes
+
+CSV_DATA = """title,author,year,genre,isbn,count
+Title1,Author1,2020,Fiction,1,3
+Title2,Author2,,Fiction,2,1
+Title3,Author3,1999,Drama,3,
+Title4,Author4,abc,Drama,4,1
+Title5,Author5,2001,Drama,5,-1
+"""
+
+class TestImportBooks:
+    def test_csv_import_with_rejects(self):
+        collection = BookCollection("Test")
+        rejects = io.StringIO()
+        report = import_books(collection, io.StringIO(CSV_DATA), rejects, fmt='csv', chunk_size=2)
+
+        assert report.rows == 5
+        assert report.imported == 2
+        assert report.rejected == 3
+        assert collection.get_count(Book("Title1", "Author1", 2020, "Fiction", "1")) == 3
+        assert collection.get_count(Book("Title3", "Author3", 1999, "Drama", "3")) == 1
+
+        lines = rejects.getvalue().splitlines()
+        assert lines[0].startswith("line,reason,")
+        assert "Year must be an integer" in lines[1]
+        assert "Count must be positive" in lines[3]
+
+    def test_jsonl_import(self, tmp_path):
+        source = tmp_path / "books.jsonl"
+        source.write_text(
+            json.dumps({"title": "T", "author": "A", "year": 2000, "genre": "G", "isbn": "1", "count": 2}) + "\n"
+            + json.dumps({"title": None, "author": "A", "year": 2000, "genre": "G", "isbn": "2"}) + "\n"
+            + "{not json\n",
+            encoding="utf-8"
+        )
+        reject_path = tmp_path / "rejects.jsonl"
+        collection = BookCollection()
+        report = import_books(collection, source, reject_path)
+
+        assert report.imported == 1
+        assert report.rejected == 2
+        rejected = [json.loads(line) for line in reject_path.read_text(encoding="utf-8").splitlines()]
+        assert "Title must be a string" in rejected[0]['reason']
+        assert rejected[1]['reason'] == "Malformed record"
+
+    def test_isbn_conflict_is_rejected(self):
+        collection = BookCollection()
+        data = "title,author,year,genre,isbn,count\nA,B,2000,G,1,1\nC,D,2000,G,1,1\n"
+        report = import_books(collection, io.StringIO(data), fmt='csv')
+        assert report.imported == 1
+        assert report.rejected == 1
+
+    def test_unknown_format(self):
+        with pytest.raises(LibraryException, match="Unknown format"):
+            import_books(BookCollection(), io.StringIO(""), fmt='xml')
+
+    def test_roundtrip(self, tmp_path):
+        collection = BookCollection()
+        collection.add_book(Book("Война и мир", "Лев Толстой", 1869, "Роман", "1"), 2)
+        collection.add_book(Book("Идиот", "Фёдор Достоевский", 1869, "Роман", "2"), 1)
+        for name in ("books.csv", "books.jsonl"):
+            path = tmp_path / name
+            assert export_books(collection, path) == 2
+            restored = BookCollection()
+            report = import_books(restored, path)
+            assert report.imported == 2
+            assert restored.get_all_books_with_counts() == collection.get_all_books_with_counts()
+
+class TestLoans:
+    def test_loans_roundtrip(self, tmp_path):
+        lib = Library()
+        book = Book("Title", "Author", 2020, "Fiction", "12345")
+        lib.collection.add_book(book, 3)
+        lib.borrow_books(book, 1, 2)
+        lib.borrow_books(book, 2, 1)
+
+        path = tmp_path / "loans.csv"
+        assert export_loans(lib, path) == 2
+
+        restored = Library()
+        report = import_loans(restored, path)
+        assert report.imported == 2
+        assert restored.borrowed_books == {book: {1: 2, 2: 1}}
+        assert restored.get_user_borrowed_books(1) == {book: 2}
+        assert len(restored.collection) == 0
+        assert restored.statistics['total_borrowed'] == lib.statistics['total_borrowed'] == 3
+        assert sorted((loan.user_id, loan.count) for loan in restored.due_index.due_before(datetime.max)) == [(1, 2), (2, 1)]
+
+    def test_invalid_loan_rows(self):
+        data = ("title,author,year,genre,isbn,user_id,count\nT,A,2000,G,1,,1\nT,A,2000,G,1,5,0\n"
+                "T,A,2000,G,1,0,1\nT,A,2000,G,1,-3,1\n")
+        lib = Library()
+        rejects = io.StringIO()
+        report = import_loans(lib, io.StringIO(data), rejects, fmt='csv')
+        assert report.rejected == 4
+        assert lib.borrowed_books == {} and lib.statistics['total_borrowed'] == 0
+        assert "User id must be positive" in rejects.getvalue()
+
+    def test_imported_loan_replicated_and_returned(self):
+        lib = Library()
+        book = Book("Title", "Author", 2020, "Fiction", "978-0-306-40615-7")
+        lib.collection.add_book(book, 1)
+        feed = lib.enable_change_feed()
+        lib.enable_copy_tracking()
+        data = "title,author,year,genre,isbn,user_id,count\nTitle,Author,2020,Fiction,0306406152,7,2\n"
+        assert import_loans(lib, io.StringIO(data), fmt='csv').imported == 1
+        # выдача учтена по записи книги в коллекции, с экземплярами и в журнале обращений
+        assert lib.borrowed_books == {book: {7: 2}}
+        assert len(lib.copies.held_by(book, 7)) == 2 # type: ignore
+        assert lib.get_trending_books() == [(book, 2)]
+        replica = Library()
+        replica.collection.add_book(book, 1)
+        assert apply_changes(replica, feed.since(0)) == 1 # type: ignore
+        assert replica.borrowed_books == lib.borrowed_books
+        lib.return_books(book, 7, 2)
+        assert lib.collection.get_count(book) == 3 and lib.copies.available(book) == 3 # type: ignore
+
+    def test_imported_loan_rolled_back(self):
+        lib = Library()
+        book = Book("Title", "Author", 2020, "Fiction", "1")
+        lib.collection.add_book(book, 1)
+        lib.enable_copy_tracking()
+        with lib.transaction() as tx:
+            lib.register_loan(book, 7, 2)
+            tx.rollback()
+        assert lib.borrowed_books == {} and lib.statistics['total_borrowed'] == 0
+        assert lib.copies.available(book) == 1 and lib.copies.held_by(book, 7) == [] # type: ignore
+        with pytest.raises(LibraryException, match="Count must be positive"):
+            lib.register_loan(book, 7, 0)
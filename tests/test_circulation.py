@@ -0,0 +1,68 @@
+import pytest # type: ignore
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from src.book_collection import Book, LibraryException
+from src.circulation import EventStore, BORROW, RETURN
+from src.library import Library
+
+BOOK1 = Book("Title1", "Author", 2020, "Fiction", "1")
+BOOK2 = Book("Title2", "Author", 2021, "Drama", "2")
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+class TestEventStore:
+    def test_top_books_in_window(self):
+        store = EventStore(bucket_seconds=3600, num_buckets=24)
+        store.record(BORROW, BOOK1, 5, START)
+        store.record(BORROW, BOOK2, 2, START + timedelta(hours=3))
+        store.record(BORROW, BOOK2, 2, START + timedelta(hours=4))
+        now = START + timedelta(hours=4)
+
+        assert store.top_books(2 * 3600, now=now) == [(BOOK2, 4)]
+        assert store.top_books(24 * 3600, now=now) == [(BOOK1, 5), (BOOK2, 4)]
+        assert store.top_genres(24 * 3600, k=1, now=now) == [("Fiction", 5)]
+
+    def test_count_and_rate(self):
+        store = EventStore(bucket_seconds=60, num_buckets=60)
+        for minute in range(10):
+            store.record(BORROW, BOOK1, 1, START + timedelta(minutes=minute))
+        store.record(RETURN, BOOK1, 3, START + timedelta(minutes=9))
+        now = START + timedelta(minutes=9)
+
+        assert store.count(600, now=now) == 10
+        assert store.count(600, kind=RETURN, now=now) == 3
+        assert store.count(600, book=BOOK2, now=now) == 0
+        assert store.count(600, genre="Fiction", now=now) == 10
+        assert store.rate(600, now=now) == pytest.approx(60.0)
+
+    def test_rollover_bounds_history(self):
+        store = EventStore(bucket_seconds=60, num_buckets=5)
+        store.record(BORROW, BOOK1, 1, START)
+        store.record(BORROW, BOOK2, 1, START + timedelta(minutes=5))
+        assert store.count(300, now=START + timedelta(minutes=5)) == 1
+        store.record(BORROW, BOOK1, 1, START)
+        assert store.dropped == 1
+
+    def test_invalid_arguments(self):
+        store = EventStore(bucket_seconds=60, num_buckets=5)
+        with pytest.raises(LibraryException, match="exceeds retention"):
+            store.count(3600)
+        with pytest.raises(LibraryException, match="Unknown event kind"):
+            store.record("lost", BOOK1)
+        with pytest.raises(LibraryException):
+            EventStore(bucket_seconds=0)
+
+class TestLibraryCirculation:
+    @patch('src.library.datetime')
+    def test_trending_counts_returned_loans(self, mock_datetime):
+        mock_datetime.now.return_value = START
+        lib = Library()
+        lib.collection.add_book(BOOK1, 5)
+        lib.collection.add_book(BOOK2, 5)
+        lib.borrow_books(BOOK1, 1, 3)
+        lib.return_books(BOOK1, 1, 3)
+        lib.borrow_books(BOOK2, 2, 1)
+
+        assert lib.get_most_borrowed_books() == [(BOOK2, 1)]
+        assert lib.get_trending_books() == [(BOOK1, 3), (BOOK2, 1)]
+        assert lib.get_trending_genres(limit=1) == [("Fiction", 3)]
+        assert lib.get_borrow_rate() == pytest.approx(4.0)
@@ -0,0 +1,99 @@
+import random
+import pytest # type: ignore
+from src import columnar
+from src.book_collection import Book, LibraryException
+from src.library import Library
+
+GENRES = ["Роман", "Поэзия", "Драма", "Фантастика"]
+
+
+def make_library(books: int = 300, seed: int = 0) -> Library:
+    random.seed(seed)
+    lib = Library()
+    for i in range(books):
+        book = Book(f"Title {i}", f"Author {i % 37}", random.randint(1950, 2024), random.choice(GENRES), f"isbn-{i}")
+        lib.collection.add_book(book, random.randint(1, 4))
+    for user_id in range(200):
+        on_shelf = [(book, count) for book, count in lib.collection.items if count > 0]
+        if not on_shelf:
+            break
+        book, count = random.choice(on_shelf)
+        lib.borrow_books(book, user_id, random.randint(1, count))
+    return lib
+
+
+@pytest.mark.skipif(columnar.np is not None, reason="numpy is installed")
+def test_requires_numpy():
+    with pytest.raises(LibraryException, match="require numpy"):
+        Library().to_columnar()
+
+
+class TestColumnarSnapshot:
+    @pytest.fixture(autouse=True)
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    def test_columns(self):
+        lib = make_library(50)
+        snap = lib.to_columnar()
+        assert len(snap) == len({book.isbn for book in lib.collection} | {book.isbn for book in lib.borrowed_books})
+        assert snap.copies.sum() == lib.collection.total_count()
+        assert snap.loans.sum() == lib.statistics['total_borrowed']
+        # сначала книги на полках, затем полностью выданные
+        expected = [book.author for book, _ in lib.collection.items]
+        expected += [book.author for book in lib.borrowed_books if book not in lib.collection]
+        assert [snap.authors[code] for code in snap.author.tolist()] == expected
+
+    @pytest.mark.parametrize("by", ['author', 'genre', 'year', 'decade', ('genre', 'decade'), ('author', 'genre')])
+    @pytest.mark.parametrize("value", ['copies', 'loans'])
+    def test_group_by_matches_python(self, by, value):
+        lib = make_library()
+        names = (by,) if isinstance(by, str) else by
+        expected = columnar.python_group_by(lib.collection, lib.borrowed_books, names, value)
+        assert lib.to_columnar().group_by(by, value) == expected
+
+    def test_fully_borrowed_books_included(self):
+        lib = Library()
+        book = Book("Title", "Author", 2001, "Роман", "1")
+        lib.collection.add_book(book, 2)
+        lib.borrow_books(book, 1, 2)
+        snap = lib.to_columnar()
+        assert snap.group_by('author', 'loans') == {"Author": 2}
+        assert snap.loan_ratio_by_author() == {"Author": 1.0}
+
+    def test_loan_ratio_by_author(self):
+        lib = make_library()
+        copies = columnar.python_group_by(lib.collection, lib.borrowed_books, ['author'], 'copies')
+        loans = columnar.python_group_by(lib.collection, lib.borrowed_books, ['author'], 'loans')
+        ratio = lib.to_columnar().loan_ratio_by_author()
+        for author, value in ratio.items():
+            assert value == pytest.approx(loans[author] / (loans[author] + copies[author]))
+
+    def test_histogram(self):
+        lib = make_library()
+        counts, edges = lib.to_columnar().histogram('year', bins=[1950, 1980, 2000, 2025], weights='copies')
+        expected = [0, 0, 0]
+        for book, count in lib.collection.items:
+            expected[0 if book.year < 1980 else 1 if book.year < 2000 else 2] += count
+        assert counts == expected
+        assert edges == [1950, 1980, 2000, 2025]
+
+    def test_top_k(self):
+        lib = make_library()
+        snap = lib.to_columnar()
+        loans = {}
+        for book, users in lib.borrowed_books.items():
+            loans[book.isbn] = sum(users.values())
+        order = {isbn: i for i, isbn in enumerate(snap.isbns)}
+        expected = sorted(loans.items(), key=lambda item: (-item[1], order[item[0]]))[:5]
+        assert snap.top_k('loans', 5) == expected
+        by_genre = columnar.python_group_by(lib.collection, lib.borrowed_books, ['genre'], 'copies')
+        assert snap.top_k('copies', 2, by='genre') == sorted(by_genre.items(), key=lambda item: -item[1])[:2]
+        assert snap.top_k('copies', 0) == []
+
+    def test_unknown_columns(self):
+        snap = make_library(5).to_columnar()
+        with pytest.raises(LibraryException, match="Unknown key column"):
+            snap.group_by('publisher')
+        with pytest.raises(LibraryException, match="Unknown value column"):
+            snap.group_by('genre', 'price')
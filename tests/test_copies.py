@@ -0,0 +1,131 @@
+import pytest # type: ignore
+from src.book_collection import Book, LibraryException
+from src.copies import CopyRegistry
+from src.library import Library
+from src.results import OperationStatus
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+
+
+class TestCopyRegistry:
+    def test_checkout_and_return(self):
+        registry = CopyRegistry()
+        barcodes = registry.add_copies(BOOK1, 3)
+        registry.add_copies(BOOK2, 2, condition='new')
+        assert barcodes == [0, 1, 2] and registry.available(BOOK1) == 3
+        lent = registry.checkout(BOOK1, 7, 2)
+        assert registry.available(BOOK1) == 1 and sorted(registry.held_by(BOOK1, 7)) == sorted(lent)
+        assert registry.copy(lent[0]).status == 'on_loan' and registry.copy(lent[0]).holder == 7
+        assert registry.return_copies(BOOK1, 7, 1, [lent[1]]) == [lent[1]]
+        assert registry.held_by(BOOK1, 7) == [lent[0]] and registry.available(BOOK1) == 2
+        assert registry.copy(3).isbn == "222" and registry.copy(3).condition == 'new'
+
+    def test_specific_barcodes(self):
+        registry = CopyRegistry()
+        registry.add_copies(BOOK1, 3)
+        registry.add_copies(BOOK2, 1)
+        assert registry.checkout(BOOK1, 1, 1, [1]) == [1]
+        for barcodes, message in (([1], "not available"), ([3], "not a copy"), ([9], "Unknown barcode"),
+                                  ([0, 0], "distinct")):
+            with pytest.raises(LibraryException, match=message):
+                registry.checkout(BOOK1, 2, len(barcodes), barcodes)
+        with pytest.raises(LibraryException, match="not on loan"):
+            registry.return_copies(BOOK1, 2, 1, [1])
+        # после ошибок свободный список не поврежден
+        assert sorted(registry.checkout(BOOK1, 2, 2)) == [0, 2]
+        with pytest.raises(LibraryException, match="Not enough"):
+            registry.checkout(BOOK1, 2, 1)
+
+    def test_sync_adds_and_withdraws(self):
+        registry = CopyRegistry()
+        registry.add_copies(BOOK1, 2)
+        registry.sync(BOOK1, 4)
+        assert registry.available(BOOK1) == 4 and len(registry) == 4
+        registry.sync(BOOK1, 1)
+        assert registry.available(BOOK1) == 1
+        assert [info.status for info in registry.copies_of(BOOK1)].count('withdrawn') == 3
+        registry.sync(BOOK2, 0)
+        assert registry.copies_of(BOOK2) == []
+
+    def test_loans_by_holder(self):
+        registry = CopyRegistry()
+        registry.add_copies(BOOK1, 1000)
+        lent = registry.checkout(BOOK1, 7, 3)
+        registry.checkout(BOOK1, 8, 1)
+        # выданные читателю экземпляры берутся из словаря, а не перебором всех экземпляров книги
+        assert registry.loans[(0, 7)] == dict.fromkeys(lent)
+        assert registry.return_copies(BOOK1, 7, 2) == lent[:2]
+        registry.return_copies(BOOK1, 7, 1)
+        assert (0, 7) not in registry.loans and registry.held_by(BOOK1, 7) == []
+        assert registry.held_by(BOOK2, 7) == []
+
+    def test_compact_columns(self):
+        registry = CopyRegistry()
+        for i in range(1000):
+            registry.add_copies(Book(f"T{i}", "A", 2000, "G", f"isbn-{i}"), 10)
+        assert registry.memory_bytes() / len(registry) < 32
+
+
+class TestLibraryCopies:
+    def make_library(self) -> Library:
+        lib = Library()
+        lib.collection.add_book(BOOK1, 3)
+        lib.collection.add_book(BOOK2, 2)
+        lib.borrow_books(BOOK2, 5)
+        lib.enable_copy_tracking()
+        return lib
+
+    def test_existing_loans_imported(self):
+        lib = self.make_library()
+        assert len(lib.copies) == 5 # type: ignore
+        assert len(lib.copies.held_by(BOOK2, 5)) == 1 # type: ignore
+        assert lib.copies.available(BOOK2) == 1 # type: ignore
+
+    def test_borrow_and_return_by_barcode(self):
+        lib = self.make_library()
+        barcode = lib.copies.copies_of(BOOK1)[1].barcode # type: ignore
+        assert lib.borrow_books(BOOK1, 1, barcodes=[barcode]).status == OperationStatus.BORROWED
+        assert lib.copies.held_by(BOOK1, 1) == [barcode] # type: ignore
+        lib.borrow_books(BOOK1, 1)
+        assert lib.return_books(BOOK1, 1, barcodes=[barcode]).status == OperationStatus.RETURNED
+        assert lib.copies.copy(barcode).status == 'available' # type: ignore
+        assert len(lib.copies.held_by(BOOK1, 1)) == 1 # type: ignore
+
+    def test_invalid_barcode_changes_nothing(self):
+        lib = self.make_library()
+        lent = lib.copies.held_by(BOOK2, 5) # type: ignore
+        with pytest.raises(LibraryException, match="not available"):
+            lib.borrow_books(BOOK2, 1, barcodes=lent)
+        with pytest.raises(LibraryException, match="not on loan"):
+            lib.return_books(BOOK2, 5, barcodes=[lib.copies.free_head[1]]) # type: ignore
+        assert lib.collection.get_count(BOOK2) == 1 and lib.borrowed_books[BOOK2] == {5: 1}
+
+    def test_acquisitions_synced_on_checkout(self):
+        lib = self.make_library()
+        lib.collection.add_book(BOOK1, 2)
+        lib.borrow_books(BOOK1, 1, 5)
+        assert len(lib.copies.held_by(BOOK1, 1)) == 5 and lib.copies.available(BOOK1) == 0 # type: ignore
+
+    def test_rollback_restores_copies(self):
+        lib = self.make_library()
+        lent = lib.copies.held_by(BOOK2, 5) # type: ignore
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK1, 1, 2)
+            lib.return_books(BOOK2, 5)
+            tx.rollback()
+        assert lib.copies.available(BOOK1) == 3 and lib.copies.held_by(BOOK1, 1) == [] # type: ignore
+        assert lib.copies.held_by(BOOK2, 5) == lent # type: ignore
+
+    def test_hold_allocated_copy(self):
+        lib = self.make_library()
+        lib.borrow_books(BOOK2, 6)
+        lib.place_hold(BOOK2, 7)
+        lib.return_books(BOOK2, 5)
+        assert len(lib.copies.held_by(BOOK2, 7)) == 1 and lib.copies.available(BOOK2) == 0 # type: ignore
+
+    def test_not_enabled(self):
+        lib = Library()
+        lib.collection.add_book(BOOK1)
+        with pytest.raises(LibraryException, match="not enabled"):
+            lib.borrow_books(BOOK1, 1, barcodes=[0])
@@ -0,0 +1,91 @@
+import pytest # type: ignore
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from src.book_collection import Book, LibraryException
+from src.due_dates import DueIndex
+from src.library import Library
+
+BOOK1 = Book("Title1", "Author", 2020, "Fiction", "1")
+BOOK2 = Book("Title2", "Author", 2021, "Drama", "2")
+DAY = datetime(2024, 3, 1)
+
+class TestDueIndex:
+    def test_next_due_and_due_before(self):
+        index = DueIndex()
+        index.add(BOOK1, 1, 1, DAY + timedelta(days=5))
+        index.add(BOOK2, 2, 2, DAY + timedelta(days=1))
+        index.add(BOOK1, 3, 1, DAY + timedelta(days=3))
+
+        assert index.next_due().user_id == 2
+        due = index.due_before(DAY + timedelta(days=4))
+        assert [loan.user_id for loan in due] == [2, 3]
+
+    def test_partial_return_closes_earliest_lot(self):
+        index = DueIndex()
+        index.add(BOOK1, 1, 2, DAY + timedelta(days=1))
+        index.add(BOOK1, 1, 2, DAY + timedelta(days=7))
+
+        assert index.release(BOOK1, 1, 3) == 3
+        lots = index.loans_of(BOOK1, 1)
+        assert len(lots) == 1
+        assert lots[0].count == 1
+        assert lots[0].due == DAY + timedelta(days=7)
+        assert index.due_before(DAY + timedelta(days=2)) == []
+        assert index.next_due().due == DAY + timedelta(days=7)
+
+        assert index.release(BOOK1, 1, 5) == 1
+        assert len(index) == 0
+        assert index.next_due() is None
+
+    def test_renew(self):
+        index = DueIndex()
+        index.add(BOOK1, 1, 1, DAY)
+        index.add(BOOK2, 2, 1, DAY + timedelta(days=2))
+        index.renew(BOOK1, 1, DAY + timedelta(days=10))
+
+        assert index.next_due().book == BOOK2
+        assert index.loans_of(BOOK1, 1)[0].renewals == 1
+        assert [loan.book for loan in index.due_before(DAY + timedelta(days=11))] == [BOOK2, BOOK1]
+        with pytest.raises(LibraryException, match="has no loans"):
+            index.renew(BOOK2, 1, DAY)
+
+    def test_sweep_batches(self):
+        index = DueIndex()
+        for user_id in range(5):
+            index.add(BOOK1, user_id, 1, DAY + timedelta(hours=user_id))
+        batches = list(index.sweep(DAY + timedelta(days=1), batch_size=2))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+
+        index.add(BOOK2, 9, 1, DAY + timedelta(days=1, hours=1))
+        new = list(index.sweep(DAY + timedelta(days=2), only_new=True))
+        assert [[loan.user_id for loan in batch] for batch in new] == [[9]]
+
+    def test_heap_is_compacted(self):
+        index = DueIndex()
+        for i in range(100):
+            index.add(BOOK1, 1, 1, DAY + timedelta(minutes=i))
+            index.release(BOOK1, 1, 1)
+        assert len(index.heap) <= 16
+
+class TestLibraryDueDates:
+    @patch('src.library.datetime')
+    def test_borrow_sets_due_date(self, mock_datetime):
+        mock_datetime.now.return_value = DAY
+        lib = Library(loan_period=timedelta(days=14))
+        lib.collection.add_book(BOOK1, 5)
+        lib.borrow_books(BOOK1, 1, 2)
+        lib.borrow_books(BOOK1, 2, 1, due=DAY + timedelta(days=1))
+
+        assert lib.get_next_due_loan().user_id == 2
+        assert lib.get_overdue_loans(DAY + timedelta(days=2))[0].user_id == 2
+        assert len(lib.get_overdue_loans(DAY + timedelta(days=15))) == 2
+
+        lib.return_books(BOOK1, 1, 1)
+        assert lib.due_index.loans_of(BOOK1, 1)[0].count == 1
+
+        lib.renew_loan(BOOK1, 2)
+        assert lib.due_index.loans_of(BOOK1, 2)[0].due == DAY + timedelta(days=14)
+
+        mock_datetime.now.return_value = DAY + timedelta(days=20)
+        batches = list(lib.sweep_overdue())
+        assert sum(len(batch) for batch in batches) == 2
@@ -0,0 +1,56 @@
+import pytest # type: ignore
+from src.book_collection import Book, BookCollection, LibraryException
+from src.library import Library
+
+BOOK1 = Book("Война и мир", "Лев Толстой", 1869, "Роман", "1")
+BOOK2 = Book("Анна Каренина", "Лев Толстой", 1863, "Роман", "2")
+BOOK3 = Book("Властелин колец", "Дж. Р. Р. Толкин", 1954, "Фэнтези", "3")
+
+class TestFacets:
+    def test_counts_titles_and_copies(self):
+        collection = BookCollection()
+        collection.add_book(BOOK1, 3)
+        collection.add_book(BOOK2, 1)
+        collection.add_book(BOOK3, 5)
+        collection.add_book(BOOK1, 1)
+
+        assert collection.get_facet('genre') == [("Роман", 2, 5), ("Фэнтези", 1, 5)]
+        assert collection.get_facet('author', limit=1) == [("Лев Толстой", 2, 5)]
+        assert collection.get_facet('decade') == [(1860, 2, 5), (1950, 1, 5)]
+
+    def test_delete_and_update(self):
+        collection = BookCollection()
+        collection.add_book(BOOK1, 3)
+        collection.add_book(BOOK2, 2)
+        collection.delete_book(BOOK1, 1)
+        assert collection.get_facet('genre') == [("Роман", 2, 4)]
+
+        collection.delete_book(BOOK1, 10)
+        assert collection.get_facet('genre') == [("Роман", 1, 2)]
+
+        collection.update_book(BOOK2, Book("Анна Каренина", "Лев Толстой", 1877, "Трагедия", "2"))
+        assert collection.get_facet('genre') == [("Трагедия", 1, 2)]
+        assert collection.get_facet('decade') == [(1870, 1, 2)]
+
+    def test_unknown_facet(self):
+        with pytest.raises(LibraryException, match="Unknown facet"):
+            BookCollection().get_facet('isbn')
+
+    def test_library_mutations(self):
+        lib = Library()
+        lib.collection.add_book(BOOK1, 2)
+        lib.collection.add_book(BOOK3, 1)
+        lib.borrow_books(BOOK1, 1, 1)
+        lib.borrow_books(BOOK3, 1, 1)
+        assert lib.collection.get_facet('genre') == [("Роман", 1, 1)]
+
+        lib.return_books(BOOK3, 1, 1)
+        assert lib.collection.get_facet('genre') == [("Роман", 1, 1), ("Фэнтези", 1, 1)]
+
+    def test_facets_for_result_set(self):
+        collection = BookCollection()
+        for book, count in ((BOOK1, 3), (BOOK2, 1), (BOOK3, 5)):
+            collection.add_book(book, count)
+        found = collection.index_dict.find(author="Лев Толстой")
+        facets = collection.facets_for(found, ['genre', 'decade'])
+        assert facets == {'genre': {"Роман": (2, 4)}, 'decade': {1860: (2, 4)}}
@@ -0,0 +1,61 @@
+import pytest # type: ignore
+from src.book_collection import Book, IndexDict
+from src.fuzzy import TrigramIndex, levenshtein, terms
+
+class TestLevenshtein:
+    def test_distance(self):
+        assert levenshtein("kitten", "sitting") == 3
+        assert levenshtein("", "abc") == 3
+        assert levenshtein("abc", "abc") == 0
+
+    def test_cutoff(self):
+        assert levenshtein("kitten", "sitting", max_distance=1) == 2
+        assert levenshtein("a", "abcdef", max_distance=2) == 3
+
+class TestTrigramIndex:
+    def test_terms(self):
+        assert terms("Дж. Р. Р. Толкин") == {"дж. р. р. толкин", "толкин"}
+
+    def test_search_ranked(self):
+        index = TrigramIndex()
+        for key in ("Tolkien", "Tolstoy", "Token", "Dostoevsky"):
+            index.add(key)
+        result = index.search("Tolkein", max_distance=2)
+        assert result == [("Token", 2), ("Tolkien", 2)]
+        assert index.search("tolkien", max_distance=0) == [("Tolkien", 0)]
+
+    def test_word_match(self):
+        index = TrigramIndex()
+        index.add("Фёдор Достоевский")
+        index.add("Лев Толстой")
+        assert index.search("Достоевскии", max_distance=1) == [("Фёдор Достоевский", 1)]
+
+    def test_remove(self):
+        index = TrigramIndex()
+        index.add("Лев Толстой")
+        index.add("Алексей Толстой")
+        index.remove("Лев Толстой")
+        assert "Лев Толстой" not in index
+        assert index.search("Толстои", max_distance=1) == [("Алексей Толстой", 1)]
+        index.remove("Алексей Толстой")
+        assert index.postings == {}
+        assert len(index) == 0
+
+    def test_negative_distance(self):
+        with pytest.raises(ValueError):
+            TrigramIndex().search("a", -1)
+
+class TestIndexDictFuzzy:
+    def test_fuzzy_lookup_is_maintained(self):
+        index = IndexDict()
+        book1 = Book("Властелин колец", "Дж. Р. Р. Толкин", 1954, "Фэнтези", "1")
+        book2 = Book("Идиот", "Фёдор Достоевский", 1869, "Роман", "2")
+        index.add_book(book1)
+        assert index.get_by_author_fuzzy("Толкен", max_distance=1) == [("Дж. Р. Р. Толкин", 1)]
+
+        index.add_book(book2)
+        assert index.get_by_author_fuzzy("Достоевскии")[0] == ("Фёдор Достоевский", 1)
+        assert index.get_by_title_fuzzy("Идеот", max_distance=1) == [("Идиот", 1)]
+
+        index.delete_book(book1)
+        assert index.get_by_author_fuzzy("Толкен", max_distance=1) == []
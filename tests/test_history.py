@@ -0,0 +1,98 @@
+import pytest # type: ignore
+from datetime import datetime, timedelta
+from src.book_collection import Book, LibraryException
+from src.history import InventoryHistory
+from src.library import Library
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+START = datetime(2024, 3, 1, 10, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs) -> datetime:
+        self.now += timedelta(**kwargs)
+        return self.now
+
+
+class TestInventoryHistory:
+    def test_replay_from_nearest_checkpoint(self):
+        clock = FakeClock()
+        history = InventoryHistory([("111", 5)], checkpoint_interval=3, clock=clock)
+        moments = []
+        for i in range(10):
+            clock.advance(hours=1)
+            history.record("111", -1 if i % 2 else 2)
+            moments.append(clock.now)
+        assert len(history.checkpoints) == 4
+        expected = 5
+        for i, moment in enumerate(moments):
+            expected += -1 if i % 2 else 2
+            assert history.as_of(moment).copies("111") == expected
+        assert history.as_of(START).copies("111") == 5
+
+    def test_zero_counts_removed(self):
+        history = InventoryHistory([("111", 1)])
+        history.record("111", -1)
+        history.record("111", 1, user_id=7)
+        state = history.as_of(datetime.now() + timedelta(seconds=1))
+        assert state.shelf == {}
+        assert state.holders("111") == {7: 1}
+
+    def test_before_start(self):
+        clock = FakeClock()
+        history = InventoryHistory(clock=clock)
+        with pytest.raises(LibraryException, match="No history before"):
+            history.as_of(START - timedelta(days=1))
+
+    def test_invalid_interval(self):
+        with pytest.raises(LibraryException, match="must be positive"):
+            InventoryHistory(checkpoint_interval=0)
+
+
+class TestLibraryHistory:
+    def test_as_of(self):
+        clock = FakeClock()
+        lib = Library()
+        lib.collection.add_book(BOOK1, 3)
+        lib.enable_history(checkpoint_interval=2, clock=clock)
+        march_2 = clock.advance(days=1)
+        lib.borrow_books(BOOK1, 1, 2)
+        lib.collection.add_book(BOOK2)
+        march_3 = clock.advance(days=1)
+        lib.return_books(BOOK1, 1)
+        lib.borrow_books(BOOK1, 2)
+        clock.advance(days=1)
+        lib.collection.update_book(BOOK2, Book("Title2 (2nd ed.)", "Author2", 2012, "Drama", "222"))
+
+        assert lib.as_of(START).copies("111") == 3
+        assert lib.as_of(START).holders("111") == {}
+        state = lib.as_of(march_2 + timedelta(hours=12))
+        assert (state.copies("111"), state.copies("222")) == (1, 1)
+        assert state.holders("111") == {1: 2}
+        state = lib.as_of(march_3)
+        assert state.copies("111") == 1
+        assert state.holders("111") == {1: 1, 2: 1}
+        assert lib.as_of(clock.now).copies("222") == 1
+
+    def test_rollback_recorded(self):
+        lib = Library()
+        lib.collection.add_book(BOOK1, 2)
+        history = lib.enable_history()
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK1, 1)
+            tx.rollback()
+        state = lib.as_of(datetime.now() + timedelta(seconds=1))
+        assert state.copies("111") == 2
+        assert state.holders("111") == {}
+        assert history.shelf == {"111": 2} and history.loans == {}
+
+    def test_history_required(self):
+        with pytest.raises(LibraryException, match="not enabled"):
+            Library().as_of(START)
@@ -0,0 +1,102 @@
+import pytest # type: ignore
+from src.book_collection import Book, LibraryException
+from src.holds import HoldQueues
+from src.library import Library
+from src.results import OperationStatus
+
+BOOK = Book("Title", "Author", 2020, "Fiction", "12345")
+
+class TestHoldQueues:
+    def test_fifo_order(self):
+        queues = HoldQueues()
+        first = queues.place(BOOK, 1)
+        second = queues.place(BOOK, 2)
+        assert queues.peek("12345") is first
+        assert queues.position(second.hold_id) == 2
+        assert queues.pop("12345") is first
+        assert queues.position(second.hold_id) == 1
+        assert queues.waiting("12345") == 1
+
+    def test_cancel(self):
+        queues = HoldQueues()
+        first = queues.place(BOOK, 1)
+        second = queues.place(BOOK, 2)
+        queues.cancel(first.hold_id)
+        assert queues.peek("12345") is second
+        queues.cancel(second.hold_id)
+        assert queues.peek("12345") is None
+        assert queues.queues == {}
+        with pytest.raises(LibraryException, match="not found"):
+            queues.cancel(first.hold_id)
+
+    def test_reserved_demand(self):
+        queues = HoldQueues()
+        first = queues.place(BOOK, 1, 2)
+        queues.place(BOOK, 2, 1)
+        assert queues.reserved("12345") == 3
+        queues.pop("12345")
+        queues.restore(first)
+        queues.cancel(first.hold_id)
+        assert queues.reserved("12345") == 1
+        queues.pop("12345")
+        assert queues.demand == {}
+
+    def test_invalid_count(self):
+        with pytest.raises(LibraryException, match="must be positive"):
+            HoldQueues().place(BOOK, 1, 0)
+
+class TestLibraryHolds:
+    def test_return_allocates_to_hold(self):
+        lib = Library()
+        lib.collection.add_book(BOOK, 1)
+        lib.borrow_books(BOOK, 1)
+        hold = lib.place_hold(BOOK, 2)
+        assert lib.get_hold_position(hold.hold_id) == 1
+
+        lib.return_books(BOOK, 1)
+        assert lib.get_user_borrowed_books(2) == {BOOK: 1}
+        assert lib.collection.get_count(BOOK) == 0
+        assert lib.statistics['holds_fulfilled'] == 1
+        assert len(lib.holds) == 0
+
+    def test_add_book_allocates_in_order(self):
+        lib = Library()
+        lib.place_hold(BOOK, 1, 2)
+        lib.place_hold(BOOK, 2, 1)
+
+        lib.collection.add_book(BOOK, 1)
+        # первая заявка ждет двух экземпляров, вторая не обгоняет ее
+        assert lib.get_user_borrowed_books(2) == {}
+        lib.collection.add_book(BOOK, 2)
+        assert lib.get_user_borrowed_books(1) == {BOOK: 2}
+        assert lib.get_user_borrowed_books(2) == {BOOK: 1}
+        assert lib.collection.get_count(BOOK) == 0
+
+    def test_returned_copy_reserved_for_queue(self):
+        lib = Library()
+        lib.collection.add_book(BOOK, 1)
+        lib.borrow_books(BOOK, 1)
+        lib.place_hold(BOOK, 2, 2)
+        lib.return_books(BOOK, 1)
+        # экземпляр на полке, но ждет заявку на два: сторонний читатель его не получит
+        assert lib.collection.get_count(BOOK) == 1 and not lib.is_book_available(BOOK)
+        result = lib.borrow_books(BOOK, 3)
+        assert result.status == OperationStatus.NOT_ENOUGH_COPIES and result.available == 0
+        lib.collection.add_book(BOOK, 2)
+        assert lib.get_user_borrowed_books(2) == {BOOK: 2}
+        assert lib.borrow_books(BOOK, 3).status == OperationStatus.BORROWED
+
+    def test_hold_on_available_book_is_fulfilled(self):
+        lib = Library()
+        lib.collection.add_book(BOOK, 3)
+        lib.place_hold(BOOK, 1)
+        assert lib.get_user_borrowed_books(1) == {BOOK: 1}
+
+    def test_active_borrowers_after_reborrow(self):
+        lib = Library()
+        lib.collection.add_book(BOOK, 1)
+        lib.borrow_books(BOOK, 1)
+        lib.return_books(BOOK, 1)
+        assert lib.statistics['active_borrowers'] == 0
+        lib.borrow_books(BOOK, 1)
+        assert lib.statistics['active_borrowers'] == 1
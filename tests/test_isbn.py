@@ -0,0 +1,117 @@
+import pytest # type: ignore
+from datetime import datetime
+from src.book_collection import Book, BookCollection, LibraryException
+from src.isbn_filter import ScalableCuckooFilter
+from src.library import Library
+from src.metadata import FakeMetadataServer, MetadataCache
+from src.results import OperationStatus
+from src.storage import SQLiteBookCollection
+from src.isbn import format_isbn13, is_valid_isbn, isbn_key, normalize_isbn, parse_isbn, to_isbn10
+
+ISBN13 = "978-0-306-40615-7"
+ISBN10 = "0-306-40615-2"
+KEY = 9780306406157
+
+
+class TestParsing:
+    def test_isbn13_and_isbn10_share_key(self):
+        assert parse_isbn(ISBN13) == parse_isbn("9780306406157") == parse_isbn(ISBN10) == KEY
+        assert parse_isbn("080442957x") == 9780804429573
+        assert parse_isbn("979 10 90636 07 1") == 9791090636071
+
+    def test_checksum_errors(self):
+        with pytest.raises(ValueError, match="ISBN-13 checksum"):
+            parse_isbn("978-0-306-40615-8")
+        with pytest.raises(ValueError, match="ISBN-10 checksum"):
+            parse_isbn("0-306-40615-3")
+        with pytest.raises(ValueError, match="Invalid ISBN"):
+            parse_isbn("123-45")
+        with pytest.raises(ValueError, match="Invalid ISBN"):
+            parse_isbn("1230306406157")
+        assert not is_valid_isbn(None)
+
+    def test_formatting(self):
+        assert format_isbn13(KEY) == "9780306406157"
+        assert to_isbn10(KEY) == "0306406152"
+        assert to_isbn10(9780804429573) == "080442957X"
+        with pytest.raises(ValueError, match="no ISBN-10"):
+            to_isbn10(9791090636071)
+        assert normalize_isbn(" 0-8044-2957-x ") == "080442957X"
+
+    def test_keys(self):
+        assert isbn_key("9780306406157") == isbn_key(ISBN10) == KEY
+        assert isbn_key("9780306406158") == "9780306406158"
+        assert isbn_key("111") == "111"
+
+
+class TestCollectionKeys:
+    def test_lookup_in_any_form(self):
+        collection = BookCollection()
+        book = Book("Title", "Author", 2001, "Fiction", ISBN13)
+        collection.add_book(book)
+        assert list(collection.index_dict.group_by_isbn) == [KEY]
+        assert collection["9780306406157"] is book
+        assert collection[ISBN10] is book
+        assert collection.index_dict.get_by_isbn("0306406152") is book
+
+    def test_same_isbn_in_other_form_conflicts(self):
+        collection = BookCollection()
+        collection.add_book(Book("Title", "Author", 2001, "Fiction", ISBN13))
+        with pytest.raises(LibraryException, match="ISBN conflict"):
+            collection.add_book(Book("Other", "Author", 2001, "Fiction", ISBN10))
+
+    @pytest.mark.parametrize("factory", [BookCollection, SQLiteBookCollection])
+    def test_operations_in_any_form(self, factory):
+        collection = factory()
+        book = Book("Title", "Author", 2001, "Fiction", "9780306406157")
+        other_form = Book("Title", "Author", 2001, "Fiction", ISBN10)
+        collection.add_book(book, 2)
+        assert collection.add_book(other_form).status == OperationStatus.INCREMENTED
+        assert collection.get_count(other_form) == 3 and other_form in collection
+        collection.enable_isbn_filter()
+        assert collection.get_count(Book("Title", "Author", 2001, "Fiction", ISBN13)) == 3
+        assert collection.delete_book(other_form, 3).status == OperationStatus.DELETED_ALL
+        assert len(collection) == 0 and book not in collection
+        assert collection.index_dict.get_by_author("Author") == []
+
+    def test_library_maps_in_any_form(self):
+        lib = Library()
+        book = Book("Title", "Author", 2001, "Fiction", "9780306406157")
+        other_form = Book("Title", "Author", 2001, "Fiction", ISBN10)
+        lib.collection.add_book(book)
+        history = lib.enable_history()
+        lib.borrow_books(other_form, 1)
+        lib.place_hold(book, 2)
+        assert lib.holds.waiting(ISBN13) == 1
+        lib.return_books(book, 1)
+        assert lib.borrowed_books == {book: {2: 1}}
+        assert history.as_of(datetime.now()).holders(ISBN10) == {2: 1}
+        assert lib.collection.facets.copies == {}
+        assert list(lib.recommender.item_ids) == [KEY]
+
+    def test_legacy_identifiers(self):
+        collection = BookCollection()
+        book = Book("Title", "Author", 2001, "Fiction", "local-17")
+        collection.add_book(book, 2)
+        assert collection["local-17"] is book
+        collection.delete_book(book, 2)
+        assert collection.index_dict.get_by_isbn("local-17") is None
+
+
+class TestOtherMaps:
+    def test_metadata_cache_one_entry_per_isbn(self):
+        book = Book("Title", "Author", 2001, "Fiction", ISBN13)
+        server = FakeMetadataServer([book])
+        cache = MetadataCache(server)
+        found = cache.get_many([ISBN10, "9780306406157", ISBN13])
+        assert found == {ISBN10: book, "9780306406157": book, ISBN13: book}
+        assert server.requested == [ISBN10] and cache.get("0306406152") is book
+        assert len(cache) == 1 and server.round_trips == 1
+
+    def test_filter_spreads_integer_keys(self):
+        isbn_filter = ScalableCuckooFilter(capacity=20000)
+        for i in range(20000):
+            isbn_filter.add(KEY + i)
+        false_positives = sum(isbn_filter.might_contain(KEY + 100000 + i) for i in range(20000))
+        assert len(isbn_filter.layers) == 1
+        assert false_positives / 20000 < 5 * isbn_filter.estimated_fpr() + 0.001
@@ -0,0 +1,78 @@
+from src.book_collection import Book, BookCollection
+from src.isbn_filter import CuckooFilter, ScalableCuckooFilter
+from src.library import Library
+from src.storage import SQLiteBookCollection
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+MISSING_BOOK = Book("Nope", "Nobody", 2000, "Drama", "000")
+
+
+class TestCuckooFilter:
+    def test_no_false_negatives(self):
+        isbn_filter = ScalableCuckooFilter(capacity=64)
+        keys = [f"isbn-{i}" for i in range(5000)]
+        for key in keys:
+            isbn_filter.add(key)
+        assert len(isbn_filter.layers) > 1
+        assert all(isbn_filter.might_contain(key) for key in keys)
+        assert len(isbn_filter) == 5000
+
+    def test_remove(self):
+        isbn_filter = ScalableCuckooFilter(capacity=64)
+        keys = [f"isbn-{i}" for i in range(1000)]
+        for key in keys:
+            isbn_filter.add(key)
+        for key in keys[::2]:
+            isbn_filter.remove(key)
+        assert len(isbn_filter) == 500
+        assert all(isbn_filter.might_contain(key) for key in keys[1::2])
+        assert sum(isbn_filter.might_contain(key) for key in keys[::2]) < 10
+
+    def test_false_positive_rate(self):
+        isbn_filter = ScalableCuckooFilter(capacity=20000)
+        for i in range(20000):
+            isbn_filter.add(f"isbn-{i}")
+        false_positives = sum(isbn_filter.might_contain(f"other-{i}") for i in range(20000))
+        assert false_positives / 20000 < 5 * isbn_filter.estimated_fpr() + 0.001
+        assert isbn_filter.stats()['negatives'] == 20000 - false_positives
+        assert isbn_filter.memory_bytes() == sum(layer.memory_bytes() for layer in isbn_filter.layers)
+
+    def test_full_layer_keeps_victim(self):
+        layer = CuckooFilter(capacity=4)
+        hashes = [i * 7919 << 32 | i for i in range(1, 40)]
+        added = [h for h in hashes if layer.add_hash(h)]
+        assert layer.full
+        assert all(layer.contains_hash(h) for h in added)
+        assert layer.remove_hash(added[0])
+        assert not layer.full
+        assert all(layer.contains_hash(h) for h in added[1:])
+
+
+class TestCollectionFilter:
+    def check(self, collection: BookCollection):
+        collection.add_book(BOOK1, 2)
+        isbn_filter = collection.enable_isbn_filter()
+        collection.add_book(BOOK2)
+        assert collection.get_count(MISSING_BOOK) == 0
+        assert MISSING_BOOK not in collection
+        assert isbn_filter.negatives + isbn_filter.false_positives >= 1
+        collection.delete_book(BOOK2)
+        assert not isbn_filter.might_contain("222")
+        assert collection.get_count(BOOK1) == 2 and BOOK1 in collection
+
+        lib = Library(collection=collection)
+        assert not lib.borrow_books(MISSING_BOOK, 1).ok
+        assert not lib.is_book_available(MISSING_BOOK)
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK1, 1, 2)
+            assert not isbn_filter.might_contain("111")
+            tx.rollback()
+        assert isbn_filter.might_contain("111")
+        assert lib.is_book_available(BOOK1, 2)
+
+    def test_memory_collection(self):
+        self.check(BookCollection())
+
+    def test_sqlite_collection(self):
+        self.check(SQLiteBookCollection())
@@ -0,0 +1,97 @@
+import pytest # type: ignore
+import threading
+from src.book_collection import Book, BookCollection, LibraryException
+from src.metadata import FakeMetadataServer, MetadataCache, intake
+
+BOOKS = [Book(f"Title{i}", f"Author{i}", 2000 + i, "Fiction", f"isbn-{i}") for i in range(10)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestMetadataCache:
+    def test_hits_and_negative_caching(self):
+        server = FakeMetadataServer(BOOKS)
+        cache = MetadataCache(server)
+        assert cache.get("isbn-1") == BOOKS[1]
+        assert cache.get("isbn-1") == BOOKS[1]
+        assert cache.get("unknown") is None
+        assert cache.get("unknown") is None
+        assert server.round_trips == 2
+        stats = cache.stats()
+        assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 2)
+        assert stats['hit_ratio'] == 0.5
+
+    def test_ttl_and_lru(self):
+        clock = FakeClock()
+        server = FakeMetadataServer(BOOKS)
+        cache = MetadataCache(server, maxsize=2, ttl=100, negative_ttl=10, clock=clock)
+        cache.get_many(["isbn-1", "missing"])
+        clock.now = 50
+        cache.get_many(["isbn-1", "missing"])
+        assert server.round_trips == 2  # отсутствие истекло раньше
+        assert cache.stats()['expired'] == 1
+        cache.get("isbn-2")
+        cache.get("isbn-3")
+        assert list(cache.entries) == ["isbn-2", "isbn-3"]
+        assert cache.stats()['evictions'] >= 1
+        clock.now = 1000
+        cache.get("isbn-3")
+        assert server.requested[-1] == "isbn-3"
+
+    def test_batching(self):
+        server = FakeMetadataServer(BOOKS, max_batch_size=4)
+        cache = MetadataCache(server, batch_size=4)
+        isbns = [book.isbn for book in BOOKS] + ["isbn-1", "missing"]
+        result = cache.get_many(isbns)
+        assert server.round_trips == 3
+        assert result["missing"] is None and result["isbn-9"] == BOOKS[9]
+        assert sorted(server.requested) == sorted(set(isbns))
+
+    def test_single_flight(self):
+        server = FakeMetadataServer(BOOKS, latency=0.2)
+        cache = MetadataCache(server)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("isbn-5"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [BOOKS[5]] * 5
+        assert server.round_trips == 1
+        assert cache.stats()['coalesced'] + cache.stats()['hits'] == 4
+
+    def test_errors_are_not_cached(self):
+        server = FakeMetadataServer(BOOKS)
+        server.fail_next = 1
+        cache = MetadataCache(server)
+        with pytest.raises(LibraryException, match="unavailable"):
+            cache.get("isbn-1")
+        assert cache.get("isbn-1") == BOOKS[1]
+        assert cache.stats()['errors'] == 1 and not cache._inflight
+
+
+class TestIntake:
+    def test_fetches_only_unknown_books(self):
+        collection = BookCollection()
+        collection.add_book(BOOKS[0], 1)
+        server = FakeMetadataServer(BOOKS[1:])
+        report = intake(collection, MetadataCache(server), [("isbn-0", 2), ("isbn-1", 1), ("isbn-2", 3), ("bad", 1)])
+        assert [result.count for result in report.added] == [2, 1, 3]
+        assert report.unknown == ["bad"]
+        assert server.round_trips == 1 and "isbn-0" not in server.requested
+        assert collection.get_count(BOOKS[0]) == 3 and collection.get_count(BOOKS[2]) == 3
+
+    def test_server_failure_is_reported(self):
+        collection = BookCollection()
+        collection.add_book(BOOKS[0], 1)
+        server = FakeMetadataServer(BOOKS)
+        server.fail_next = 1
+        report = intake(collection, MetadataCache(server), [("isbn-0", 1), ("isbn-1", 1)])
+        assert len(report.added) == 1
+        assert report.errors == [("isbn-1", "Metadata server unavailable")]
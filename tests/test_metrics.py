@@ -0,0 +1,83 @@
+import pytest # type: ignore
+from src.library import Library, Book
+from src.book_collection import LibraryException
+from src.metrics import Histogram, Metrics, BUCKET_BOUNDS_NS
+
+class TestHistogram:
+    def test_observe_bucketing(self):
+        hist = Histogram()
+        hist.observe(500)
+        hist.observe(1500)
+        hist.observe(10 ** 12)
+        assert hist.count == 3
+        assert hist.counts[0] == 1
+        assert hist.counts[1] == 1
+        assert hist.counts[-1] == 1
+
+    def test_bounds_are_log_linear(self):
+        assert BUCKET_BOUNDS_NS[:3] == (1000, 2000, 3000)
+        assert 10 ** 4 in BUCKET_BOUNDS_NS
+        assert list(BUCKET_BOUNDS_NS) == sorted(BUCKET_BOUNDS_NS)
+
+    def test_quantile(self):
+        hist = Histogram()
+        for _ in range(99):
+            hist.observe(1000)
+        hist.observe(5 * 10 ** 6)
+        assert hist.quantile(0.5) == pytest.approx(1e-6)
+        assert hist.quantile(1.0) == pytest.approx(5e-3)
+
+class TestLibraryMetrics:
+    def test_disabled_by_default(self):
+        lib = Library()
+        assert lib.metrics is None
+        assert 'borrow_books' not in lib.__dict__
+        assert lib.generate_report()['metrics'] == {}
+
+    def test_counts_calls_and_errors(self):
+        lib = Library()
+        metrics = lib.enable_metrics()
+        book = Book("Title", "Author", 2020, "Fiction", "12345")
+
+        lib.collection.add_book(book, 3)
+        lib.borrow_books(book, 1, 1)
+        with pytest.raises(LibraryException):
+            lib.borrow_books(book, 1, 0)
+
+        snapshot = metrics.snapshot()
+        assert snapshot['Library.borrow_books']['calls'] == 2
+        assert snapshot['Library.borrow_books']['errors'] == 1
+        assert snapshot['BookCollection.add_book']['calls'] == 1
+        assert snapshot['IndexDict.add_book']['calls'] == 1
+
+    def test_report_contains_snapshot(self):
+        lib = Library()
+        lib.enable_metrics()
+        lib.get_available_books()
+        report = lib.generate_report()
+        assert report['metrics']['Library.get_available_books']['calls'] == 1
+
+    def test_disable_removes_wrappers(self):
+        lib = Library()
+        lib.enable_metrics()
+        assert 'borrow_books' in lib.__dict__
+        lib.disable_metrics()
+        assert 'borrow_books' not in lib.__dict__
+        assert 'add_book' not in lib.collection.__dict__
+        assert 'get_by_author' not in lib.collection.index_dict.__dict__
+        assert lib.metrics is None
+
+    def test_prometheus_export(self):
+        lib = Library()
+        lib.enable_metrics()
+        lib.is_book_available(Book("Title", "Author", 2020, "Fiction", "12345"))
+        text = lib.metrics.to_prometheus()
+        assert '# TYPE library_operation_duration_seconds histogram' in text
+        assert 'library_operation_calls_total{component="Library",operation="is_book_available"} 1' in text
+        assert 'le="+Inf"' in text
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.stats("Library", "borrow_books").calls += 1
+        metrics.reset()
+        assert metrics.snapshot() == {}
@@ -0,0 +1,146 @@
+import io
+import pytest # type: ignore
+from src.book_collection import Book, BookCollection
+from src.library import Library
+from datetime import datetime, timedelta
+from src.pagination import SortedKeys, iter_paged, sorted_keys_page
+from src.storage import SQLiteBookCollection
+
+
+def make_book(i: int) -> Book:
+    return Book(f"Title{i}", f"Author{i % 3}", 2000 + i, "Fiction", f"isbn-{i:03d}")
+
+
+def fill(collection: BookCollection, count: int) -> list[Book]:
+    books = [make_book(i) for i in range(count)]
+    for i, book in enumerate(books):
+        collection.add_book(book, i + 1)
+    return books
+
+
+class TestCollectionPages:
+    @pytest.mark.parametrize("factory", [BookCollection, SQLiteBookCollection])
+    def test_pages_cover_collection(self, factory):
+        collection = factory()
+        fill(collection, 10)
+        pages = list(collection.iter_pages(size=4))
+        assert [len(page) for page in pages] == [4, 4, 2]
+        assert [item for page in pages for item in page] == collection.get_all_books_with_counts()
+        assert not pages[-1].has_more
+
+    @pytest.mark.parametrize("factory", [BookCollection, SQLiteBookCollection])
+    def test_stable_under_inserts_and_deletes(self, factory):
+        collection = factory()
+        books = fill(collection, 10)
+        first = collection.page(size=4)
+        collection.add_book(make_book(10))
+        collection.delete_book(books[1], 2)   # удаление уже выданной книги сдвигает позиции
+        second = collection.page(first.cursor, 3)
+        collection.delete_book(books[6], 7)   # удалена последняя выданная книга
+        rest = list(iter_paged(lambda cursor: collection.page(cursor, 3), second.cursor))
+        seen = [book for book, _ in first] + [book for book, _ in second] + [book for book, _ in rest]
+        assert seen == books + [make_book(10)]
+
+    @pytest.mark.parametrize("factory", [BookCollection, SQLiteBookCollection])
+    def test_many_deletions_left_of_cursor(self, factory):
+        collection = factory()
+        books = fill(collection, 10)
+        first = collection.page(size=5)
+        for i in (0, 2, 4):
+            collection.delete_book(books[i], i + 1)
+        rest = [book for book, _ in iter_paged(lambda cursor: collection.page(cursor, 2), first.cursor)]
+        assert rest == books[5:]
+
+    def test_rollback_restores_position(self):
+        lib = Library()
+        books = fill(lib.collection, 6)
+        first = lib.collection.page(size=3)
+        with lib.transaction() as tx:
+            lib.collection.delete_book(books[2], 3)
+            lib.collection.delete_book(books[4], 5)
+            tx.rollback()
+        assert [book for book, _ in lib.collection.page(first.cursor)] == books[3:]
+        assert list(lib.collection.positions) == [1, 2, 3, 4, 5, 6]
+
+    def test_cursor_resumes_after_new_books(self):
+        collection = BookCollection()
+        fill(collection, 3)
+        page = collection.page(size=10)
+        assert not page.has_more
+        collection.add_book(make_book(3))
+        assert [book for book, _ in collection.page(page.cursor)] == [make_book(3)]
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError, match="Page size"):
+            BookCollection().page(size=0)
+
+
+class TestIndexAndBorrowerPages:
+    def test_index_postings(self):
+        collection = BookCollection()
+        books = fill(collection, 9)
+        index = collection.index_dict.group_by_author
+        first = index.page("Author0", size=2)
+        assert first.items == [books[0], books[3]] and first.has_more
+        assert index.page("Author0", first.cursor, size=2).items == [books[6]]
+        assert index.page("Nobody").items == []
+
+    def test_borrowers_by_user_id(self):
+        lib = Library()
+        lib.collection.add_book(make_book(0), 10)
+        for user_id in (5, 1, 9, 3, 7):
+            lib.borrow_books(make_book(0), user_id)
+        first = lib.page_borrowers(size=2)
+        assert [info.user_id for info in first] == [1, 3]
+        lib.borrow_books(make_book(0), 2)
+        rest = list(iter_paged(lambda cursor: lib.page_borrowers(cursor, 2), first.cursor))
+        assert [info.user_id for info in rest] == [5, 7, 9]
+
+    def test_borrower_ids_maintained(self):
+        lib = Library()
+        lib.enable_borrower_tiering(idle_period=timedelta(0))
+        lib.collection.add_book(make_book(0), 10)
+        for user_id in (5, 1, 9, 3):
+            lib.borrow_books(make_book(0), user_id)
+        lib.return_books(make_book(0), 3)
+        assert lib.evict_idle_borrowers(datetime.now() + timedelta(seconds=1)) == 1
+        with lib.transaction() as tx:
+            lib.borrow_books(make_book(0), 2)
+            tx.rollback()
+        assert lib.borrower_ids.keys == [1, 5, 9]
+        lib.get_borrower_info(3)
+        assert [info.user_id for info in lib.page_borrowers(1, 2)] == [3, 5]
+
+    def test_sorted_keys(self):
+        keys = SortedKeys([5, 1, 3])
+        keys.add(4)
+        keys.add(3)
+        keys.discard(1)
+        keys.discard(2)
+        assert keys.keys == [3, 4, 5] and 4 in keys and 1 not in keys
+        page = keys.page(3, 1)
+        assert page.items == [4] and page.cursor == 4 and page.has_more
+        assert not keys.page(4, 1).has_more and keys.page(5, 1).items == []
+
+    def test_sorted_keys_page(self):
+        page = sorted_keys_page(range(100, 0, -1), 95, 10)
+        assert page.items == [96, 97, 98, 99, 100] and not page.has_more
+
+    def test_available_books(self):
+        lib = Library()
+        books = fill(lib.collection, 5)
+        lib.borrow_books(books[0], 1)
+        assert list(lib.iter_available_books(page_size=2)) == lib.get_available_books() == books[1:]
+
+
+class TestStreamingRepr:
+    def test_matches_repr(self):
+        collection = BookCollection("Main")
+        fill(collection, 5)
+        out = io.StringIO()
+        collection.write_repr(out, page_size=2)
+        assert out.getvalue() == repr(collection)
+        lines = repr(collection).split("\n")
+        assert lines[0] == "Collection 'Main' Info:" and len(lines) == 6
+        assert lines[1] == "\tTitle: Title0, Author: Author0, ISBN: isbn-000, Available: 1 items"
+        assert repr(BookCollection()) == "Collection Info:"
@@ -0,0 +1,60 @@
+import pytest # type: ignore
+from src.book_collection import Book, BookCollection, LibraryException
+from src.parallel_import import (normalize_record, normalize_isbn, normalize_text,
+                                 prevalidate, parallel_import)
+
+RECORDS = [
+    {"title": "  Война  и мир ", "author": "Лев Толстой", "year": "1869", "genre": "Роман", "isbn": "978-5-17-1", "count": "2"},
+    {"title": None, "author": "Антон Чехов", "year": 1904, "genre": "Рассказы", "isbn": "1"},
+    {"title": "Идиот", "author": "Фёдор Достоевский", "year": 1869, "genre": "Роман", "isbn": "2"},
+    {"title": "Бесы", "author": "Фёдор Достоевский", "year": "abc", "genre": "Роман", "isbn": "3"},
+    {"title": "Другая книга", "author": "Автор", "year": 2000, "genre": "Роман", "isbn": "2"},
+    "not a record",
+]
+
+class TestNormalization:
+    def test_normalize_text(self):
+        assert normalize_text("  a   b ") == "a b"
+        assert normalize_text("   ") is None
+        assert normalize_text(None) is None
+
+    def test_normalize_isbn(self):
+        assert normalize_isbn("978-5 17-x") == "978517X"
+
+    def test_normalize_record(self):
+        book, count = normalize_record(RECORDS[0])
+        assert book == Book("Война и мир", "Лев Толстой", 1869, "Роман", "978517" + "1")
+        assert count == 2
+
+    def test_invalid_count(self):
+        with pytest.raises(LibraryException, match="Count must be positive"):
+            normalize_record({"title": "T", "author": "A", "year": 1, "genre": "G", "isbn": "1", "count": 0})
+
+    def test_validation_needs_no_collection(self):
+        # рабочие процессы проверяют записи без создания коллекции
+        with pytest.raises(LibraryException, match="Year must be an integer"):
+            BookCollection.validate_book(Book("T", "A", "1", "G", "1"))
+
+class TestParallelImport:
+    def test_prevalidate_preserves_order(self):
+        batches = list(prevalidate(RECORDS, workers=0, shard_size=2))
+        assert [batch.start for batch in batches] == [0, 2, 4]
+        assert batches[0].positions == [0]
+        assert batches[0].errors[0][0] == 1
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_import_deterministic_errors(self, workers):
+        collection = BookCollection()
+        report = parallel_import(collection, RECORDS, workers=workers, shard_size=2)
+        assert report.rows == 6
+        assert report.imported == 2
+        assert [position for position, _ in report.errors] == [1, 3, 4, 5]
+        assert "ISBN conflict" in report.errors[2][1]
+        assert collection.total_count() == 3
+
+    def test_add_prevalidated(self):
+        collection = BookCollection()
+        book = Book("Title", "Author", 2020, "Fiction", "1")
+        errors = collection.add_prevalidated([(book, 1), (Book("X", "Y", 1, "Z", "1"), 1), (book, 2)])
+        assert errors[0][0] == 1
+        assert collection.get_count(book) == 3
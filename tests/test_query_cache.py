@@ -0,0 +1,39 @@
+import pytest # type: ignore
+from src.query_cache import QueryCache, MISSING
+
+class TestQueryCache:
+    def test_hit_and_miss(self):
+        cache = QueryCache(4)
+        assert cache.get("a", (0,)) is MISSING
+        cache.put("a", (0,), [1])
+        assert cache.get("a", (0,)) == [1]
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_ratio'] == 0.5
+
+    def test_stale_generation_is_miss(self):
+        cache = QueryCache(4)
+        cache.put("a", (0, 1), [1])
+        assert cache.get("a", (0, 2)) is MISSING
+        assert cache.stats()['invalidations'] == 1
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = QueryCache(2)
+        cache.put("a", (), 1)
+        cache.put("b", (), 2)
+        cache.get("a", ())
+        cache.put("c", (), 3)
+        assert cache.get("b", ()) is MISSING
+        assert cache.get("a", ()) == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_zero_size_disables_cache(self):
+        cache = QueryCache(0)
+        cache.put("a", (), 1)
+        assert cache.get("a", ()) is MISSING
+
+    def test_negative_size(self):
+        with pytest.raises(ValueError):
+            QueryCache(-1)
@@ -0,0 +1,62 @@
+import pytest # type: ignore
+from src.book_collection import Book
+from src.library import Library
+from src.recommendations import CoBorrowRecommender
+
+BOOKS = [Book(f"Title{i}", "Author", 2000 + i, "Fiction", str(i)) for i in range(4)]
+
+class TestCoBorrowRecommender:
+    def test_incremental_recommendations(self):
+        rec = CoBorrowRecommender()
+        rec.record(1, BOOKS[0])
+        rec.record(1, BOOKS[1])
+        rec.record(2, BOOKS[0])
+        rec.record(2, BOOKS[1])
+        rec.record(3, BOOKS[0])
+        rec.record(3, BOOKS[2])
+
+        result = rec.recommend(BOOKS[0])
+        assert [book for book, _ in result] == [BOOKS[1], BOOKS[2]]
+        assert result[0][1] == pytest.approx(2 / (3 * 2) ** 0.5)
+        assert rec.recommend(BOOKS[3]) == []
+
+    def test_repeat_borrow_not_counted(self):
+        rec = CoBorrowRecommender()
+        rec.record(1, BOOKS[0])
+        rec.record(1, BOOKS[1])
+        rec.record(1, BOOKS[1])
+        assert rec.recommend(BOOKS[0]) == [(BOOKS[1], pytest.approx(1.0))]
+
+    def test_rebuild_matches_incremental(self):
+        rec = CoBorrowRecommender()
+        for user_id, indexes in {1: (0, 1, 2), 2: (1, 2), 3: (2, 3)}.items():
+            for i in indexes:
+                rec.record(user_id, BOOKS[i])
+        before = {book.isbn: rec.recommend(book) for book in BOOKS}
+        rec.rebuild()
+        assert rec.delta == {}
+        assert {book.isbn: rec.recommend(book) for book in BOOKS} == before
+
+        rec.record(4, BOOKS[3])
+        rec.record(4, BOOKS[0])
+        assert BOOKS[3] in [book for book, _ in rec.recommend(BOOKS[0])]
+
+    def test_memory_is_compact(self):
+        rec = CoBorrowRecommender()
+        rec.rebuild([(1, BOOKS), (2, BOOKS[:2])])
+        assert rec.memory_bytes() == 8 * 5 + 4 * 12 + 4 * 12 + 4 * 4
+
+class TestLibraryRecommendations:
+    def test_recommend_after_returns(self):
+        lib = Library()
+        for book in BOOKS:
+            lib.collection.add_book(book, 5)
+        lib.borrow_books(BOOKS[0], 1)
+        lib.borrow_books(BOOKS[1], 1)
+        lib.return_books(BOOKS[0], 1)
+        lib.return_books(BOOKS[1], 1)
+        lib.borrow_books(BOOKS[0], 2)
+
+        assert lib.recommend_books(BOOKS[0]) == [(BOOKS[1], pytest.approx(1 / 2 ** 0.5))]
+        lib.rebuild_recommendations()
+        assert lib.recommend_books(BOOKS[1]) == [(BOOKS[0], pytest.approx(1 / 2 ** 0.5))]
@@ -0,0 +1,169 @@
+import pytest # type: ignore
+from src.book_collection import Book, LibraryException
+from src.change_feed import ChangeFeed
+from src.library import Library
+from src.replication import Replicator, StateHashes, apply_changes, diff, state_hashes
+from src.storage import SQLiteBookCollection
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+BOOK2_NEW = Book("Title2 (2nd ed.)", "Author2", 2012, "Drama", "222")
+BOOK3 = Book("Title3", "Author3", 2003, "Poetry", "333")
+
+
+def primary_with_feed(maxlen=None) -> Library:
+    lib = Library("Primary")
+    lib.enable_change_feed(maxlen)
+    return lib
+
+
+class TestChangeFeed:
+    def test_only_top_level_operations(self):
+        lib = primary_with_feed()
+        lib.collection.add_book(BOOK1, 1)
+        lib.borrow_books(BOOK1, 1)
+        lib.place_hold(BOOK1, 2)
+        lib.return_books(BOOK1, 1)  # возврат сразу выдается по заявке
+        assert [(c.seq, c.target, c.op) for c in lib.feed.entries] == [
+            (1, 'collection', 'add_book'),
+            (2, 'library', 'borrow_books'),
+            (3, 'library', 'place_hold'),
+            (4, 'library', 'return_books'),
+        ]
+
+    def test_failed_operations_not_recorded(self):
+        lib = primary_with_feed()
+        lib.borrow_books(BOOK1, 1)
+        lib.collection.delete_book(BOOK1)
+        with pytest.raises(LibraryException):
+            lib.collection.add_book(BOOK1, 0)
+        assert len(lib.feed) == 0
+
+    def test_rollback_retracts_changes(self):
+        lib = primary_with_feed()
+        lib.collection.add_book(BOOK1, 2)
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK1, 1)
+            tx.rollback()
+        lib.borrow_books(BOOK1, 2)
+        assert [(c.seq, c.op) for c in lib.feed.entries] == [(1, 'add_book'), (3, 'borrow_books')]
+
+    def test_since_and_trimming(self):
+        feed = ChangeFeed(maxlen=2)
+        for i in range(5):
+            feed.append('collection', 'add_book', (i,), {})
+        assert [c.seq for c in feed.since(3)] == [4, 5]
+        assert feed.since(1) is None
+        assert feed.last_seq == 5
+
+    def test_iterator_arguments_are_materialized(self):
+        lib = primary_with_feed()
+        lib.collection.add_prevalidated((book, 1) for book in (BOOK1, BOOK2))
+        assert lib.feed.entries[0].args == ([(BOOK1, 1), (BOOK2, 1)],)
+
+
+class TestReplication:
+    def test_replica_catches_up(self):
+        primary = primary_with_feed()
+        replica = Library("Replica")
+        replicator = Replicator(primary, replica)
+        primary.collection.add_book(BOOK1, 2)
+        primary.collection.add_book(BOOK2, 1)
+        primary.borrow_books(BOOK1, 1, 2)
+        primary.place_hold(BOOK1, 2)
+        assert replicator.lag == 4
+        assert replicator.sync() == 4
+        primary.return_books(BOOK1, 1)
+        primary.collection.update_book(BOOK2, BOOK2_NEW)
+        primary.cancel_hold(primary.place_hold(BOOK1, 7).hold_id)
+        assert replicator.sync() == 4
+        assert replicator.sync() == 0
+        assert not diff(primary, replica)
+        assert replica.borrowed_books == {BOOK1: {1: 1, 2: 1}}
+        assert replica.statistics == primary.statistics
+
+    def test_setitem_replicated(self):
+        primary = primary_with_feed()
+        replica = Library("Replica")
+        primary.collection.add_book(BOOK1, 2)
+        primary.collection[0] = BOOK3
+        assert Replicator(primary, replica).sync() == 2
+        assert replica.collection.get_all_books_with_counts() == [(BOOK3, 2)]
+        assert not diff(primary, replica)
+
+    def test_replica_too_far_behind(self):
+        primary = primary_with_feed(maxlen=1)
+        replicator = Replicator(primary, Library())
+        for _ in range(3):
+            primary.collection.add_book(BOOK1)
+        with pytest.raises(LibraryException, match="full resync"):
+            replicator.sync()
+
+    def test_feed_required(self):
+        with pytest.raises(LibraryException, match="not enabled"):
+            Replicator(Library(), Library())
+
+    def test_apply_changes_returns_last_seq(self):
+        primary = primary_with_feed()
+        primary.collection.add_book(BOOK1)
+        assert apply_changes(Library(), primary.feed.since(0)) == 1
+
+
+class TestDiff:
+    def test_identical_libraries(self):
+        a, b = Library(), Library()
+        for lib in (a, b):
+            lib.collection.add_book(BOOK1, 2)
+            lib.collection.add_book(BOOK2, 1)
+            lib.borrow_books(BOOK1, 1)
+        # порядок книг не влияет на хеши
+        b.collection.delete_book(BOOK2)
+        b.collection.add_book(BOOK2)
+        assert state_hashes(a) == state_hashes(b)
+        assert not diff(a, b)
+
+    def test_divergence_is_localized(self):
+        a, b = Library(), Library()
+        for lib in (a, b):
+            lib.collection.add_book(BOOK1, 2)
+            lib.collection.add_book(BOOK3, 1)
+        a.borrow_books(BOOK1, 5)
+        b.collection.update_book(BOOK3, Book("Other", "Author3", 2003, "Poetry", "333"))
+        result = diff(a, b, buckets=16)
+        assert len(result.buckets) <= 2
+        assert ('loan', '111', 5, 1) in result.only_left
+        assert ('book', 'Title1', 'Author1', 2001, 'Fiction', '111', 2) in result.only_right
+        assert ('book', 'Other', 'Author3', 2003, 'Poetry', '333', 1) in result.only_right
+
+
+class TestStateHashes:
+    @pytest.mark.parametrize("factory", [lambda: None, SQLiteBookCollection])
+    def test_maintained_on_writes(self, factory):
+        lib = Library(collection=factory())
+        lib.collection.add_book(BOOK1, 3)
+        hashes = lib.enable_state_hashes(buckets=16)
+        lib.collection.add_book(BOOK2, 2)
+        lib.borrow_books(BOOK1, 1, 2)
+        lib.collection.update_book(BOOK2, BOOK2_NEW)
+        with lib.transaction() as tx:
+            lib.return_books(BOOK1, 1)
+            lib.collection.delete_book(BOOK2_NEW, 2)
+            lib.collection[0] = BOOK3
+            tx.rollback()
+        lib.place_hold(BOOK1, 4, 2)
+        lib.return_books(BOOK1, 1, 2)
+        lib.collection[1] = BOOK3
+        assert hashes.hashes == StateHashes(lib, 16).hashes
+        assert state_hashes(lib, 16) == hashes.hashes
+
+    def test_diff_uses_maintained_hashes(self, monkeypatch):
+        a, b = Library(), Library()
+        for lib in (a, b):
+            lib.collection.add_book(BOOK1, 2)
+            lib.enable_state_hashes()
+            lib.borrow_books(BOOK1, 1)
+        monkeypatch.setattr("src.replication.StateHashes", None)  # пересчет проходом не нужен
+        assert not diff(a, b)
+        b.borrow_books(BOOK1, 2)
+        monkeypatch.undo()
+        assert ('loan', '111', 2, 1) in diff(a, b).only_right
@@ -0,0 +1,58 @@
+from src.book_collection import Book, BookCollection
+from src.library import Library
+from src.results import OperationResult, OperationStatus
+from src.constants import COLORS
+
+class TestOperationResult:
+    def test_render_is_lazy_and_colored(self):
+        book = Book("Title", "Author", 2020, "Fiction", "12345")
+        result = OperationResult(OperationStatus.ADDED, book, 2, 2, collection_name="Test")
+        text = str(result)
+        assert text.startswith(COLORS.GREEN)
+        assert text.endswith(COLORS.RESET)
+        assert "Book 'Title' added to collection 'Test', number of items: 2" in text
+        assert "added to collection" in result
+
+    def test_collection_statuses(self):
+        collection = BookCollection("Test")
+        book = Book("Title", "Author", 2020, "Fiction", "12345")
+
+        assert collection.add_book(book, 2).status is OperationStatus.ADDED
+        result = collection.add_book(book, 3)
+        assert result.status is OperationStatus.INCREMENTED
+        assert result.available == 5
+
+        result = collection.delete_book(book, 1)
+        assert result.status is OperationStatus.DELETED
+        assert result.available == 4
+
+        result = collection.delete_book(book, 10)
+        assert result.status is OperationStatus.DELETED_CAPPED
+        assert result.affected == 4
+        assert result.ok
+
+        result = collection.delete_book(book, 1)
+        assert result.status is OperationStatus.NOT_FOUND
+        assert not result.ok
+        assert result.affected == 0
+
+    def test_library_statuses(self):
+        lib = Library()
+        book = Book("Title", "Author", 2020, "Fiction", "12345")
+
+        assert lib.borrow_books(book, 1).status is OperationStatus.NOT_AVAILABLE
+        lib.collection.add_book(book, 2)
+        result = lib.borrow_books(book, 1, 5)
+        assert result.status is OperationStatus.NOT_ENOUGH_COPIES
+        assert result.available == 2
+        assert result.count == 5
+
+        result = lib.borrow_books(book, 1, 2)
+        assert result.status is OperationStatus.BORROWED
+        assert result.user_id == 1
+
+        assert lib.return_books(book, 2).status is OperationStatus.NOT_BORROWED
+        assert lib.return_books(book, 1, 3).status is OperationStatus.RETURN_EXCEEDS
+        result = lib.return_books(book, 1, 1)
+        assert result.status is OperationStatus.RETURNED
+        assert result.available == 1
@@ -0,0 +1,126 @@
+import pytest # type: ignore
+from collections import Counter
+from src.book_collection import Book, LibraryException
+from src.library import Library
+from src.sketches import CountMinSketch, HeavyHitters, HyperLogLog, StreamingStats, stable_hash
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+
+
+class TestHyperLogLog:
+    def test_estimate_within_error(self):
+        sketch = HyperLogLog(precision=12)
+        for user_id in range(50_000):
+            sketch.add(user_id)
+            sketch.add(user_id)
+        assert abs(sketch.estimate() - 50_000) / 50_000 < 0.05
+        assert sketch.memory_bytes() == 4096
+
+    def test_small_cardinality_is_exact_enough(self):
+        sketch = HyperLogLog()
+        for user_id in range(100):
+            sketch.add(user_id)
+        assert abs(len(sketch) - 100) <= 2
+
+    def test_merge_equals_union(self):
+        left, right, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+        for user_id in range(0, 3000):
+            left.add(user_id)
+            union.add(user_id)
+        for user_id in range(2000, 6000):
+            right.add(user_id)
+            union.add(user_id)
+        left.merge(right)
+        assert left.registers == union.registers
+        with pytest.raises(LibraryException, match="different precision"):
+            left.merge(HyperLogLog(11))
+
+    def test_stable_hash(self):
+        assert stable_hash("111") == stable_hash("111") != stable_hash("112")
+
+
+class TestCountMinSketch:
+    def test_never_underestimates(self):
+        sketch = CountMinSketch(width=64, depth=4)
+        exact = Counter()
+        for i in range(5000):
+            key = f"isbn-{i * i % 300}"
+            sketch.add(key)
+            exact[key] += 1
+        assert all(sketch.estimate(key) >= count for key, count in exact.items())
+        assert sketch.total == 5000
+
+    def test_merge(self):
+        left, right = CountMinSketch(128, 3), CountMinSketch(128, 3)
+        left.add("a", 5)
+        right.add("a", 2)
+        right.add("b")
+        left.merge(right)
+        assert left.estimate("a") >= 7 and left.estimate("b") >= 1
+        assert left.total == 8
+        with pytest.raises(LibraryException, match="different dimensions"):
+            left.merge(CountMinSketch(64, 3))
+
+
+class TestHeavyHitters:
+    def test_top_keys(self):
+        hitters = HeavyHitters(k=3, width=256)
+        for i in range(3000):
+            hitters.add(f"cold-{i}")
+        for key, times in (("hot-a", 500), ("hot-b", 300), ("hot-c", 200)):
+            for _ in range(times):
+                hitters.add(key)
+        assert [key for key, _ in hitters.top()] == ["hot-a", "hot-b", "hot-c"]
+        assert len(hitters.candidates) == 3
+
+    def test_merge_keeps_global_top(self):
+        left, right = HeavyHitters(k=2), HeavyHitters(k=2)
+        left.add("a", 10)
+        left.add("b", 8)
+        right.add("c", 9)
+        right.add("b", 5)
+        left.merge(right)
+        assert left.top() == [("b", 13), ("a", 10)]
+
+
+class TestLibraryStreamingStats:
+    def test_borrows_are_counted(self):
+        lib = Library()
+        lib.collection.add_book(BOOK1, 100)
+        lib.collection.add_book(BOOK2, 100)
+        stats = lib.enable_streaming_stats(precision=10, k=5)
+        assert lib.enable_streaming_stats() is stats
+        for user_id in range(30):
+            lib.borrow_books(BOOK1, user_id)
+        for user_id in range(20, 25):
+            lib.borrow_books(BOOK2, user_id, 2)
+        assert stats.unique_borrowers() == 30
+        assert stats.unique_borrowers("Drama") == 5
+        assert stats.unique_borrowers("Poetry") == 0
+        assert stats.hot_books() == [("111", 30), ("222", 10)]
+        assert stats.borrow_count("222") == 10
+
+    def test_rollback_reverts_frequencies(self):
+        lib = Library()
+        lib.collection.add_book(BOOK1, 5)
+        stats = lib.enable_streaming_stats()
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK1, 1, 3)
+            tx.rollback()
+        assert stats.borrow_count("111") == 0
+
+    def test_merge_across_libraries(self):
+        branches = [Library("A"), Library("B")]
+        for offset, lib in enumerate(branches):
+            lib.collection.add_book(BOOK1, 100)
+            lib.enable_streaming_stats()
+            for user_id in range(offset * 10, offset * 10 + 20):
+                lib.borrow_books(BOOK1, user_id)
+        total = StreamingStats()
+        for lib in branches:
+            total.merge(lib.stream_stats) # type: ignore
+        assert total.unique_borrowers() == 30
+        assert total.unique_borrowers("Fiction") == 30
+        assert total.hot_books() == [("111", 40)]
+        assert total.memory_bytes() == 2 * (1 << 14) + 8 * 2048 * 5
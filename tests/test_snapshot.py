@@ -0,0 +1,109 @@
+import gc
+from datetime import datetime, timedelta
+from src.book_collection import Book
+from src.library import Library
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+BOOK3 = Book("Title3", "Author1", 2003, "Fiction", "333")
+
+
+def make_library() -> Library:
+    lib = Library("Snap")
+    lib.collection.add_book(BOOK1, 3)
+    lib.collection.add_book(BOOK2, 2)
+    lib.borrow_books(BOOK1, 1)
+    return lib
+
+
+class TestLibrarySnapshot:
+    def test_snapshot_matches_library(self):
+        lib = make_library()
+        snap = lib.snapshot()
+        report = snap.generate_report()
+        expected = lib.generate_report()
+        del expected['metrics']
+        assert {key: value for key, value in report.items() if key != 'taken_at'} == expected
+        assert snap.get_most_borrowed_books() == lib.get_most_borrowed_books()
+        assert snap.get_top_borrowers() == lib.get_top_borrowers()
+        assert snap.get_popular_books() == lib.get_popular_books()
+
+    def test_snapshot_is_isolated_from_writes(self):
+        lib = make_library()
+        snap = lib.snapshot()
+        lib.borrow_books(BOOK1, 1)
+        lib.borrow_books(BOOK2, 2, 2)
+        lib.return_books(BOOK1, 1)
+        lib.collection.add_book(BOOK3)
+        lib.collection.delete_book(BOOK2, 10)
+        assert snap.get_all_books_with_counts() == [(BOOK1, 2), (BOOK2, 2)]
+        assert snap.borrowed_books == {BOOK1: {1: 1}}
+        assert snap.borrowers[1].borrowed_books == {BOOK1: 1}
+        assert snap.borrowers[1].total_returned == 0
+        assert 2 not in snap.borrowers
+        assert snap.statistics['total_borrowed'] == 1
+        assert snap.get_count(BOOK2) == 2
+        # библиотека видит свои изменения
+        assert lib.borrowed_books[BOOK1] == {1: 1}
+        assert lib.borrowers[1].total_returned == 1
+        assert lib.collection.get_count(BOOK3) == 1
+
+    def test_several_snapshots(self):
+        lib = make_library()
+        first = lib.snapshot()
+        lib.borrow_books(BOOK1, 1)
+        second = lib.snapshot()
+        lib.borrow_books(BOOK1, 1)
+        assert first.borrowed_books[BOOK1] == {1: 1}
+        assert second.borrowed_books[BOOK1] == {1: 2}
+        assert lib.borrowed_books[BOOK1] == {1: 3}
+        assert (first.get_count(BOOK1), second.get_count(BOOK1), lib.collection.get_count(BOOK1)) == (2, 1, 0)
+
+    def test_no_copies_after_snapshot_released(self):
+        lib = make_library()
+        snap = lib.snapshot()
+        del snap
+        gc.collect()
+        borrowed = lib.borrowed_books
+        lib.borrow_books(BOOK1, 1)
+        assert lib.borrowed_books is borrowed
+        assert lib._layer is None
+
+    def test_writes_copy_only_touched_entries(self):
+        lib = make_library()
+        lib.borrow_books(BOOK2, 2)
+        borrowed, borrowers = lib.borrowed_books, lib.borrowers
+        snap = lib.snapshot()
+        held = snap.borrowed_books[BOOK1]
+        lib.borrow_books(BOOK1, 3)
+        # словари целиком не копируются, сохраняются только измененные записи
+        assert lib.borrowed_books is borrowed and lib.borrowers is borrowers
+        assert lib._layer.books.keys() == {BOOK1} and lib._layer.users.keys() == {3} # type: ignore
+        assert held == {1: 1} and snap.borrowed_books[BOOK1] is held
+        assert snap.borrowed_books[BOOK2] is lib.borrowed_books[BOOK2]
+        assert sorted(snap.borrowers) == [1, 2] and len(snap.borrowers) == 2
+
+    def test_snapshot_with_borrower_tiering(self):
+        lib = make_library()
+        lib.enable_borrower_tiering()
+        lib.return_books(BOOK1, 1)
+        snap = lib.snapshot()
+        assert lib.evict_idle_borrowers(datetime.now() + timedelta(days=365)) == 1
+        assert 1 not in lib.borrowers and snap.borrowers[1].total_returned == 1
+        lib.borrow_books(BOOK2, 1)
+        assert lib.borrowers[1].borrowed_books == {BOOK2: 1}
+        assert snap.borrowers[1].borrowed_books == {} and BOOK2 not in snap.borrowed_books
+
+    def test_snapshot_with_transaction_rollback(self):
+        lib = make_library()
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK2, 5)
+            snap = lib.snapshot()
+            tx.rollback()
+        assert snap.borrowed_books[BOOK2] == {5: 1}
+        assert BOOK2 not in lib.borrowed_books
+        assert snap.get_count(BOOK2) == 1
+        assert lib.collection.get_count(BOOK2) == 2
+
+    def test_repr(self):
+        assert "Snapshot of library 'Snap'" in repr(make_library().snapshot())
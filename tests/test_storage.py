@@ -0,0 +1,180 @@
+import pytest # type: ignore
+from src.book_collection import Book, BookCollection, LibraryException
+from src.library import Library
+from src.storage import SQLiteBookCollection
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 1995, "Drama", "222")
+BOOK3 = Book("Title3", "Author1", 2003, "Fiction", "333")
+BOOK2_NEW = Book("Title2 (2nd ed.)", "Author2", 2012, "Drama", "222")
+
+
+def scenario(collection: BookCollection) -> list:
+    results = [
+        collection.add_book(BOOK1, 3),
+        collection.add_book(BOOK2, 2),
+        collection.add_book(BOOK3),
+        collection.add_book(BOOK1, 2),
+        collection.delete_book(BOOK2, 1),
+        collection.delete_book(BOOK3, 5),
+        collection.delete_book(BOOK3),
+        collection.update_book(BOOK2, BOOK2_NEW),
+        collection.add_book(BOOK3, 4),
+    ]
+    return [(result.status, result.count, result.available) for result in results]
+
+
+class TestSQLiteBookCollection:
+    def test_same_results_as_memory(self):
+        memory, sqlite = BookCollection(), SQLiteBookCollection()
+        assert scenario(sqlite) == scenario(memory)
+        assert sqlite.get_all_books_with_counts() == memory.get_all_books_with_counts()
+        assert sqlite.total_count() == memory.total_count() == 10
+        assert len(sqlite) == len(memory) == 3
+        assert list(sqlite) == list(memory)
+        assert sqlite[0] == memory[0] and sqlite[-1] == memory[-1]
+        assert sqlite[1:] == memory[1:]
+        assert sqlite["222"] == BOOK2_NEW
+        assert BOOK2_NEW in sqlite and BOOK2 not in sqlite
+        for name in ('genre', 'author', 'decade'):
+            assert sqlite.get_facet(name) == memory.get_facet(name)
+        assert sqlite.facets_for([BOOK1, BOOK3]) == memory.facets_for([BOOK1, BOOK3])
+
+    def test_index_queries(self):
+        collection = SQLiteBookCollection()
+        scenario(collection)
+        index = collection.index_dict
+        assert index.get_by_author("Author1") == [BOOK1, BOOK3]
+        assert index.get_by_genre("Drama") == [BOOK2_NEW]
+        assert index.get_by_year(2003) == [BOOK3]
+        assert index.get_by_title("Title1") == [BOOK1]
+        assert index.get_by_isbn("333") == BOOK3
+        assert index.find(author="Author1", genre="Fiction", year=2001) == [BOOK1]
+        assert (index.author_count(), index.genre_count(), len(index)) == (2, 2, 3)
+        with pytest.raises(LibraryException, match="Unknown index"):
+            index.find(publisher="X")
+
+    def test_errors(self):
+        collection = SQLiteBookCollection()
+        collection.add_book(BOOK1)
+        with pytest.raises(LibraryException, match="ISBN conflict"):
+            collection.add_book(Book("Other", "Author1", 2001, "Fiction", "111"))
+        with pytest.raises(LibraryException, match="not found"):
+            collection.update_book(BOOK2, BOOK2_NEW)
+        with pytest.raises(KeyError):
+            collection["999"]
+        with pytest.raises(IndexError):
+            SQLiteBookCollection()[0]
+
+    def test_custom_and_fuzzy_indexes(self):
+        collection = SQLiteBookCollection()
+        collection.add_book(BOOK1)
+        index = collection.index_dict
+        decade = index.register_index('decade', lambda book: book.year // 10 * 10)
+        index.register_index('initial', lambda book: book.title[0], lazy=True)
+        assert index.get_by_author_fuzzy("Autor1") == [("Author1", 1)]
+        scenario(collection)
+        assert index.get_by('decade', 2000) == [BOOK1, BOOK3] and index.get_by('author', "Author2") == [BOOK2_NEW]
+        assert index.find(decade=2010, author="Author2") == [BOOK2_NEW]
+        assert index.find(initial="T", genre="Fiction") == [BOOK1, BOOK3]
+        assert index.get_by_title_fuzzy("Title2 (2nd ed)", 1) == [("Title2 (2nd ed.)", 1)]
+        collection.delete_book(BOOK1, 6)
+        assert decade.search(2000) == [BOOK3] and index.get_by_title_fuzzy("Title1", 0) == []
+        assert index.index_stats()['initial'] == {'built': True, 'keys': 1, 'queries': 1}
+        assert index.release_unused_indexes(min_queries=2) == ['initial']
+        index.drop_index('initial')
+        for name, error in (('author', "already exists"), ('decade', "already exists")):
+            with pytest.raises(LibraryException, match=error):
+                index.register_index(name, lambda book: book.author)
+        with pytest.raises(LibraryException, match="Unknown index"):
+            index.get_by('initial', "T")
+
+    def test_base_state(self):
+        collection = SQLiteBookCollection()
+        scenario(collection)
+        assert collection._items_shared is False and collection.facets.copies is None
+        assert collection.get_facet('genre')[0] == ("Fiction", 2, 9)
+        collection.add_book(Book("New", "Author9", 2020, "Poetry", "999"))
+        memory = BookCollection()
+        scenario(memory)
+        memory.add_book(Book("New", "Author9", 2020, "Poetry", "999"))
+        collection.delete_book(BOOK1, 2)
+        memory.delete_book(BOOK1, 2)
+        for name in ('genre', 'author', 'decade'):
+            assert collection.get_facet(name) == memory.get_facet(name)
+
+    def test_setitem_duplicate_key(self):
+        collection = SQLiteBookCollection()
+        collection.add_book(BOOK1, 2)
+        collection.add_book(BOOK2)
+        with pytest.raises(LibraryException, match="ISBN conflict"):
+            collection[0] = BOOK2_NEW
+        assert collection.get_all_books_with_counts() == [(BOOK1, 2), (BOOK2, 1)]
+        collection[0] = BOOK3
+        assert collection.get_all_books_with_counts() == [(BOOK3, 2), (BOOK2, 1)]
+
+    def test_cache_hits(self):
+        collection = SQLiteBookCollection(cache_size=2)
+        collection.add_book(BOOK1)
+        for _ in range(3):
+            collection.get_count(BOOK1)
+        stats = collection.index_dict.cache_stats()
+        assert stats['hits'] >= 3 and stats['maxsize'] == 2
+
+    def test_persistence(self, tmp_path):
+        path = str(tmp_path / "catalog.db")
+        collection = SQLiteBookCollection("Disk", path, batch_size=2)
+        scenario(collection)
+        collection.close()
+        reopened = SQLiteBookCollection("Disk", path)
+        assert reopened.get_all_books_with_counts() == [(BOOK1, 5), (BOOK2_NEW, 1), (BOOK3, 4)]
+        reopened.add_book(Book("New", "Author9", 2020, "Poetry", "999"))
+        assert reopened[-1].isbn == "999"
+
+
+class TestLibraryOnSQLite:
+    def test_circulation(self):
+        lib = Library("Disk", collection=SQLiteBookCollection("Disk"))
+        lib.collection.add_book(BOOK1, 2)
+        assert lib.borrow_books(BOOK1, 1, 2).ok
+        assert not lib.is_book_available(BOOK1)
+        hold = lib.place_hold(BOOK1, 2)
+        lib.return_books(BOOK1, 1)
+        assert lib.borrowed_books[BOOK1] == {1: 1, 2: 1}
+        assert hold.hold_id not in lib.holds.holds
+        report = lib.generate_report()
+        assert (report['unique_books'], report['total_copies'], report['authors_count']) == (0, 0, 0)
+
+    def test_transaction_rollback(self):
+        lib = Library("Disk", collection=SQLiteBookCollection("Disk"))
+        lib.collection.add_book(BOOK1, 2)
+        lib.collection.add_book(BOOK2)
+        before = lib.collection.get_all_books_with_counts()
+        with pytest.raises(RuntimeError):
+            with lib.transaction():
+                lib.borrow_books(BOOK1, 1, 2)
+                lib.collection.update_book(BOOK2, BOOK2_NEW)
+                lib.collection.add_book(BOOK3)
+                raise RuntimeError("abort")
+        assert lib.collection.get_all_books_with_counts() == before
+        assert lib.borrowed_books == {}
+
+    def test_snapshot_is_isolated(self):
+        lib = Library("Disk", collection=SQLiteBookCollection("Disk"))
+        lib.collection.add_book(BOOK1, 2)
+        snap = lib.snapshot()
+        lib.borrow_books(BOOK1, 1)
+        assert snap.get_count(BOOK1) == 2
+        assert lib.collection.get_count(BOOK1) == 1
+
+    def test_file_snapshot_reads_transaction(self, tmp_path):
+        lib = Library("Disk", collection=SQLiteBookCollection("Disk", str(tmp_path / "catalog.db")))
+        lib.collection.add_book(BOOK1, 2)
+        lib.collection.add_book(BOOK2)
+        snap = lib.snapshot()
+        assert not isinstance(snap.items, list)
+        lib.borrow_books(BOOK1, 1)
+        lib.collection.delete_book(BOOK2)
+        lib.collection.flush()
+        assert snap.get_all_books_with_counts() == [(BOOK1, 2), (BOOK2, 1)] and len(snap) == 2
+        assert lib.collection.get_all_books_with_counts() == [(BOOK1, 1)]
@@ -0,0 +1,113 @@
+import pytest # type: ignore
+from src.book_collection import Book, LibraryException
+from src.library import Library
+
+BOOK1 = Book("Title1", "Author1", 2001, "Fiction", "111")
+BOOK2 = Book("Title2", "Author2", 2002, "Drama", "222")
+BOOK2_NEW = Book("Title2 (2nd ed.)", "Author2", 2012, "Drama", "222")
+
+
+def make_library() -> Library:
+    lib = Library()
+    lib.collection.add_book(BOOK1, 3)
+    lib.collection.add_book(BOOK2, 2)
+    lib.borrow_books(BOOK1, 1)
+    return lib
+
+
+def state(lib: Library) -> tuple:
+    collection = lib.collection
+    return (
+        collection.get_all_books_with_counts(),
+        sorted(collection.index_dict.group_by_isbn),
+        list(collection.index_dict.get_by_author("Author2")),
+        {name: {value: tuple(entry) for value, entry in values.items()} for name, values in collection.facets.counts.items()},
+        {book: users.copy() for book, users in lib.borrowed_books.items()},
+        {user_id: (info.borrowed_books.copy(), info.total_borrowed, info.total_returned)
+         for user_id, info in lib.borrowers.items()},
+        lib.statistics.copy(),
+        [(loan.loan_id, loan.count, loan.due) for loan in lib.due_index.loans.values()],
+        {isbn: list(queue) for isbn, queue in lib.holds.queues.items()},
+        lib.circulation.count(3600, now=None),
+    )
+
+
+class TestTransactions:
+    def test_commit_keeps_changes(self):
+        lib = make_library()
+        with lib.transaction():
+            lib.borrow_books(BOOK2, 2, 2)
+        assert lib.collection.get_count(BOOK2) == 0
+        assert lib.journal is None and lib.collection.journal is None
+
+    def test_rollback_on_exception(self):
+        lib = make_library()
+        before = state(lib)
+        with pytest.raises(RuntimeError):
+            with lib.transaction():
+                lib.borrow_books(BOOK2, 2)
+                lib.return_books(BOOK1, 1)
+                lib.borrow_books(BOOK1, 3, 2)
+                lib.collection.update_book(BOOK2, BOOK2_NEW)
+                lib.collection.add_book(Book("New", "Author3", 2020, "Poetry", "333"))
+                lib.collection.delete_book(BOOK1, 10)
+                lib.renew_loan(BOOK1, 3)
+                raise RuntimeError("boom")
+        assert state(lib) == before
+        assert lib.journal is None
+
+    def test_rollback_restores_holds(self):
+        lib = make_library()
+        lib.borrow_books(BOOK1, 2, 2)
+        first = lib.place_hold(BOOK1, 5, 2)
+        second = lib.place_hold(BOOK1, 6)
+        before = state(lib)
+        with pytest.raises(LibraryException):
+            with lib.transaction():
+                lib.cancel_hold(second.hold_id)
+                lib.return_books(BOOK1, 2, 2)  # экземпляры уходят по первой заявке
+                assert lib.borrowed_books[BOOK1][5] == 2
+                raise LibraryException("abort")
+        assert state(lib) == before
+        assert lib.get_hold_position(first.hold_id) == 1
+        assert lib.get_hold_position(second.hold_id) == 2
+        assert lib.statistics['holds_fulfilled'] == 0
+
+    def test_new_borrower_removed_on_rollback(self):
+        lib = make_library()
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK2, 42)
+            tx.rollback()
+        assert 42 not in lib.borrowers
+        assert lib.recommend_books(BOOK2) == []
+        assert lib.get_trending_books() == [(BOOK1, 1)]
+
+    def test_nested_savepoint(self):
+        lib = make_library()
+        with lib.transaction():
+            lib.borrow_books(BOOK2, 2)
+            with pytest.raises(RuntimeError):
+                with lib.transaction():
+                    lib.borrow_books(BOOK1, 2)
+                    raise RuntimeError("inner")
+            assert lib.collection.get_count(BOOK1) == 2
+            assert lib.collection.get_count(BOOK2) == 1
+        assert lib.collection.get_count(BOOK2) == 1
+        assert lib.journal is None
+
+    def test_explicit_savepoint(self):
+        lib = make_library()
+        with lib.transaction() as tx:
+            lib.borrow_books(BOOK2, 2)
+            savepoint = tx.savepoint()
+            lib.borrow_books(BOOK2, 3)
+            tx.rollback_to(savepoint)
+            assert lib.collection.get_count(BOOK2) == 1
+            with pytest.raises(LibraryException, match="Invalid savepoint"):
+                tx.rollback_to(savepoint + 100)
+        assert lib.collection.get_count(BOOK2) == 1
+
+    def test_savepoint_outside_transaction(self):
+        tx = make_library().transaction()
+        with pytest.raises(LibraryException, match="not active"):
+            tx.savepoint()